@@ -89,6 +89,10 @@ ext_modules = [
     Extension('zipline.lib.rank', ['zipline/lib/rank.pyx']),
     Extension('zipline.data._equities', ['zipline/data/_equities.pyx']),
     Extension('zipline.data._adjustments', ['zipline/data/_adjustments.pyx']),
+    Extension(
+        'zipline.data._minute_bar_internal',
+        ['zipline/data/_minute_bar_internal.pyx']
+    ),
 ]
 
 
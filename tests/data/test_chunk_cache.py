@@ -0,0 +1,138 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+import bcolz
+from nose_parameterized import parameterized
+from numpy import arange, array, uint32
+from numpy.testing import assert_array_equal
+
+from zipline.data.chunk_cache import ChunkCache
+
+CHUNKLEN = 10
+NROWS = 95
+KEY = ('table', 'column')
+
+
+class ChunkCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.data = arange(NROWS, dtype=uint32)
+        self.carray = bcolz.carray(self.data, chunklen=CHUNKLEN)
+
+    def test_get(self):
+        cache = ChunkCache(max_bytes=100)
+        calls = []
+
+        def load():
+            calls.append(1)
+            return arange(5, dtype=uint32)
+
+        first = cache.get('a', load)
+        second = cache.get('a', load)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.nbytes, first.nbytes)
+        self.assertFalse(first.flags.writeable)
+
+    def test_lru_eviction(self):
+        # Room for exactly two 5-element uint32 chunks.
+        cache = ChunkCache(max_bytes=40)
+
+        def load():
+            return arange(5, dtype=uint32)
+
+        cache.get('a', load)
+        cache.get('b', load)
+        # Touch 'a' so that 'b' is the least recently used.
+        cache.get('a', load)
+        cache.get('c', load)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.nbytes, 40)
+
+    def test_oversized_value_not_stored(self):
+        cache = ChunkCache(max_bytes=8)
+        value = cache.get('a', lambda: arange(5, dtype=uint32))
+        assert_array_equal(value, arange(5))
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.nbytes, 0)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_clear(self):
+        cache = ChunkCache()
+        cache.read(self.carray, KEY, 0, NROWS)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+    @parameterized.expand([
+        ('within_chunk', 12, 17),
+        ('chunk_aligned', 10, 20),
+        ('across_chunks', 5, 37),
+        ('partial_last_chunk', 88, 95),
+        ('everything', 0, NROWS),
+        ('empty', 30, 30),
+    ])
+    def test_read(self, name, start, stop):
+        cache = ChunkCache()
+        assert_array_equal(
+            cache.read(self.carray, KEY, start, stop),
+            self.data[start:stop],
+        )
+        nchunks = len(cache)
+        # A second read is served entirely from the cache.
+        assert_array_equal(
+            cache.read(self.carray, KEY, start, stop),
+            self.data[start:stop],
+        )
+        self.assertEqual(len(cache), nchunks)
+        self.assertEqual(cache.hits, nchunks)
+        self.assertEqual(cache.misses, nchunks)
+
+    def test_take(self):
+        cache = ChunkCache()
+        indices = array([94, 3, 15, 4, 16, 60, 3])
+        assert_array_equal(
+            cache.take(self.carray, KEY, indices),
+            self.data[indices],
+        )
+        # Chunks 0, 1, 6 and 9 are each decompressed once.
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(
+            sorted(key[-1] for key in cache._chunks),
+            [0, 1, 6, 9],
+        )
+
+    def test_keys_are_per_column(self):
+        cache = ChunkCache()
+        other = bcolz.carray(self.data * 2, chunklen=CHUNKLEN)
+        assert_array_equal(
+            cache.read(self.carray, ('table', 'a'), 0, 5),
+            self.data[:5],
+        )
+        assert_array_equal(
+            cache.read(other, ('table', 'b'), 0, 5),
+            self.data[:5] * 2,
+        )
+        self.assertEqual(cache.misses, 2)
+
+    def test_negative_budget(self):
+        with self.assertRaises(ValueError):
+            ChunkCache(max_bytes=-1)
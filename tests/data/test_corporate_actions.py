@@ -0,0 +1,130 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sqlite3
+from unittest import TestCase
+
+from numpy import array, float64, uint32
+from numpy.testing import assert_array_equal
+from pandas import DataFrame, DatetimeIndex, Timestamp, date_range
+
+from zipline.data.corporate_actions import CorporateActionIndex
+from zipline.data.us_equity_pricing import SQLiteAdjustmentWriter
+from zipline.testing import str_to_seconds
+
+
+class CorporateActionIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.calendar = date_range('2015-06-01', '2015-06-30', tz='UTC')
+        conn = sqlite3.connect(':memory:')
+        writer = SQLiteAdjustmentWriter(conn, self.calendar, None)
+
+        splits = DataFrame({
+            # Out of date order, with two splits on 2015-06-02 and one on a
+            # day that is not in the calendar.
+            'effective_date': array([
+                str_to_seconds('2015-06-03'),
+                str_to_seconds('2015-06-02'),
+                str_to_seconds('2015-06-02'),
+                str_to_seconds('2015-07-04'),
+            ]),
+            'ratio': array([0.5, 0.25, 2.0, 3.0]),
+            'sid': array([1, 2, 1, 3]),
+        })
+        empty = DataFrame(
+            {
+                'effective_date': array([], dtype=int),
+                'ratio': array([], dtype=float),
+                'sid': array([], dtype=int),
+            },
+            index=DatetimeIndex([]),
+            columns=['effective_date', 'ratio', 'sid'],
+        )
+        dividends = DataFrame({
+            'sid': array([], dtype=uint32),
+            'amount': array([], dtype=float64),
+            'record_date': array([], dtype='datetime64[ns]'),
+            'ex_date': array([], dtype='datetime64[ns]'),
+            'declared_date': array([], dtype='datetime64[ns]'),
+            'pay_date': array([], dtype='datetime64[ns]'),
+        })
+        stock_dividends = DataFrame({
+            'sid': array([2, 2]),
+            'ex_date': array(
+                ['2015-06-10', '2015-06-20'], dtype='datetime64[ns]',
+            ),
+            'declared_date': array(
+                ['2015-06-01', '2015-06-11'], dtype='datetime64[ns]',
+            ),
+            'record_date': array(
+                ['2015-06-11', '2015-06-21'], dtype='datetime64[ns]',
+            ),
+            'pay_date': array(
+                ['2015-06-12', '2015-06-22'], dtype='datetime64[ns]',
+            ),
+            'payment_sid': array([3, 4]),
+            'ratio': array([0.25, 0.5]),
+        })
+        writer.write(splits, empty, dividends, stock_dividends)
+        self.index = CorporateActionIndex(conn, self.calendar)
+
+    def test_events_on_day(self):
+        splits = self.index.splits.on(Timestamp('2015-06-02', tz='UTC'))
+        assert_array_equal(splits['sid'], [2, 1])
+        assert_array_equal(splits['ratio'], [0.25, 2.0])
+
+        splits = self.index.splits.on(
+            Timestamp('2015-06-02', tz='UTC'), sids=[1, 3],
+        )
+        assert_array_equal(splits['sid'], [1])
+        assert_array_equal(splits['ratio'], [2.0])
+
+        splits = self.index.splits.on(Timestamp('2015-06-04', tz='UTC'))
+        self.assertEqual(len(splits['sid']), 0)
+
+    def test_events_off_calendar(self):
+        splits = self.index.splits.on(Timestamp('2015-07-04', tz='UTC'))
+        assert_array_equal(splits['sid'], [3])
+
+    def test_events_between(self):
+        splits = self.index.splits.between(
+            Timestamp('2015-06-01', tz='UTC'),
+            Timestamp('2015-06-03', tz='UTC'),
+        )
+        assert_array_equal(splits['sid'], [2, 1, 1])
+        assert_array_equal(
+            splits['effective_date'],
+            [str_to_seconds(day)
+             for day in ('2015-06-02', '2015-06-02', '2015-06-03')],
+        )
+
+        payouts = self.index.stock_dividend_payouts.between(
+            Timestamp('2015-06-05', tz='UTC'),
+            Timestamp('2015-06-15', tz='UTC'),
+            sids=[2],
+        )
+        assert_array_equal(payouts['payment_sid'], [3])
+        assert_array_equal(
+            payouts['pay_date'], [str_to_seconds('2015-06-12')],
+        )
+
+    def test_empty_tables(self):
+        self.assertEqual(len(self.index.mergers), 0)
+        self.assertEqual(len(self.index.dividend_payouts), 0)
+        mergers = self.index.mergers.on(self.calendar[0], sids=[1])
+        self.assertEqual(
+            sorted(mergers), ['effective_date', 'ratio', 'sid'],
+        )
+        self.assertEqual(len(mergers['sid']), 0)
@@ -0,0 +1,120 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from nose_parameterized import parameterized
+from numpy import (
+    arange,
+    datetime64,
+    may_share_memory,
+)
+from numpy.testing import assert_array_equal
+from pandas import (
+    DataFrame,
+    Int64Index,
+    Timestamp,
+)
+from testfixtures import TempDirectory
+
+from zipline.data.daily_bar_cube import DailyBarCubeWriter
+from zipline.data.us_equity_pricing import BcolzDailyBarReader
+from zipline.finance.trading import TradingEnvironment
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.loaders.synthetic import SyntheticDailyBarWriter
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+EQUITY_INFO = DataFrame(
+    [
+        {'start_date': '2015-06-01', 'end_date': '2015-06-05'},
+        {'start_date': '2015-06-22', 'end_date': '2015-06-30'},
+        {'start_date': '2015-06-02', 'end_date': '2015-06-30'},
+        {'start_date': '2015-06-01', 'end_date': '2015-06-15'},
+        {'start_date': '2015-06-12', 'end_date': '2015-06-18'},
+        {'start_date': '2015-06-15', 'end_date': '2015-06-25'},
+    ],
+    index=arange(1, 7),
+    columns=['start_date', 'end_date'],
+).astype(datetime64)
+
+
+class DailyBarCubeTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        all_trading_days = TradingEnvironment().trading_days
+        cls.trading_days = all_trading_days[
+            all_trading_days.get_loc(TEST_CALENDAR_START):
+            all_trading_days.get_loc(TEST_CALENDAR_STOP) + 1
+        ]
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+
+        writer = SyntheticDailyBarWriter(EQUITY_INFO, self.trading_days)
+        table = writer.write(
+            self.dir_.getpath('daily_equity_pricing.bcolz'),
+            self.trading_days,
+            EQUITY_INFO.index,
+        )
+        self.bcolz_reader = BcolzDailyBarReader(table)
+        self.reader = DailyBarCubeWriter(
+            self.dir_.getpath('daily_equity_pricing.cube'),
+        ).write_from_bcolz(table)
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def test_sids(self):
+        assert_array_equal(self.reader.sids, EQUITY_INFO.index.values)
+
+    @parameterized.expand([
+        ('all', [1, 2, 3, 4, 5, 6]),
+        ('contiguous_run', [2, 3, 4]),
+        ('reversed', [6, 5, 4, 3, 2, 1]),
+        ('gappy', [1, 3, 6]),
+    ])
+    def test_load_raw_arrays(self, name, assets):
+        assets = Int64Index(assets)
+        start = Timestamp('2015-06-10', tz='UTC')
+        end = Timestamp('2015-06-23', tz='UTC')
+        columns = USEquityPricing.columns
+        results = self.reader.load_raw_arrays(columns, start, end, assets)
+        expected = self.bcolz_reader.load_raw_arrays(
+            columns, start, end, assets,
+        )
+        for result, expected_result in zip(results, expected):
+            self.assertEqual(result.dtype, expected_result.dtype)
+            assert_array_equal(result, expected_result)
+
+    def test_contiguous_assets_are_views(self):
+        start = Timestamp('2015-06-10', tz='UTC')
+        end = Timestamp('2015-06-23', tz='UTC')
+        close, = self.reader.load_raw_arrays(
+            [USEquityPricing.close], start, end, Int64Index([2, 3, 4]),
+        )
+        self.assertTrue(may_share_memory(close, self.reader._cubes['close']))
+        self.assertFalse(close.flags.writeable)
+
+    def test_unknown_sid(self):
+        with self.assertRaises(KeyError):
+            self.reader.load_raw_arrays(
+                [USEquityPricing.close],
+                TEST_CALENDAR_START,
+                TEST_CALENDAR_STOP,
+                Int64Index([1, 7]),
+            )
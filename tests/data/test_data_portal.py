@@ -0,0 +1,366 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import timedelta
+import os
+from unittest import TestCase
+
+from numpy import (
+    arange,
+    array,
+    datetime64,
+    float64,
+    nan,
+    uint32,
+)
+from numpy.testing import assert_almost_equal, assert_array_equal
+from pandas import (
+    DataFrame,
+    DatetimeIndex,
+    Timestamp,
+)
+from testfixtures import TempDirectory
+
+from zipline.assets import Future
+from zipline.data.data_portal import DataPortal
+from zipline.data.minute_bars import (
+    BcolzMinuteBarReader,
+    BcolzMinuteBarWriter,
+    US_EQUITIES_MINUTES_PER_DAY,
+)
+from zipline.data.us_equity_pricing import (
+    BcolzDailyBarReader,
+    SQLiteAdjustmentReader,
+    SQLiteAdjustmentWriter,
+)
+from zipline.finance.trading import TradingEnvironment
+from zipline.pipeline.loaders.synthetic import SyntheticDailyBarWriter
+from zipline.testing import str_to_seconds
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+EQUITY_INFO = DataFrame(
+    [
+        {'start_date': '2015-06-01', 'end_date': '2015-06-30'},
+        {'start_date': '2015-06-01', 'end_date': '2015-06-30'},
+    ],
+    index=arange(1, 3),
+    columns=['start_date', 'end_date'],
+).astype(datetime64)
+
+SPLIT_DATE = Timestamp('2015-06-15', tz='UTC')
+SPLIT_RATIO = 0.5
+
+
+class DataPortalTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.env = TradingEnvironment()
+        all_trading_days = cls.env.trading_days
+        cls.trading_days = all_trading_days[
+            all_trading_days.get_loc(TEST_CALENDAR_START):
+            all_trading_days.get_loc(TEST_CALENDAR_STOP) + 1
+        ]
+        all_market_opens = cls.env.open_and_closes.market_open
+        all_market_closes = cls.env.open_and_closes.market_close
+        indexer = all_market_opens.index.slice_indexer(
+            start=TEST_CALENDAR_START,
+            end=TEST_CALENDAR_STOP
+        )
+        cls.market_opens = all_market_opens[indexer]
+        cls.market_closes = all_market_closes[indexer]
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+
+        self.daily_writer = SyntheticDailyBarWriter(
+            EQUITY_INFO,
+            self.trading_days,
+        )
+        daily_path = self.dir_.getpath('daily_equity_pricing.bcolz')
+        self.daily_writer.write(
+            daily_path, self.trading_days, EQUITY_INFO.index,
+        )
+        self.daily_reader = BcolzDailyBarReader(daily_path)
+
+        minute_path = self.dir_.getpath('minute_bars')
+        os.makedirs(minute_path)
+        minute_writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            minute_path,
+            self.market_opens,
+            self.market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+        )
+        self.trade_minute = self.market_opens[SPLIT_DATE] - timedelta(days=3)
+        minute_writer.write(1, DataFrame(
+            {
+                'open': [10.0],
+                'high': [11.0],
+                'low': [9.0],
+                'close': [10.5],
+                'volume': [100],
+            },
+            index=[self.trade_minute],
+        ))
+        self.minute_reader = BcolzMinuteBarReader(minute_path)
+
+        adjustments_path = self.dir_.getpath('adjustments.sqlite')
+        adjustment_writer = SQLiteAdjustmentWriter(
+            adjustments_path,
+            self.trading_days,
+            self.daily_reader,
+        )
+        splits = DataFrame({
+            'effective_date': array(
+                [str_to_seconds('2015-06-15')], dtype=int,
+            ),
+            'ratio': array([SPLIT_RATIO]),
+            'sid': array([1]),
+        })
+        mergers = DataFrame(
+            {
+                # Hackery to make the dtypes correct on an empty frame.
+                'effective_date': array([], dtype=int),
+                'ratio': array([], dtype=float),
+                'sid': array([], dtype=int),
+            },
+            index=DatetimeIndex([]),
+            columns=['effective_date', 'ratio', 'sid'],
+        )
+        dividends = DataFrame({
+            'sid': array([], dtype=uint32),
+            'amount': array([], dtype=float64),
+            'record_date': array([], dtype='datetime64[ns]'),
+            'ex_date': array([], dtype='datetime64[ns]'),
+            'declared_date': array([], dtype='datetime64[ns]'),
+            'pay_date': array([], dtype='datetime64[ns]'),
+        })
+        stock_dividends = DataFrame({
+            'sid': array([2]),
+            'ex_date': array(['2015-06-10'], dtype='datetime64[ns]'),
+            'declared_date': array(['2015-06-01'], dtype='datetime64[ns]'),
+            'record_date': array(['2015-06-11'], dtype='datetime64[ns]'),
+            'pay_date': array(['2015-06-12'], dtype='datetime64[ns]'),
+            'payment_sid': array([3]),
+            'ratio': array([0.25]),
+        })
+        adjustment_writer.write(splits, mergers, dividends, stock_dividends)
+        self.adjustment_reader = SQLiteAdjustmentReader(adjustments_path)
+
+        self.data_portal = DataPortal(
+            self.env,
+            equity_daily_reader=self.daily_reader,
+            equity_minute_reader=self.minute_reader,
+            adjustment_reader=self.adjustment_reader,
+        )
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def expected_value(self, sid, day, colname):
+        return self.daily_writer.expected_value(sid, day, colname)
+
+    def test_get_spot_value_daily(self):
+        day = self.trading_days[5]
+        for field, colname in (('price', 'close'),
+                               ('open_price', 'open'),
+                               ('volume', 'volume')):
+            self.assertAlmostEqual(
+                self.data_portal.get_spot_value(1, field, day, 'daily'),
+                self.expected_value(1, day, colname),
+            )
+
+    def test_spot_value_cache(self):
+        day = self.trading_days[5]
+        value = self.data_portal.get_spot_value(1, 'close', day, 'daily')
+        self.assertEqual(
+            self.data_portal._spot_value_cache,
+            {(1, 'close', 'daily'): value},
+        )
+
+        # Asking for another dt drops the values cached for the last one.
+        next_day = self.trading_days[6]
+        self.data_portal.get_spot_value(2, 'close', next_day, 'daily')
+        self.assertEqual(
+            list(self.data_portal._spot_value_cache),
+            [(2, 'close', 'daily')],
+        )
+
+    def test_get_previous_value_daily(self):
+        day = self.trading_days[5]
+        self.assertAlmostEqual(
+            self.data_portal.get_previous_value(1, 'close', day, 'daily'),
+            self.expected_value(1, self.trading_days[4], 'close'),
+        )
+
+    def test_get_spot_value_minute_ffill(self):
+        later = self.trade_minute + timedelta(minutes=30)
+        assert_almost_equal(
+            self.data_portal.get_spot_value(1, 'close', later, 'minute'),
+            nan,
+        )
+        self.assertEqual(
+            self.data_portal.get_spot_value(1, 'price', later, 'minute'),
+            10.5,
+        )
+        # After the split, the forward-filled price is adjusted.
+        after_split = self.market_opens[SPLIT_DATE]
+        self.assertEqual(
+            self.data_portal.get_spot_value(1, 'price', after_split, 'minute'),
+            10.5 * SPLIT_RATIO,
+        )
+
+    def test_daily_history_window_adjusted(self):
+        end_day = Timestamp('2015-06-17', tz='UTC')
+        window_days = self.trading_days[
+            self.trading_days.get_loc(end_day) - 4:
+            self.trading_days.get_loc(end_day) + 1
+        ]
+
+        for field, colname, ratio in (('close', 'close', SPLIT_RATIO),
+                                      ('volume', 'volume', 1 / SPLIT_RATIO)):
+            window = self.data_portal.get_history_window(
+                [1, 2], end_day, 5, '1d', field,
+            )
+            assert_array_equal(window.index, window_days)
+            expected = self.daily_writer.expected_values_2d(
+                window_days, [1, 2], colname,
+            ).astype(float64)
+            expected[window_days < SPLIT_DATE, 0] *= ratio
+            assert_almost_equal(window.values, expected)
+
+    def test_daily_history_window_slides(self):
+        for end_day in self.trading_days[10:15]:
+            window = self.data_portal.get_history_window(
+                [1, 2], end_day, 5, '1d', 'price',
+            )
+            fresh = DataPortal(
+                self.env,
+                equity_daily_reader=self.daily_reader,
+                adjustment_reader=self.adjustment_reader,
+            ).get_history_window([1, 2], end_day, 5, '1d', 'price')
+            assert_array_equal(window.index, fresh.index)
+            assert_almost_equal(window.values, fresh.values)
+        self.assertEqual(len(self.data_portal._history_windows), 1)
+
+    def test_minute_history_window(self):
+        end = self.trade_minute + timedelta(minutes=2)
+        window = self.data_portal.get_history_window(
+            [1], end, 3, '1m', 'close',
+        )
+        assert_array_equal(
+            window.index,
+            DatetimeIndex([
+                self.trade_minute + timedelta(minutes=i) for i in range(3)
+            ]),
+        )
+        assert_almost_equal(window[1].values, [10.5, nan, nan])
+
+        window = self.data_portal.get_history_window(
+            [1], end, 3, '1m', 'price',
+        )
+        assert_almost_equal(window[1].values, [10.5, 10.5, 10.5])
+
+        # A window starting after the trade is filled from the last trade
+        # before it.
+        end = self.trade_minute + timedelta(minutes=5)
+        window = self.data_portal.get_history_window(
+            [1], end, 3, '1m', 'price',
+        )
+        assert_almost_equal(window[1].values, [10.5, 10.5, 10.5])
+
+    def test_future_history_window(self):
+        # Read the equity bars as though they were a future's.
+        data_portal = DataPortal(
+            self.env,
+            future_daily_reader=self.daily_reader,
+        )
+        future = Future(1, symbol='TESTFUT')
+        end_day = Timestamp('2015-06-17', tz='UTC')
+        window_days = self.trading_days[
+            self.trading_days.get_loc(end_day) - 4:
+            self.trading_days.get_loc(end_day) + 1
+        ]
+        window = data_portal.get_history_window(
+            [future], end_day, 5, '1d', 'close',
+        )
+        assert_array_equal(window.index, window_days)
+        assert_almost_equal(
+            window[future].values,
+            self.daily_writer.expected_values_2d(
+                window_days, [1], 'close',
+            )[:, 0],
+        )
+
+        # There's no equity reader for sid 2.
+        with self.assertRaises(ValueError):
+            data_portal.get_history_window(
+                [future, 2], end_day, 5, '1d', 'close',
+            )
+
+        # Equities and futures can't share a window.
+        data_portal = DataPortal(
+            self.env,
+            equity_daily_reader=self.daily_reader,
+            future_daily_reader=BcolzDailyBarReader(
+                self.dir_.getpath('daily_equity_pricing.bcolz'),
+            ),
+        )
+        with self.assertRaises(ValueError):
+            data_portal.get_history_window(
+                [future, 2], end_day, 5, '1d', 'close',
+            )
+
+    def test_adjustments_of_sid(self):
+        dates, price_ratios, volume_ratios = \
+            self.adjustment_reader.adjustments_of_sid(1)
+        assert_array_equal(
+            dates, array(['2015-06-15'], dtype='datetime64[ns]'),
+        )
+        assert_almost_equal(price_ratios, [SPLIT_RATIO])
+        assert_almost_equal(volume_ratios, [1.0 / SPLIT_RATIO])
+
+        for values in self.adjustment_reader.adjustments_of_sid(2):
+            self.assertEqual(len(values), 0)
+
+    def test_get_splits(self):
+        self.assertEqual(
+            self.data_portal.get_splits([1, 2], SPLIT_DATE),
+            [(1, SPLIT_RATIO)],
+        )
+        self.assertEqual(self.data_portal.get_splits([2], SPLIT_DATE), [])
+        self.assertEqual(
+            self.data_portal.get_splits([1], self.trading_days[0]),
+            [],
+        )
+
+    def test_get_stock_dividends(self):
+        dividends = self.data_portal.get_stock_dividends(
+            2, self.trading_days[5:10],
+        )
+        self.assertEqual(len(dividends), 1)
+        dividend = dividends[0]
+        self.assertEqual(dividend['ex_date'],
+                         Timestamp('2015-06-10', tz='UTC'))
+        self.assertEqual(dividend['payment_sid'], 3)
+        self.assertEqual(dividend['ratio'], 0.25)
+
+        self.assertEqual(
+            self.data_portal.get_stock_dividends(2, self.trading_days[:5]),
+            [],
+        )
@@ -0,0 +1,194 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from numpy.testing import assert_almost_equal, assert_array_equal
+from pandas import DataFrame, Int64Index, Timestamp
+from testfixtures import TempDirectory
+
+from zipline.data.future_pricing import (
+    ContinuousFutureBuilder,
+    FutureDailyReader,
+)
+from zipline.finance.trading import TradingEnvironment
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.loaders.synthetic import SyntheticDailyBarWriter
+from zipline.testing import tmp_asset_finder
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+
+class ContinuousFutureBuilderTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.env = TradingEnvironment()
+        all_trading_days = cls.env.trading_days
+        cls.trading_days = all_trading_days[
+            all_trading_days.get_loc(TEST_CALENDAR_START):
+            all_trading_days.get_loc(TEST_CALENDAR_STOP) + 1
+        ]
+        days = cls.trading_days
+        later = Timestamp('2015-08-20', tz='UTC')
+
+        # Contracts 1 and 2 roll on the earlier of their notice and
+        # expiration dates, contract 3 outlives the calendar.
+        cls.futures = DataFrame(
+            {
+                'symbol': ['CLM15', 'CLN15', 'CLQ15'],
+                'root_symbol': ['CL'] * 3,
+                'start_date': [days[0]] * 3,
+                'end_date': [days[-1]] * 3,
+                'notice_date': [days[5], days[15], later],
+                'expiration_date': [days[8], days[12], later],
+            },
+            index=Int64Index([1, 2, 3]),
+        )
+        cls.roll_locs = [5, 12]
+        cls.asset_finder_context = tmp_asset_finder(futures=cls.futures)
+        cls.asset_finder = cls.asset_finder_context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.asset_finder_context.__exit__(None, None, None)
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+        path = self.dir_.getpath('daily_future_pricing.bcolz')
+        self.writer = SyntheticDailyBarWriter(
+            self.futures[['start_date', 'end_date']],
+            self.trading_days,
+        )
+        self.writer.write(path, self.trading_days, self.futures.index)
+        self.reader = FutureDailyReader(path)
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def expected_close(self, sid, loc):
+        return self.writer.expected_value(
+            sid, self.trading_days[loc], 'close',
+        )
+
+    def test_front_contracts(self):
+        builder = ContinuousFutureBuilder(
+            self.asset_finder, self.reader, self.trading_days,
+        )
+        contracts = builder.front_contracts(
+            'CL', self.trading_days[0], self.trading_days[-1],
+        )
+        assert_array_equal(contracts.index, self.trading_days)
+        first, second = self.roll_locs
+        assert_array_equal(contracts.values[:first], 1)
+        assert_array_equal(contracts.values[first:second], 2)
+        assert_array_equal(contracts.values[second:], 3)
+
+    def test_roll_offset(self):
+        builder = ContinuousFutureBuilder(
+            self.asset_finder, self.reader, self.trading_days, roll_offset=2,
+        )
+        contracts = builder.front_contracts(
+            'CL', self.trading_days[0], self.trading_days[-1],
+        )
+        first, second = self.roll_locs
+        self.assertEqual(contracts.iloc[first - 3], 1)
+        self.assertEqual(contracts.iloc[first - 2], 2)
+        self.assertEqual(contracts.iloc[second - 2], 3)
+
+    def check_adjusted_closes(self, adjustment, adjust):
+        builder = ContinuousFutureBuilder(
+            self.asset_finder,
+            self.reader,
+            self.trading_days,
+            adjustment=adjustment,
+        )
+        closes, volumes = builder.load_raw_arrays(
+            [USEquityPricing.close, USEquityPricing.volume],
+            self.trading_days[0],
+            self.trading_days[-1],
+            ['CL'],
+        )
+
+        first, second = self.roll_locs
+        expected = [
+            self.expected_close(sid, loc)
+            for loc, sid in enumerate(
+                [1] * first +
+                [2] * (second - first) +
+                [3] * (len(self.trading_days) - second)
+            )
+        ]
+        # Back-adjust the earlier days at each roll, starting from the last.
+        for roll, old, new in ((second, 2, 3), (first, 1, 2)):
+            old_close = self.expected_close(old, roll - 1)
+            new_close = self.expected_close(new, roll - 1)
+            expected[:roll] = [
+                adjust(value, old_close, new_close)
+                for value in expected[:roll]
+            ]
+        assert_almost_equal(closes[:, 0], expected)
+
+        # Volume is never adjusted.
+        assert_almost_equal(
+            volumes[:, 0],
+            [
+                self.writer.expected_value(sid, day, 'volume')
+                for day, sid in zip(
+                    self.trading_days,
+                    builder.front_contracts(
+                        'CL', self.trading_days[0], self.trading_days[-1],
+                    ),
+                )
+            ],
+        )
+
+    def test_multiplicative_adjustment(self):
+        self.check_adjusted_closes(
+            'mul', lambda value, old, new: value * new / old,
+        )
+
+    def test_additive_adjustment(self):
+        self.check_adjusted_closes(
+            'add', lambda value, old, new: value + new - old,
+        )
+
+    def test_unadjusted(self):
+        self.check_adjusted_closes(None, lambda value, old, new: value)
+
+    def test_windows_are_cached(self):
+        builder = ContinuousFutureBuilder(
+            self.asset_finder, self.reader, self.trading_days,
+        )
+        window = builder.load_raw_arrays(
+            [USEquityPricing.close],
+            self.trading_days[3],
+            self.trading_days[7],
+            ['CL', 'CL'],
+        )[0]
+        self.assertEqual(window.shape, (5, 2))
+        assert_array_equal(window[:, 0], window[:, 1])
+        self.assertEqual(list(builder._schedules), ['CL'])
+        self.assertEqual(list(builder._series), [('CL', 'close')])
+
+    def test_invalid_adjustment(self):
+        with self.assertRaises(ValueError):
+            ContinuousFutureBuilder(
+                self.asset_finder,
+                self.reader,
+                self.trading_days,
+                adjustment='ratio',
+            )
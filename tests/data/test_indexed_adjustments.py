@@ -0,0 +1,111 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from numpy import array, ones
+from numpy.testing import assert_allclose
+from pandas import Int64Index, date_range
+
+from zipline.data.indexed_adjustments import (
+    AdjustmentFactors,
+    DIVIDEND,
+    IndexedAdjustments,
+    MERGER,
+    SPLIT,
+)
+
+DATES = date_range('2015-06-01', '2015-06-05', tz='UTC')
+ASSETS = Int64Index([1, 2, 3])
+
+
+def seconds(day):
+    return DATES[day].value // 1000000000
+
+
+class AdjustmentFactorsTestCase(TestCase):
+
+    def setUp(self):
+        # Sid 1 has a split on day 1, and a merger and a dividend on day 3.
+        # Sid 2 has a split on day 2.  Sid 3 has no adjustments.
+        self.factors = AdjustmentFactors.from_adjustments(IndexedAdjustments(
+            sids=array([1, 1, 1, 2]),
+            effective_dates=array(
+                [seconds(1), seconds(3), seconds(3), seconds(2)],
+            ),
+            ratios=array([0.5, 0.8, 0.9, 0.25]),
+            kinds=array([SPLIT, MERGER, DIVIDEND, SPLIT]),
+        ))
+
+    def test_load_factors(self):
+        price, volume = self.factors.load_factors(DATES, ASSETS)
+        assert_allclose(
+            price,
+            array([
+                [0.36, 0.25, 1.0],
+                [0.72, 0.25, 1.0],
+                [0.72, 1.0, 1.0],
+                [1.0, 1.0, 1.0],
+                [1.0, 1.0, 1.0],
+            ]),
+        )
+        assert_allclose(
+            volume,
+            array([
+                [2.0, 4.0, 1.0],
+                [1.0, 4.0, 1.0],
+                [1.0, 1.0, 1.0],
+                [1.0, 1.0, 1.0],
+                [1.0, 1.0, 1.0],
+            ]),
+        )
+
+    def test_adjust_before_first_effective_date(self):
+        raw = ones((len(DATES), len(ASSETS)))
+        close, volume = self.factors.adjust(
+            [raw, raw], ['close', 'volume'], DATES, ASSETS, DATES[0],
+        )
+        # Every adjustment is effective after the as of date, so the days on
+        # or after each are divided by its ratio.
+        assert_allclose(
+            close,
+            array([
+                [1.0, 1.0, 1.0],
+                [2.0, 1.0, 1.0],
+                [2.0, 4.0, 1.0],
+                [1.0 / 0.36, 4.0, 1.0],
+                [1.0 / 0.36, 4.0, 1.0],
+            ]),
+        )
+        assert_allclose(
+            volume,
+            array([
+                [1.0, 1.0, 1.0],
+                [0.5, 1.0, 1.0],
+                [0.5, 0.25, 1.0],
+                [0.5, 0.25, 1.0],
+                [0.5, 0.25, 1.0],
+            ]),
+        )
+
+    def test_no_adjustments(self):
+        factors = AdjustmentFactors.from_adjustments(IndexedAdjustments(
+            sids=array([], dtype=int),
+            effective_dates=array([], dtype=int),
+            ratios=array([]),
+            kinds=array([], dtype=int),
+        ))
+        self.assertEqual(len(factors), 0)
+        for result in factors.load_factors(DATES, ASSETS):
+            assert_allclose(result, ones((len(DATES), len(ASSETS))))
@@ -0,0 +1,149 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from nose_parameterized import parameterized
+from numpy import (
+    arange,
+    datetime64,
+    memmap,
+)
+from numpy.testing import assert_array_equal
+from pandas import (
+    DataFrame,
+    Timestamp,
+)
+from pandas.util.testing import assert_index_equal
+from testfixtures import TempDirectory
+
+from zipline.data.memmap_daily_bars import (
+    MemmapDailyBarReader,
+    MemmapDailyBarWriter,
+)
+from zipline.data.us_equity_pricing import (
+    BcolzDailyBarReader,
+    NoDataOnDate,
+)
+from zipline.finance.trading import TradingEnvironment
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.loaders.synthetic import SyntheticDailyBarWriter
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+EQUITY_INFO = DataFrame(
+    [
+        {'start_date': '2015-06-01', 'end_date': '2015-06-05'},
+        {'start_date': '2015-06-22', 'end_date': '2015-06-30'},
+        {'start_date': '2015-06-02', 'end_date': '2015-06-30'},
+        {'start_date': '2015-06-01', 'end_date': '2015-06-15'},
+        {'start_date': '2015-06-12', 'end_date': '2015-06-18'},
+        {'start_date': '2015-06-15', 'end_date': '2015-06-25'},
+    ],
+    index=arange(1, 7),
+    columns=['start_date', 'end_date'],
+).astype(datetime64)
+
+
+class MemmapDailyBarTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        all_trading_days = TradingEnvironment().trading_days
+        cls.trading_days = all_trading_days[
+            all_trading_days.get_loc(TEST_CALENDAR_START):
+            all_trading_days.get_loc(TEST_CALENDAR_STOP) + 1
+        ]
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+
+        self.writer = SyntheticDailyBarWriter(EQUITY_INFO, self.trading_days)
+        table = self.writer.write(
+            self.dir_.getpath('daily_equity_pricing.bcolz'),
+            self.trading_days,
+            EQUITY_INFO.index,
+        )
+        self.bcolz_reader = BcolzDailyBarReader(table)
+        self.reader = MemmapDailyBarWriter(
+            self.dir_.getpath('daily_equity_pricing.memmap'),
+        ).write_from_bcolz(table)
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def test_calendar(self):
+        assert_index_equal(self.reader._calendar, self.trading_days)
+
+    def test_columns_are_memory_mapped(self):
+        for colname in ('open', 'high', 'low', 'close', 'volume'):
+            column = self.reader._spot_col(colname)
+            self.assertIsInstance(column, memmap)
+            self.assertFalse(column.flags.writeable)
+
+    def test_reopen(self):
+        reopened = MemmapDailyBarReader(
+            self.dir_.getpath('daily_equity_pricing.memmap'),
+        )
+        self.assertEqual(reopened._first_rows, self.reader._first_rows)
+        self.assertEqual(reopened._last_rows, self.reader._last_rows)
+        self.assertEqual(
+            reopened._calendar_offsets,
+            self.reader._calendar_offsets,
+        )
+
+    @parameterized.expand([
+        ('2015-06-01', '2015-06-30'),
+        ('2015-06-10', '2015-06-19'),
+        ('2015-06-22', '2015-06-22'),
+    ])
+    def test_load_raw_arrays(self, start, end):
+        start, end = Timestamp(start, tz='UTC'), Timestamp(end, tz='UTC')
+        assets = EQUITY_INFO.index[::-1]
+        columns = USEquityPricing.columns
+        results = self.reader.load_raw_arrays(columns, start, end, assets)
+        expected = self.bcolz_reader.load_raw_arrays(
+            columns, start, end, assets,
+        )
+        for column, result, expected_result in zip(columns, results, expected):
+            self.assertEqual(result.dtype, expected_result.dtype)
+            assert_array_equal(result, expected_result)
+
+    def test_spot_price(self):
+        for sid in EQUITY_INFO.index:
+            for day in self.trading_days:
+                for colname in ('open', 'close', 'volume'):
+                    try:
+                        expected = self.bcolz_reader.spot_price(
+                            sid, day, colname,
+                        )
+                    except NoDataOnDate:
+                        with self.assertRaises(NoDataOnDate):
+                            self.reader.spot_price(sid, day, colname)
+                        continue
+                    self.assertEqual(
+                        self.reader.spot_price(sid, day, colname),
+                        expected,
+                    )
+
+    def test_spot_prices(self):
+        colnames = ['open', 'close', 'volume']
+        sids = EQUITY_INFO.index[::-1]
+        for day in self.trading_days:
+            results = self.reader.spot_prices(sids, day, colnames)
+            expected = self.bcolz_reader.spot_prices(sids, day, colnames)
+            for result, expected_result in zip(results, expected):
+                assert_array_equal(result, expected_result)
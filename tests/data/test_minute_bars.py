@@ -13,12 +13,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from datetime import timedelta
+import json
 import os
+from shutil import rmtree
+import warnings
 
 from unittest import TestCase
 
-from numpy import nan, array
-from numpy.testing import assert_almost_equal
+import bcolz
+from mock import call, patch
+from nose_parameterized import parameterized
+from numpy import nan, arange, array, uint32
+from numpy.testing import assert_almost_equal, assert_array_equal
 from pandas import (
     DataFrame,
     DatetimeIndex,
@@ -28,7 +34,9 @@ from pandas import (
 )
 from testfixtures import TempDirectory
 
+from zipline.data.chunk_cache import ChunkCache
 from zipline.data.minute_bars import (
+    BcolzMinuteBarMetadata,
     BcolzMinuteBarWriter,
     BcolzMinuteBarReader,
     BcolzMinuteOverlappingData,
@@ -233,6 +241,26 @@ class BcolzMinuteBarTestCase(TestCase):
 
         assert_almost_equal(0, volume_price)
 
+    def test_write_non_market_minute(self):
+        market_open = self.market_opens[self.test_calendar_start]
+        sid = 1
+        for minute in (market_open - timedelta(minutes=1),
+                       market_open + timedelta(
+                           minutes=US_EQUITIES_MINUTES_PER_DAY)):
+            data = DataFrame(
+                data={
+                    'open': [10.0, 11.0],
+                    'high': [20.0, 21.0],
+                    'low': [30.0, 31.0],
+                    'close': [40.0, 41.0],
+                    'volume': [50.0, 51.0]
+                },
+                index=[market_open, minute])
+            with self.assertRaises(KeyError):
+                self.writer.write(sid, data)
+            # None of the bars are written.
+            self.assertFalse(os.path.exists(self.writer.sidpath(sid)))
+
     def test_write_on_multiple_days(self):
 
         tds = self.market_opens.index
@@ -548,3 +576,550 @@ class BcolzMinuteBarTestCase(TestCase):
         for i, col in enumerate(columns):
             for j, sid in enumerate(sids):
                 assert_almost_equal(data[sid][col], arrays[i][j])
+
+    def test_get_values(self):
+        """
+        Test looking up values for many sids at a single minute.
+        """
+        start_minute = self.market_opens[TEST_CALENDAR_START]
+        minutes = [start_minute,
+                   start_minute + Timedelta('1 min'),
+                   start_minute + Timedelta('2 min')]
+        data_1 = DataFrame(
+            data={
+                'open': [15.0, nan, 15.1],
+                'high': [17.0, nan, 17.1],
+                'low': [11.0, nan, 11.1],
+                'close': [14.0, nan, 14.1],
+                'volume': [1000, 0, 1001]
+            },
+            index=minutes)
+        self.writer.write(1, data_1)
+
+        data_2 = DataFrame(
+            data={
+                'open': [25.0, 25.05, nan],
+                'high': [27.0, 27.05, nan],
+                'low': [21.0, 21.05, nan],
+                'close': [24.0, 24.05, nan],
+                'volume': [2000, 2005, 0]
+            },
+            index=minutes)
+        self.writer.write(2, data_2)
+
+        reader = BcolzMinuteBarReader(self.dest)
+        columns = ['open', 'high', 'low', 'close', 'volume']
+        sids = [2, 1]
+        for minute in minutes:
+            values = reader.get_values(sids, minute, columns)
+            for i, col in enumerate(columns):
+                expected = array([
+                    reader.get_value(sid, minute, col) for sid in sids
+                ])
+                assert_almost_equal(expected, values[i])
+            self.assertEqual(values[-1].dtype, uint32)
+
+        # Neither sid has data written through the next day, so both read as
+        # not having traded.
+        next_open = self.market_opens.iloc[1]
+        open_, volume = reader.get_values(sids, next_open, ['open', 'volume'])
+        assert_almost_equal(open_, [nan, nan])
+        assert_array_equal(volume, [0, 0])
+
+    def test_get_last_traded_value(self):
+        sid = 1
+        minute_0 = self.market_opens[self.test_calendar_start]
+        minute_1 = minute_0 + timedelta(minutes=5)
+        data = DataFrame(
+            data={
+                'open': [10.0, 11.0],
+                'high': [20.0, 21.0],
+                'low': [30.0, 31.0],
+                'close': [40.0, 41.0],
+                'volume': [50.0, 51.0]
+            },
+            index=[minute_0, minute_1])
+        self.writer.write(sid, data)
+        # Pad through a later day, so that the last trade is forward-filled
+        # across the zero-filled days.
+        pad_date = self.market_opens.index[3]
+        self.writer.pad(sid, pad_date)
+
+        before_trade = minute_0 + timedelta(minutes=3)
+        self.assertEqual(
+            10.0, self.reader.get_last_traded_value(sid, before_trade, 'open'))
+        self.assertEqual(
+            50, self.reader.get_last_traded_value(sid, before_trade, 'volume'))
+        self.assertEqual(
+            minute_0, self.reader.get_last_traded_dt(sid, before_trade))
+
+        later = self.market_opens[pad_date] + timedelta(minutes=100)
+        self.assertEqual(
+            41.0, self.reader.get_last_traded_value(sid, later, 'close'))
+        self.assertEqual(
+            minute_1, self.reader.get_last_traded_dt(sid, later))
+
+        # After the end of the written data.
+        after_output = self.market_opens.iloc[-1]
+        self.assertEqual(
+            41.0,
+            self.reader.get_last_traded_value(sid, after_output, 'close'),
+        )
+
+    def test_get_last_traded_value_before_first_trade(self):
+        sid = 1
+        minute = self.market_opens.iloc[1]
+        data = DataFrame(
+            data={
+                'open': [10.0],
+                'high': [20.0],
+                'low': [30.0],
+                'close': [40.0],
+                'volume': [50.0]
+            },
+            index=[minute])
+        self.writer.write(sid, data)
+
+        before = self.market_opens.iloc[0]
+        assert_almost_equal(
+            nan, self.reader.get_last_traded_value(sid, before, 'close'))
+        self.assertEqual(
+            0, self.reader.get_last_traded_value(sid, before, 'volume'))
+        self.assertIs(NaT, self.reader.get_last_traded_dt(sid, before))
+
+    def test_get_last_traded_value_without_last_traded_column(self):
+        """
+        Test that tables written before the 'last_traded' column was added
+        are scanned, and that the column's absence is only checked when the
+        carray would be opened.
+        """
+        sid = 1
+        minute = self.market_opens.iloc[0] + Timedelta(minutes=5)
+        data = DataFrame(
+            data={
+                'open': [10.0],
+                'high': [20.0],
+                'low': [30.0],
+                'close': [40.0],
+                'volume': [50.0]
+            },
+            index=[minute])
+        self.writer.write(sid, data)
+        last_traded_path = self.reader._get_carray_path(sid, 'last_traded')
+        rmtree(last_traded_path)
+
+        later = self.market_opens.iloc[0] + Timedelta(minutes=10)
+        with patch('zipline.data.minute_bars.os.path.exists',
+                   wraps=os.path.exists) as exists:
+            for _ in range(2):
+                self.assertEqual(
+                    minute, self.reader.get_last_traded_dt(sid, later))
+                self.assertEqual(
+                    40.0,
+                    self.reader.get_last_traded_value(sid, later, 'close'),
+                )
+        # bcolz also checks for files while opening the close carray.
+        self.assertEqual(
+            exists.call_args_list.count(call(last_traded_path)), 1,
+        )
+
+    def test_bounded_open_carrays(self):
+        """
+        Test that the reader keeps a bounded number of carrays open and serves
+        repeated reads from a shared chunk cache.
+        """
+        minute = self.market_opens[TEST_CALENDAR_START]
+        sids = [1, 2, 3]
+        for sid in sids:
+            data = DataFrame(
+                data={
+                    'open': [10.0 + sid],
+                    'high': [20.0 + sid],
+                    'low': [5.0 + sid],
+                    'close': [15.0 + sid],
+                    'volume': [100 * sid],
+                },
+                index=[minute])
+            self.writer.write(sid, data)
+
+        chunk_cache = ChunkCache()
+        reader = BcolzMinuteBarReader(
+            self.dest,
+            chunk_cache=chunk_cache,
+            max_open_carrays=2,
+        )
+        self.assertIs(reader.chunk_cache, chunk_cache)
+
+        for sid in sids:
+            self.assertEqual(
+                15.0 + sid, reader.get_value(sid, minute, 'close'))
+            self.assertLessEqual(len(reader._carrays), 2)
+        self.assertEqual(chunk_cache.misses, len(sids))
+        self.assertEqual(chunk_cache.hits, 0)
+
+        # A second reader sharing the cache doesn't decompress again.
+        other = BcolzMinuteBarReader(self.dest, chunk_cache=chunk_cache)
+        for sid in sids:
+            self.assertEqual(
+                15.0 + sid, other.get_value(sid, minute, 'close'))
+        self.assertEqual(chunk_cache.misses, len(sids))
+        self.assertEqual(chunk_cache.hits, len(sids))
+
+    def test_unadjusted_minutes_threaded(self):
+        """
+        Test that reading a window across many threads matches reading it on
+        the calling thread.
+        """
+        start_minute = self.market_opens[TEST_CALENDAR_START]
+        minutes = [start_minute + Timedelta(minutes=i) for i in range(5)]
+        sids = list(range(1, 8))
+        for sid in sids:
+            prices = [
+                nan if (sid + i) % 3 == 0 else 10.0 * sid + i
+                for i in range(5)
+            ]
+            data = DataFrame(
+                data={
+                    'open': prices,
+                    'high': prices,
+                    'low': prices,
+                    'close': prices,
+                    'volume': [
+                        0 if price != price else 100 * sid
+                        for price in prices
+                    ],
+                },
+                index=minutes)
+            self.writer.write(sid, data)
+
+        columns = ['open', 'high', 'low', 'close', 'volume']
+        # Request the sids out of order to exercise the row placement.
+        sids = sids[::-1]
+        expected = BcolzMinuteBarReader(self.dest).unadjusted_window(
+            columns, minutes[0], minutes[-1], sids)
+        reader = BcolzMinuteBarReader(self.dest, num_threads=3)
+        arrays = reader.unadjusted_window(
+            columns, minutes[0], minutes[-1], sids)
+
+        for col, result, expected_result in zip(columns, arrays, expected):
+            self.assertEqual(result.dtype, expected_result.dtype)
+            assert_almost_equal(result, expected_result)
+        self.assertEqual(arrays[-1].dtype, uint32)
+        assert_almost_equal(arrays[0][-1], [10.0, 11.0, nan, 13.0, 14.0])
+
+    def test_unadjusted_window_across_chunks(self):
+        """
+        Test reading a window which spans a chunk boundary, and extends past
+        the end of one of the sids' carrays.
+        """
+        dest = self.dir_.getpath('small_chunks')
+        os.makedirs(dest)
+        writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            dest,
+            self.market_opens,
+            self.market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+            expectedlen=10,
+        )
+        minutes = DatetimeIndex([
+            market_open + Timedelta(minutes=i)
+            for market_open in self.market_opens[:12]
+            for i in range(US_EQUITIES_MINUTES_PER_DAY)
+        ])
+        values = arange(1, len(minutes) + 1, dtype=float)
+        data = DataFrame(
+            data={
+                'open': values,
+                'high': values,
+                'low': values,
+                'close': values,
+                'volume': values,
+            },
+            index=minutes)
+        writer.write(1, data)
+        # Sid 2 stops trading before the end of the window.
+        sid_2_minutes = 11 * US_EQUITIES_MINUTES_PER_DAY
+        writer.write(2, data.iloc[:sid_2_minutes])
+
+        reader = BcolzMinuteBarReader(dest)
+        chunklen = reader._open_minute_file('open', 1).chunklen
+        self.assertLess(chunklen, sid_2_minutes)
+
+        start = chunklen - 10
+        open_, volume = reader.unadjusted_window(
+            ['open', 'volume'], minutes[start], minutes[-1], [2, 1])
+
+        assert_almost_equal(open_[1], values[start:])
+        assert_almost_equal(open_[0, :sid_2_minutes - start],
+                            values[start:sid_2_minutes])
+        assert_almost_equal(open_[0, sid_2_minutes - start:], nan)
+        assert_array_equal(volume[1], values[start:])
+        assert_array_equal(volume[0, :sid_2_minutes - start],
+                           values[start:sid_2_minutes])
+        assert_array_equal(volume[0, sid_2_minutes - start:], 0)
+
+    def test_find_position_of_minute(self):
+        reader = BcolzMinuteBarReader(self.dest)
+        minutes = []
+        for market_open in self.market_opens:
+            minutes.extend(
+                market_open + Timedelta(minutes=i)
+                for i in range(US_EQUITIES_MINUTES_PER_DAY)
+            )
+        minutes = DatetimeIndex(minutes)
+
+        for pos in [0, 1, 389, 390, 391, len(minutes) - 1]:
+            self.assertEqual(
+                pos, reader._find_position_of_minute(minutes[pos]))
+        assert_array_equal(
+            reader._find_positions_of_minutes(minutes),
+            arange(len(minutes)),
+        )
+
+        first_open = self.market_opens[TEST_CALENDAR_START]
+        for minute in [first_open - Timedelta(minutes=1),
+                       first_open + Timedelta(
+                           minutes=US_EQUITIES_MINUTES_PER_DAY),
+                       first_open + Timedelta(seconds=30)]:
+            with self.assertRaises(KeyError):
+                reader._find_position_of_minute(minute)
+        with self.assertRaises(KeyError):
+            reader._find_positions_of_minutes(
+                [first_open, first_open - Timedelta(minutes=1)])
+
+    def test_read_metadata_with_minute_index(self):
+        """
+        Test reading metadata written before minutes_per_day was stored.
+        """
+        metadata = BcolzMinuteBarMetadata.read(self.dest)
+        path = BcolzMinuteBarMetadata.metadata_path(self.dest)
+        with open(path) as fp:
+            raw_data = json.load(fp)
+        del raw_data['minutes_per_day']
+        raw_data['minute_index'] = [0] * (
+            len(self.market_opens) * US_EQUITIES_MINUTES_PER_DAY
+        )
+        with open(path, 'w') as fp:
+            json.dump(raw_data, fp)
+
+        legacy = BcolzMinuteBarMetadata.read(self.dest)
+        self.assertEqual(legacy.minutes_per_day, US_EQUITIES_MINUTES_PER_DAY)
+        assert_array_equal(
+            legacy.market_opens.values,
+            metadata.market_opens.values,
+        )
+
+    def test_metadata_minute_index_argument(self):
+        """
+        Test constructing metadata with the positional arguments used before
+        minutes_per_day was stored.
+        """
+        market_opens = self.market_opens.iloc[:3]
+        market_closes = market_opens + Timedelta(
+            minutes=US_EQUITIES_MINUTES_PER_DAY - 1,
+        )
+        minute_index = [0] * (len(market_opens) * US_EQUITIES_MINUTES_PER_DAY)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            metadata = BcolzMinuteBarMetadata(
+                self.test_calendar_start,
+                minute_index,
+                market_opens,
+                market_closes,
+                1000,
+            )
+        self.assertEqual(
+            [warning.category for warning in w], [DeprecationWarning],
+        )
+        self.assertIs(metadata.market_opens, market_opens)
+        self.assertIs(metadata.market_closes, market_closes)
+        self.assertEqual(metadata.ohlc_ratio, 1000)
+        self.assertEqual(metadata.minutes_per_day, US_EQUITIES_MINUTES_PER_DAY)
+
+        with self.assertRaises(TypeError):
+            BcolzMinuteBarMetadata(
+                self.test_calendar_start,
+                None,
+                market_opens,
+                market_closes,
+                1000,
+            )
+
+    def _make_bulk_data(self, sids):
+        days = self.market_opens.index[:3]
+        data = []
+        for sid in sids:
+            # Each sid starts trading on a different day, so that some are
+            # zero-filled before their first input day.
+            day = days[sid % len(days)]
+            minutes = DatetimeIndex([
+                self.market_opens[day] + Timedelta(minutes=i)
+                for i in (0, 1, 389)
+            ])
+            data.append((sid, DataFrame(
+                data={
+                    'open': [10.0 + sid, 11.0 + sid, nan],
+                    'high': [20.0 + sid, 21.0 + sid, nan],
+                    'low': [5.0 + sid, 6.0 + sid, nan],
+                    'close': [15.0 + sid, 16.0 + sid, nan],
+                    'volume': [100 * sid, 101 * sid, 0],
+                },
+                index=minutes,
+            )))
+        return data
+
+    def test_write_many(self):
+        sids = list(range(1, 9))
+        data = self._make_bulk_data(sids)
+
+        stats = self.writer.write_many(iter(data), processes=2)
+        self.assertEqual(stats.sids, len(sids))
+        self.assertEqual(stats.bars, 3 * len(sids))
+
+        serial_dest = self.dir_.getpath('serial_minute_bars')
+        os.makedirs(serial_dest)
+        serial_writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            serial_dest,
+            self.market_opens,
+            self.market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+        )
+        for sid, df in data:
+            serial_writer.write(sid, df)
+
+        reader = BcolzMinuteBarReader(self.dest)
+        serial_reader = BcolzMinuteBarReader(serial_dest)
+        columns = ['open', 'high', 'low', 'close', 'volume']
+        start = self.market_opens[self.market_opens.index[0]]
+        end = self.market_opens[self.market_opens.index[2]] + Timedelta(
+            minutes=US_EQUITIES_MINUTES_PER_DAY - 1)
+        results = reader.unadjusted_window(columns, start, end, sids)
+        expected = serial_reader.unadjusted_window(columns, start, end, sids)
+        for result, expected_result in zip(results, expected):
+            assert_almost_equal(result, expected_result)
+
+        for sid, df in data:
+            self.assertEqual(
+                df.close.iloc[1],
+                reader.get_value(sid, df.index[1], 'close'),
+            )
+            self.assertEqual(
+                self.writer.last_date_in_output_for_sid(sid),
+                df.index[0].normalize(),
+            )
+
+    def test_write_many_in_process(self):
+        data = self._make_bulk_data([1, 2])
+        stats = self.writer.write_many(data, processes=1)
+        self.assertEqual((stats.sids, stats.bars), (2, 6))
+        for sid, df in data:
+            self.assertEqual(
+                df.open.iloc[0],
+                self.reader.get_value(sid, df.index[0], 'open'),
+            )
+
+    @parameterized.expand([(1,), (2,)])
+    def test_write_many_repeated_sid(self, processes):
+        data = self._make_bulk_data([1, 2, 1])
+        with self.assertRaises(ValueError):
+            self.writer.write_many(iter(data), processes=processes)
+
+    def test_write_many_malformed_frame(self):
+        data = self._make_bulk_data([1, 2])
+        data.append((3, data[0][1].drop('close', axis=1)))
+        with self.assertRaises(AttributeError):
+            self.writer.write_many(iter(data), processes=2)
+
+    def test_partitioned_by_month(self):
+        all_market_opens = self.env.open_and_closes.market_open
+        all_market_closes = self.env.open_and_closes.market_close
+        indexer = all_market_opens.index.slice_indexer(
+            start=TEST_CALENDAR_START,
+            end=Timestamp('2015-07-31', tz='UTC'),
+        )
+        market_opens = all_market_opens[indexer]
+        market_closes = all_market_closes[indexer]
+        dest = self.dir_.getpath('partitioned_minute_bars')
+        os.makedirs(dest)
+        writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            dest,
+            market_opens,
+            market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+            partition_by='month',
+        )
+
+        june_minute = market_opens[Timestamp('2015-06-30', tz='UTC')]
+        july_minute = market_opens[Timestamp('2015-07-01', tz='UTC')] + \
+            Timedelta(minutes=1)
+        minutes = DatetimeIndex([june_minute, july_minute])
+        data = DataFrame(
+            data={
+                'open': [10.0, 11.0],
+                'high': [20.0, 21.0],
+                'low': [30.0, 31.0],
+                'close': [40.0, 41.0],
+                'volume': [50.0, 51.0]
+            },
+            index=minutes)
+        writer.write(1, data)
+        # sid 2 only trades in July, so it has no data in June.
+        writer.write(2, data.iloc[1:])
+
+        self.assertEqual(
+            sorted(os.listdir(dest)),
+            ['2015-06', '2015-07', 'metadata.json'],
+        )
+        self.assertTrue(os.path.exists(writer.sidpath(1, '2015-06')))
+        self.assertFalse(os.path.exists(writer.sidpath(2, '2015-06')))
+        self.assertEqual(
+            writer.last_date_in_output_for_sid(1),
+            Timestamp('2015-07-01', tz='UTC'),
+        )
+
+        reader = BcolzMinuteBarReader(dest)
+        self.assertEqual(10.0, reader.get_value(1, june_minute, 'open'))
+        self.assertEqual(11.0, reader.get_value(1, july_minute, 'open'))
+        self.assertEqual(11.0, reader.get_value(2, july_minute, 'open'))
+        assert_almost_equal(
+            nan, reader.get_value(2, june_minute, 'open'))
+
+        # A window spanning both partitions.
+        open_, volume = reader.unadjusted_window(
+            ['open', 'volume'], june_minute, july_minute, [1, 2])
+        self.assertEqual(open_.shape, (2, US_EQUITIES_MINUTES_PER_DAY + 2))
+        assert_almost_equal(open_[0, [0, -1]], [10.0, 11.0])
+        assert_almost_equal(open_[1, [0, -1]], [nan, 11.0])
+        assert_almost_equal(volume[:, -1], [51, 51])
+
+        # Sid 1's last trade before the July open is in the June partition.
+        july_open = market_opens[Timestamp('2015-07-01', tz='UTC')]
+        self.assertEqual(
+            40.0, reader.get_last_traded_value(1, july_open, 'close'))
+        self.assertEqual(
+            june_minute, reader.get_last_traded_dt(1, july_open))
+        assert_almost_equal(
+            nan, reader.get_last_traded_value(2, july_open, 'close'))
+
+        # Appending to July only touches the July partition.
+        june_path = writer.sidpath(1, '2015-06')
+        june_len = len(bcolz.ctable(rootdir=june_path, mode='r'))
+        writer.write(1, DataFrame(
+            data={
+                'open': [12.0],
+                'high': [22.0],
+                'low': [32.0],
+                'close': [42.0],
+                'volume': [52.0],
+            },
+            index=[market_opens[Timestamp('2015-07-02', tz='UTC')]]))
+        self.assertEqual(
+            june_len,
+            len(bcolz.ctable(rootdir=june_path, mode='r')),
+        )
+
+        with self.assertRaises(BcolzMinuteOverlappingData):
+            writer.write(1, data.iloc[:1])
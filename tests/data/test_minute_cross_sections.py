@@ -0,0 +1,145 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import timedelta
+import os
+from unittest import TestCase
+
+from numpy import array, nan
+from numpy.testing import assert_almost_equal, assert_array_equal
+from pandas import DataFrame, Timestamp
+from testfixtures import TempDirectory
+
+from zipline.data.minute_bars import (
+    BcolzMinuteBarReader,
+    BcolzMinuteBarWriter,
+    US_EQUITIES_MINUTES_PER_DAY,
+)
+from zipline.data.minute_cross_sections import CrossSectionalMinuteBarWriter
+from zipline.finance.trading import TradingEnvironment
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+
+class CrossSectionalMinuteBarTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.env = TradingEnvironment()
+        all_market_opens = cls.env.open_and_closes.market_open
+        all_market_closes = cls.env.open_and_closes.market_close
+        indexer = all_market_opens.index.slice_indexer(
+            start=TEST_CALENDAR_START,
+            end=TEST_CALENDAR_STOP
+        )
+        cls.market_opens = all_market_opens[indexer]
+        cls.market_closes = all_market_closes[indexer]
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+        minute_dest = self.dir_.getpath('minute_bars')
+        os.makedirs(minute_dest)
+        writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            minute_dest,
+            self.market_opens,
+            self.market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+        )
+
+        # Sid 3 only trades on the first day; sid 1 trades on the first day
+        # and in the third week, which is in a later block.
+        first_open = self.market_opens.iloc[0]
+        later_open = self.market_opens.iloc[12]
+        self.minutes = [
+            first_open,
+            first_open + timedelta(minutes=1),
+            later_open + timedelta(minutes=5),
+        ]
+        writer.write(1, DataFrame(
+            {
+                'open': [10.0, 11.0, 12.0],
+                'high': [20.0, 21.0, 22.0],
+                'low': [30.0, 31.0, 32.0],
+                'close': [40.0, 41.0, 42.0],
+                'volume': [50, 51, 52],
+            },
+            index=self.minutes,
+        ))
+        writer.write(3, DataFrame(
+            {
+                'open': [13.0],
+                'high': [23.0],
+                'low': [33.0],
+                'close': [43.0],
+                'volume': [53],
+            },
+            index=self.minutes[1:2],
+        ))
+        self.minute_reader = BcolzMinuteBarReader(minute_dest)
+        self.reader = CrossSectionalMinuteBarWriter(
+            self.dir_.getpath('cross_sections'),
+            block_days=5,
+        ).write_from_bcolz(self.minute_reader, [3, 1])
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def test_sids(self):
+        assert_array_equal(self.reader.sids, [1, 3])
+
+    def test_get_cross_section(self):
+        opens, volumes = self.reader.get_cross_section(
+            self.minutes[1], ['open', 'volume'],
+        )
+        assert_almost_equal(opens, [11.0, 13.0])
+        assert_array_equal(volumes, [51, 53])
+
+        opens, volumes = self.reader.get_cross_section(
+            self.minutes[2], ['open', 'volume'],
+        )
+        assert_almost_equal(opens, [12.0, nan])
+        assert_array_equal(volumes, [52, 0])
+
+    def test_get_cross_sections_matches_minute_reader(self):
+        start_dt = self.minutes[0]
+        end_dt = self.minutes[2] + timedelta(minutes=10)
+        fields = ['open', 'high', 'low', 'close', 'volume']
+
+        cross_sections = self.reader.get_cross_sections(
+            start_dt, end_dt, fields,
+        )
+        expected = self.minute_reader.unadjusted_window(
+            fields, start_dt, end_dt, [1, 3],
+        )
+        for field, actual, window in zip(fields, cross_sections, expected):
+            assert_almost_equal(actual, window.T, err_msg=field)
+
+    def test_invalid_minute(self):
+        after_close = self.market_opens.iloc[0] + timedelta(
+            minutes=US_EQUITIES_MINUTES_PER_DAY,
+        )
+        with self.assertRaises(KeyError):
+            self.reader.get_cross_section(after_close, ['close'])
+
+    def test_blocks_are_minute_major(self):
+        opens = self.reader._block('open', 0)
+        self.assertEqual(
+            opens.shape,
+            (5 * US_EQUITIES_MINUTES_PER_DAY, 2),
+        )
+        self.assertTrue(opens.flags.c_contiguous)
+        assert_array_equal(opens[1], array([11000, 13000]))
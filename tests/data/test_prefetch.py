@@ -0,0 +1,129 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import timedelta
+import os
+from unittest import TestCase
+
+from pandas import DataFrame, Timestamp
+from testfixtures import TempDirectory
+
+from zipline.data.chunk_cache import ChunkCache
+from zipline.data.minute_bars import (
+    BcolzMinuteBarReader,
+    BcolzMinuteBarWriter,
+    US_EQUITIES_MINUTES_PER_DAY,
+)
+from zipline.data.prefetch import SessionPrefetcher
+from zipline.finance.trading import TradingEnvironment
+
+TEST_CALENDAR_START = Timestamp('2015-06-01', tz='UTC')
+TEST_CALENDAR_STOP = Timestamp('2015-06-30', tz='UTC')
+
+
+class SessionPrefetcherTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.env = TradingEnvironment()
+        all_market_opens = cls.env.open_and_closes.market_open
+        all_market_closes = cls.env.open_and_closes.market_close
+        indexer = all_market_opens.index.slice_indexer(
+            start=TEST_CALENDAR_START,
+            end=TEST_CALENDAR_STOP
+        )
+        cls.market_opens = all_market_opens[indexer]
+        cls.market_closes = all_market_closes[indexer]
+        cls.sessions = cls.market_opens.index
+
+    def setUp(self):
+        self.dir_ = TempDirectory()
+        self.dir_.create()
+        dest = self.dir_.getpath('minute_bars')
+        os.makedirs(dest)
+        writer = BcolzMinuteBarWriter(
+            TEST_CALENDAR_START,
+            dest,
+            self.market_opens,
+            self.market_closes,
+            US_EQUITIES_MINUTES_PER_DAY,
+        )
+        for sid in (1, 2):
+            minutes = [
+                self.market_opens[session] + timedelta(minutes=5)
+                for session in self.sessions
+            ]
+            writer.write(sid, DataFrame(
+                {
+                    'open': [10.0] * len(minutes),
+                    'high': [20.0] * len(minutes),
+                    'low': [30.0] * len(minutes),
+                    'close': [40.0] * len(minutes),
+                    'volume': [50.0] * len(minutes),
+                },
+                index=minutes,
+            ))
+        self.cache = ChunkCache()
+        self.reader = BcolzMinuteBarReader(dest, chunk_cache=self.cache)
+
+    def tearDown(self):
+        self.dir_.cleanup()
+
+    def test_prefetch_next_sessions(self):
+        with SessionPrefetcher(self.reader,
+                               self.sessions,
+                               fields=['close'],
+                               sessions_ahead=2) as prefetcher:
+            prefetcher.advance(self.sessions[0], [1, 2])
+            prefetcher.wait()
+            self.assertEqual(
+                list(prefetcher._pending),
+                list(self.sessions[1:3]),
+            )
+
+            misses = self.cache.misses
+            for session in self.sessions[1:3]:
+                minute = self.market_opens[session] + timedelta(minutes=5)
+                self.assertEqual(
+                    self.reader.get_value(1, minute, 'close'), 40.0,
+                )
+                self.assertEqual(
+                    self.reader.get_value(2, minute, 'close'), 40.0,
+                )
+            # Everything read was prefetched.
+            self.assertEqual(self.cache.misses, misses)
+
+            # Advancing only schedules the session that is not yet pending.
+            prefetcher.advance(self.sessions[1], [1, 2])
+            self.assertEqual(
+                list(prefetcher._pending),
+                list(self.sessions[2:4]),
+            )
+
+    def test_prefetch_unknown_sid(self):
+        with SessionPrefetcher(self.reader,
+                               self.sessions,
+                               fields=['close']) as prefetcher:
+            # A sid without data does not stop the others from being read.
+            prefetcher.advance(self.sessions[0], [3, 1])
+            prefetcher.wait()
+
+        misses = self.cache.misses
+        minute = self.market_opens[self.sessions[1]]
+        self.reader.get_value(1, minute, 'close')
+        self.assertEqual(self.cache.misses, misses)
+
+    def test_invalid_sessions_ahead(self):
+        with self.assertRaises(ValueError):
+            SessionPrefetcher(self.reader, self.sessions, sessions_ahead=0)
@@ -18,6 +18,7 @@ from nose_parameterized import parameterized
 from numpy import (
     arange,
     datetime64,
+    nan,
 )
 from numpy.testing import (
     assert_array_equal,
@@ -27,7 +28,7 @@ from pandas import (
     DatetimeIndex,
     Timestamp,
 )
-from pandas.util.testing import assert_index_equal
+from pandas.util.testing import assert_frame_equal, assert_index_equal
 from testfixtures import TempDirectory
 
 from zipline.pipeline.loaders.synthetic import (
@@ -35,7 +36,8 @@ from zipline.pipeline.loaders.synthetic import (
 )
 from zipline.data.us_equity_pricing import (
     BcolzDailyBarReader,
-    NoDataOnDate
+    NoDataOnDate,
+    SQLiteAdjustmentWriter,
 )
 from zipline.finance.trading import TradingEnvironment
 from zipline.pipeline.data import USEquityPricing
@@ -210,6 +212,36 @@ class BcolzDailyBarTestCase(TestCase):
             TEST_QUERY_STOP,
         )
 
+    def test_read_across_chunks(self):
+        """
+        Test that reads spanning many small compressed chunks only gather the
+        requested rows, regardless of the order of the requested assets.
+        """
+        table = self.writer.write(self.dest, self.trading_days, self.assets)
+        chunked = table.copy(
+            rootdir=self.dir_.getpath('chunked.bcolz'),
+            chunklen=3,
+        )
+        for key, value in table.attrs:
+            chunked.attrs[key] = value
+        self.assertGreater(len(chunked['close'].chunks), 1)
+
+        reader = BcolzDailyBarReader(chunked)
+        columns = [USEquityPricing.close, USEquityPricing.volume]
+        assets = self.assets[::-1]
+        results = reader.load_raw_arrays(
+            columns,
+            TEST_QUERY_START,
+            TEST_QUERY_STOP,
+            assets,
+        )
+        dates = self.trading_days_between(TEST_QUERY_START, TEST_QUERY_STOP)
+        for column, result in zip(columns, results):
+            assert_array_equal(
+                result,
+                self.writer.expected_values_2d(dates, assets, column.name),
+            )
+
     def test_start_on_asset_start(self):
         """
         Test loading with queries that starts on the first day of each asset's
@@ -317,7 +349,98 @@ class BcolzDailyBarTestCase(TestCase):
         # Write a zero into the synthetic pricing data at the day and sid,
         # so that a read should now return -1.
         # This a little hacky, in lieu of changing the synthetic data set.
-        reader._spot_col('close')[zero_ix] = 0
+        table['close'][zero_ix] = 0
+        table.flush()
+        reader = BcolzDailyBarReader(table)
 
         close = reader.spot_price(zero_sid, zero_day, 'close')
         self.assertEqual(-1, close)
+
+    def test_spot_prices(self):
+        table = self.writer.write(self.dest, self.trading_days, self.assets)
+        reader = BcolzDailyBarReader(table)
+
+        # Write a zero so that the corresponding entry should be -1.
+        zero_day = Timestamp('2015-06-02', tz='UTC')
+        table['close'][reader.sid_day_index(1, zero_day)] = 0
+        table.flush()
+        reader = BcolzDailyBarReader(table)
+
+        sids = self.assets[::-1]
+        colnames = ['open', 'close', 'volume']
+        for day in self.trading_days:
+            results = reader.spot_prices(sids, day, colnames)
+            for colname, result in zip(colnames, results):
+                expected = []
+                for sid in sids:
+                    try:
+                        expected.append(reader.spot_price(sid, day, colname))
+                    except NoDataOnDate:
+                        expected.append(nan)
+                assert_array_equal(result, expected)
+
+    def test_spot_prices_at(self):
+        table = self.writer.write(self.dest, self.trading_days, self.assets)
+        reader = BcolzDailyBarReader(table)
+
+        # Write a zero so that the corresponding entry should be -1.
+        zero_day = Timestamp('2015-06-02', tz='UTC')
+        table['close'][reader.sid_day_index(1, zero_day)] = 0
+        table.flush()
+        reader = BcolzDailyBarReader(table)
+
+        sids = []
+        days = []
+        for day in self.trading_days:
+            for sid in self.assets:
+                sids.append(sid)
+                days.append(day)
+        # A day off the calendar has no data.
+        sids.append(self.assets[0])
+        days.append(Timestamp('2015-06-06', tz='UTC'))
+
+        for colname in 'open', 'close', 'volume':
+            expected = []
+            for sid, day in zip(sids, days):
+                try:
+                    expected.append(reader.spot_price(sid, day, colname))
+                except (KeyError, NoDataOnDate):
+                    expected.append(nan)
+            assert_array_equal(
+                reader.spot_prices_at(sids, days, colname),
+                expected,
+            )
+
+    def test_dividend_ratios_spot_price_only_reader(self):
+        table = self.writer.write(self.dest, self.trading_days, self.assets)
+        reader = BcolzDailyBarReader(table)
+
+        class SpotPriceOnlyReader(object):
+            def spot_price(self, sid, day, colname):
+                return reader.spot_price(sid, day, colname)
+
+        dividends = DataFrame({
+            'sid': [1, 2, 3, 5],
+            'ex_date': DatetimeIndex(
+                ['2015-06-08', '2015-06-15', '2015-06-11', '2015-06-16'],
+            ),
+            'amount': [0.5, 1.0, 1.0, 0.25],
+        })
+        expected = SQLiteAdjustmentWriter(
+            ':memory:', self.trading_days, reader,
+        ).calc_dividend_ratios(dividends)
+        # Sid 2 has no close before its ex date.
+        self.assertEqual(len(expected), 3)
+
+        assert_frame_equal(
+            SQLiteAdjustmentWriter(
+                ':memory:', self.trading_days, SpotPriceOnlyReader(),
+            ).calc_dividend_ratios(dividends),
+            expected,
+        )
+
+    def test_spot_prices_unknown_sid(self):
+        table = self.writer.write(self.dest, self.trading_days, self.assets)
+        reader = BcolzDailyBarReader(table)
+        with self.assertRaises(KeyError):
+            reader.spot_prices([1, 7], self.trading_days[0], ['close'])
@@ -9,7 +9,9 @@ from nose_parameterized import parameterized
 from numpy import (
     arange,
     array,
+    datetime64,
     full,
+    may_share_memory,
     where,
 )
 from numpy.testing import assert_array_equal
@@ -18,8 +20,10 @@ from six.moves import zip_longest
 from zipline.errors import WindowLengthNotPositive, WindowLengthTooLong
 from zipline.lib.adjustment import (
     Datetime64Overwrite,
+    Float64Add,
     Float64Multiply,
     Float64Overwrite,
+    PackedAdjustments,
 )
 from zipline.lib.adjusted_array import AdjustedArray, NOMASK
 from zipline.testing import check_arrays, parameter_space
@@ -317,6 +321,167 @@ class AdjustedArrayTestCase(TestCase):
                 self.assertEqual(yielded.dtype, data.dtype)
                 assert_array_equal(yielded, expected_yield)
 
+    @parameterized.expand(
+        chain(
+            _gen_multiplicative_adjustment_cases(float64_dtype),
+            _gen_overwrite_adjustment_cases(float64_dtype),
+        )
+    )
+    def test_packed_adjustments(self,
+                                name,
+                                data,
+                                lookback,
+                                adjustments,
+                                missing_value,
+                                expected):
+        packed = PackedAdjustments.from_dict(adjustments)
+        self.assertEqual(packed.to_dict(), adjustments)
+
+        array = AdjustedArray(data, NOMASK, packed, missing_value)
+        for _ in range(2):  # Iterate 2x ensure adjusted_arrays are re-usable.
+            window_iter = array.traverse(lookback)
+            for yielded, expected_yield in zip_longest(window_iter, expected):
+                assert_array_equal(yielded, expected_yield)
+
+    def test_packed_matches_dict(self):
+        data = arange(30, dtype=float).reshape(6, 5)
+        adjustments = {
+            1: [Float64Multiply(0, 1, 0, 4, 2.0),
+                Float64Add(0, 1, 2, 2, 1.0)],
+            3: [Float64Overwrite(2, 3, 1, 3, -1.0)],
+            4: [Float64Add(0, 4, 0, 0, 0.5),
+                Float64Multiply(1, 2, 0, 1, 3.0)],
+        }
+        packed = PackedAdjustments.from_dict(adjustments)
+
+        for window_length in range(1, 7):
+            for expected, packed_window in zip_longest(
+                    AdjustedArray(data, NOMASK, adjustments, float('nan'))
+                    .traverse(window_length),
+                    AdjustedArray(data, NOMASK, packed, float('nan'))
+                    .traverse(window_length)):
+                assert_array_equal(packed_window, expected)
+
+    def test_packed_adjustments_require_float64(self):
+        packed = PackedAdjustments.from_dict(
+            {1: [Float64Multiply(0, 1, 0, 0, 2.0)]},
+        )
+        with self.assertRaises(TypeError):
+            AdjustedArray(
+                arange(25).reshape(5, 5), NOMASK, packed, missing_value=-1,
+            )
+
+        with self.assertRaises(TypeError):
+            PackedAdjustments.from_dict(
+                {1: [Datetime64Overwrite(0, 1, 0, 0, datetime64(0, 'ns'))]},
+            )
+
+    @parameterized.expand(
+        chain(
+            _gen_multiplicative_adjustment_cases(float64_dtype),
+            _gen_overwrite_adjustment_cases(float64_dtype),
+            _gen_overwrite_adjustment_cases(datetime64ns_dtype),
+        )
+    )
+    def test_copy_on_write(self,
+                           name,
+                           data,
+                           lookback,
+                           adjustments,
+                           missing_value,
+                           expected):
+        array = AdjustedArray(data, NOMASK, adjustments, missing_value)
+        original = array.data.copy()
+        for _ in range(2):  # Iterate 2x ensure adjusted_arrays are re-usable.
+            window_iter = array.traverse(lookback, copy_on_write=True)
+            for yielded, expected_yield in zip_longest(window_iter, expected):
+                assert_array_equal(yielded, expected_yield)
+            # Exhausting the iterator restores the data.
+            assert_array_equal(array.data, original)
+
+    def test_concurrent_copy_on_write(self):
+        data = arange(30, dtype=float).reshape(6, 5)
+        adjustments = {
+            1: [Float64Multiply(0, 1, 1, 1, 2.0)],
+            3: [Float64Overwrite(0, 3, 3, 4, -1.0)],
+        }
+        expected = list(
+            AdjustedArray(data, NOMASK, adjustments, float('nan')).traverse(2)
+        )
+
+        array = AdjustedArray(data, NOMASK, adjustments, float('nan'))
+        in_place = array.traverse(2, copy_on_write=True)
+        for _ in range(3):
+            next(in_place)
+
+        # Traversals started while the data is modified in place see the
+        # original data, whether or not they ask to copy on write.
+        for copy_on_write in (False, True):
+            window_iter = array.traverse(2, copy_on_write=copy_on_write)
+            for yielded, expected_yield in zip_longest(window_iter,
+                                                       expected):
+                assert_array_equal(yielded, expected_yield)
+
+        # Closing the first traversal restores the data.
+        in_place.close()
+        assert_array_equal(array.data, data)
+
+    @parameterized.expand(
+        chain(
+            _gen_multiplicative_adjustment_cases(float64_dtype),
+            _gen_overwrite_adjustment_cases(float64_dtype),
+            _gen_overwrite_adjustment_cases(datetime64ns_dtype),
+        )
+    )
+    def test_segments(self,
+                      name,
+                      data,
+                      lookback,
+                      adjustments,
+                      missing_value,
+                      expected):
+        array = AdjustedArray(data, NOMASK, adjustments, missing_value)
+        window_iter = array.traverse(lookback)
+        yielded = []
+        while True:
+            length = window_iter.segment_length()
+            if not length:
+                break
+            rows = window_iter.next_segment(length)
+            self.assertEqual(len(rows), lookback + length - 1)
+            yielded.extend(
+                rows[i:i + lookback].copy() for i in range(length)
+            )
+
+        for yielded_window, expected_window in zip_longest(yielded,
+                                                           expected):
+            assert_array_equal(yielded_window, expected_window)
+
+    def test_segment_stops_at_adjustments(self):
+        data = arange(30, dtype=float).reshape(6, 5)
+        adjustments = {3: [Float64Multiply(0, 3, 0, 0, 2.0)]}
+        window_iter = AdjustedArray(
+            data, NOMASK, adjustments, float('nan'),
+        ).traverse(2)
+
+        # The windows ending on rows 1 and 2 precede the adjustment.
+        self.assertEqual(window_iter.segment_length(), 2)
+        with self.assertRaises(ValueError):
+            window_iter.next_segment(3)
+        assert_array_equal(window_iter.next_segment(2), data[:3])
+
+        self.assertEqual(window_iter.segment_length(), 3)
+        expected = data[2:].copy()
+        expected[:2, 0] *= 2
+        assert_array_equal(window_iter.next_segment(3), expected)
+        self.assertEqual(window_iter.segment_length(), 0)
+
+    def test_no_adjustments_are_not_copied(self):
+        data = arange(30, dtype=float).reshape(6, 5)
+        array = AdjustedArray(data, NOMASK, {}, float('nan'))
+        for window in array.traverse(3):
+            self.assertTrue(may_share_memory(window, array.data))
+
     @parameter_space(
         dtype=[float64_dtype, int64_dtype, datetime64ns_dtype],
         missing_value=[0, 10000],
@@ -12,6 +12,7 @@ from numpy import (
     array,
     full,
     nan,
+    random,
     tile,
     zeros,
     float32,
@@ -46,12 +47,15 @@ from zipline.pipeline.loaders.synthetic import (
     SyntheticDailyBarWriter,
 )
 from zipline.pipeline import Pipeline
+from zipline.pipeline.cache import TermResultCache
 from zipline.pipeline.data import USEquityPricing, DataSet, Column
 from zipline.pipeline.loaders.frame import DataFrameLoader
 from zipline.pipeline.loaders.equity_pricing_loader import (
     USEquityPricingLoader,
 )
 from zipline.pipeline.engine import SimplePipelineEngine
+from zipline.pipeline.graph import TermGraph
+from zipline.pipeline.term import AssetExists
 from zipline.pipeline import CustomFactor
 from zipline.pipeline.factors import (
     AverageDollarVolume,
@@ -60,7 +64,9 @@ from zipline.pipeline.factors import (
     ExponentialWeightedMovingAverage,
     ExponentialWeightedMovingStdDev,
     MaxDrawdown,
+    Returns,
     SimpleMovingAverage,
+    VWAP,
 )
 from zipline.testing import (
     make_rotating_equity_info,
@@ -140,6 +146,22 @@ class RecordingPrecomputedLoader(PrecomputedLoader):
         )
 
 
+class WorkspaceRecordingEngine(SimplePipelineEngine):
+    """
+    SimplePipelineEngine recording the terms in its workspace when it starts
+    computing each term.
+    """
+    def __init__(self, *args, **kwargs):
+        super(WorkspaceRecordingEngine, self).__init__(*args, **kwargs)
+        self.workspaces = {}
+
+    def _compute_term(self, term, workspace, graph, dates, assets):
+        self.workspaces[term] = set(workspace)
+        return super(WorkspaceRecordingEngine, self)._compute_term(
+            term, workspace, graph, dates, assets,
+        )
+
+
 class RollingSumSum(CustomFactor):
     def compute(self, today, assets, out, *inputs):
         assert len(self.inputs) == len(inputs)
@@ -187,6 +209,114 @@ class ConstantInputTestCase(TestCase):
         with self.assertRaisesRegexp(ValueError, msg):
             engine.run_pipeline(p, self.dates[2], self.dates[1])
 
+    @parameterized.expand([(1,), (2,)])
+    def test_workspace_eviction(self, num_threads):
+        loader = self.loader
+        engine = WorkspaceRecordingEngine(
+            lambda column: loader,
+            self.dates,
+            self.asset_finder,
+            num_threads=num_threads,
+        )
+        close = USEquityPricing.close
+        sma = SimpleMovingAverage(inputs=[close], window_length=3)
+        ranked = sma.rank()
+        shifted = ranked + 1
+        reranked = shifted.rank()
+        engine.run_pipeline(
+            Pipeline(columns={'sma': sma, 'reranked': reranked}),
+            self.dates[5],
+            self.dates[10],
+        )
+
+        workspaces = engine.workspaces
+        # Terms are dropped once their last dependent is computed.
+        self.assertIn(close, workspaces[sma])
+        self.assertNotIn(close, workspaces[ranked])
+        self.assertIn(ranked, workspaces[shifted])
+        self.assertNotIn(ranked, workspaces[reranked])
+        # Outputs are kept.
+        self.assertIn(sma, workspaces[reranked])
+
+    def test_precomputed_inputs_are_not_loaded(self):
+        loader = RecordingPrecomputedLoader(
+            constants=self.constants,
+            dates=self.dates,
+            sids=self.asset_ids,
+        )
+        engine = SimplePipelineEngine(
+            lambda column: loader, self.dates, self.asset_finder,
+        )
+        sma = SimpleMovingAverage(
+            inputs=[USEquityPricing.close], window_length=3,
+        )
+        graph = TermGraph({'ranked': sma.rank(method='average')})
+        # The mask has 2 extra rows for the window of `sma`.
+        num_dates, num_assets = len(self.dates), len(self.asset_ids)
+        results = engine.compute_chunk(
+            graph,
+            self.dates,
+            Int64Index(self.asset_ids),
+            initial_workspace={
+                AssetExists(): full((num_dates, num_assets), True),
+                sma: full((num_dates - 2, num_assets), 1.0),
+            },
+        )
+
+        self.assertEqual(loader.load_calls, [])
+        assert_almost_equal(
+            results['ranked'], full((num_dates - 2, num_assets), 2.0),
+        )
+
+    def test_result_cache(self):
+        temp_dir = TempDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        result_cache = TermResultCache(temp_dir.path)
+
+        def run_pipeline(data_version, end_date=self.dates[10]):
+            loader = RecordingPrecomputedLoader(
+                constants=self.constants,
+                dates=self.dates,
+                sids=self.asset_ids,
+            )
+            loader.data_version = data_version
+            engine = SimplePipelineEngine(
+                lambda column: loader,
+                self.dates,
+                self.asset_finder,
+                result_cache=result_cache,
+            )
+            sma = SimpleMovingAverage(
+                inputs=[USEquityPricing.close], window_length=3,
+            )
+            result = engine.run_pipeline(
+                Pipeline(
+                    columns={'sma': sma, 'ranked': sma.rank(method='average')},
+                ),
+                self.dates[5],
+                end_date,
+            )
+            return result, loader.load_calls
+
+        expected, load_calls = run_pipeline('v1')
+        self.assertNotEqual(load_calls, [])
+
+        result, load_calls = run_pipeline('v1')
+        self.assertEqual(load_calls, [])
+        assert_frame_equal(result, expected)
+
+        # Results for other dates or data are computed again.
+        _, load_calls = run_pipeline('v1', end_date=self.dates[11])
+        self.assertNotEqual(load_calls, [])
+        _, load_calls = run_pipeline('v2')
+        self.assertNotEqual(load_calls, [])
+
+        # Results depending on unversioned data aren't cached.
+        run_pipeline(None)
+        result, load_calls = run_pipeline(None)
+        self.assertNotEqual(load_calls, [])
+        assert_frame_equal(result, expected)
+
     def test_same_day_pipeline(self):
         loader = self.loader
         engine = SimplePipelineEngine(
@@ -546,7 +676,8 @@ class FrameInputTestCase(TestCase):
     def make_frame(self, data):
         return DataFrame(data, columns=self.assets, index=self.dates)
 
-    def test_compute_with_adjustments(self):
+    @parameterized.expand([(False,), (True,)])
+    def test_compute_with_adjustments(self, copy_on_write):
         dates, asset_ids = self.dates, self.asset_ids
         low, high = USEquityPricing.low, USEquityPricing.high
         apply_idxs = [3, 10, 16]
@@ -597,6 +728,7 @@ class FrameInputTestCase(TestCase):
             {low: low_loader, high: high_loader}.__getitem__,
             self.dates,
             self.asset_finder,
+            copy_on_write=copy_on_write,
         )
 
         for window_length in range(1, 4):
@@ -626,6 +758,194 @@ class FrameInputTestCase(TestCase):
                 high_results = results.unstack()['high']
                 assert_frame_equal(high_results, high_base.iloc[iloc_bounds])
 
+    def make_adjusted_pricing_engine(self, seed, **engine_kwargs):
+        """
+        Make an engine loading random closes and volumes, with adjustments
+        to both on a few days.
+        """
+        dates = self.dates
+        close, volume = USEquityPricing.close, USEquityPricing.volume
+        rand = random.RandomState(seed)
+
+        shape = self.base_mask.shape
+        close_base = self.make_frame(rand.uniform(10, 20, shape))
+        close_base.iloc[5:7, 0] = nan
+        volume_base = self.make_frame(rand.randint(100, 1000, shape))
+        volume_base.iloc[8, 2] = nan
+
+        def split(sid, idx, ratio):
+            return dict(
+                kind=MULTIPLY,
+                sid=sid,
+                value=ratio,
+                start_date=None,
+                end_date=dates[idx - 1],
+                apply_date=dates[idx],
+            )
+
+        close_loader = DataFrameLoader(
+            close,
+            close_base,
+            DataFrame.from_records(
+                [split(1, 6, 0.5), split(2, 12, 0.25), split(1, 13, 3.0)],
+            ),
+        )
+        volume_loader = DataFrameLoader(
+            volume,
+            volume_base,
+            DataFrame.from_records([split(1, 6, 2.0), split(2, 12, 4.0)]),
+        )
+        return SimplePipelineEngine(
+            {close: close_loader, volume: volume_loader}.__getitem__,
+            dates,
+            self.asset_finder,
+            **engine_kwargs
+        )
+
+    @parameterized.expand([(1,), (4,), (10,)])
+    def test_rolling_factors_match_compute(self, window_length):
+        dates = self.dates
+        close, volume = USEquityPricing.close, USEquityPricing.volume
+        engine = self.make_adjusted_pricing_engine(window_length)
+
+        def per_window(factor_type):
+            # Overriding compute disables the factor's rolling fast path.
+            def compute(self, today, assets, out, *inputs):
+                factor_type.compute(self, today, assets, out, *inputs)
+
+            return type(
+                'PerWindow' + factor_type.__name__,
+                (factor_type,),
+                {'compute': compute},
+            )
+
+        factor_types = {
+            'returns': (Returns, [close]),
+            'sma': (SimpleMovingAverage, [close]),
+            'vwap': (VWAP, [close, volume]),
+            'drawdown': (MaxDrawdown, [close]),
+            'dollar_volume': (AverageDollarVolume, [close, volume]),
+        }
+        columns = {}
+        for name, (factor_type, inputs) in iteritems(factor_types):
+            columns[name] = factor_type(
+                inputs=inputs, window_length=window_length,
+            )
+            columns[name + '_expected'] = per_window(factor_type)(
+                inputs=inputs, window_length=window_length,
+            )
+
+        results = engine.run_pipeline(
+            Pipeline(columns=columns), dates[10], dates[-1],
+        )
+        for name in factor_types:
+            assert_almost_equal(
+                results[name].values,
+                results[name + '_expected'].values,
+                decimal=10,
+            )
+
+    @parameterized.expand([(1,), (4,), (10,)])
+    def test_compute_all(self, window_length):
+        dates = self.dates
+        close, volume = USEquityPricing.close, USEquityPricing.volume
+
+        class DollarRange(CustomFactor):
+            inputs = [close, volume]
+
+            def compute(self, today, assets, out, closes, volumes):
+                dollars = closes * volumes
+                out[:] = dollars.max(axis=0) - dollars.min(axis=0)
+
+        class DollarRangeAll(DollarRange):
+            def compute_all(self, dates, assets, out, closes, volumes):
+                self.shapes.append(closes.shape)
+                dollars = closes * volumes
+                out[:] = dollars.max(axis=1) - dollars.min(axis=1)
+
+        DollarRangeAll.shapes = shapes = []
+        engine = self.make_adjusted_pricing_engine(window_length)
+        results = engine.run_pipeline(
+            Pipeline(
+                columns={
+                    'range': DollarRange(window_length=window_length),
+                    'range_all': DollarRangeAll(window_length=window_length),
+                },
+            ),
+            dates[10],
+            dates[-1],
+        )
+        assert_almost_equal(
+            results['range_all'].values, results['range'].values,
+        )
+
+        # One call per run of dates between the adjustments applied on
+        # dates[12] and dates[13].
+        self.assertEqual(
+            [n for n, _, _ in shapes], [2, 1, len(dates) - 13],
+        )
+        for _, length, num_assets in shapes:
+            self.assertEqual(length, window_length)
+            self.assertEqual(num_assets, len(self.asset_ids))
+
+    @parameterized.expand([(2,), (4,)])
+    def test_parallel_terms(self, num_threads):
+        dates = self.dates
+        close, volume = USEquityPricing.close, USEquityPricing.volume
+
+        def make_pipeline():
+            columns = {}
+            for window_length in range(1, 8):
+                sma = SimpleMovingAverage(
+                    inputs=[close], window_length=window_length,
+                )
+                vwap = VWAP(window_length=window_length)
+                columns['sma_%d' % window_length] = sma
+                columns['spread_%d' % window_length] = vwap / sma - 1
+                columns['rank_%d' % window_length] = vwap.rank()
+            columns['dv'] = AverageDollarVolume(window_length=3)
+            return Pipeline(
+                columns=columns,
+                screen=SimpleMovingAverage(
+                    inputs=[volume], window_length=2,
+                ) > 200,
+            )
+
+        expected = self.make_adjusted_pricing_engine(0).run_pipeline(
+            make_pipeline(), dates[10], dates[-1],
+        )
+        engine = self.make_adjusted_pricing_engine(
+            0, num_threads=num_threads,
+        )
+        for _ in range(3):
+            assert_frame_equal(
+                engine.run_pipeline(make_pipeline(), dates[10], dates[-1]),
+                expected,
+            )
+
+    def test_parallel_term_errors(self):
+        class Broken(CustomFactor):
+            inputs = [USEquityPricing.close]
+            window_length = 2
+
+            def compute(self, today, assets, out, closes):
+                raise ValueError('broken')
+
+        engine = self.make_adjusted_pricing_engine(0, num_threads=3)
+        pipeline = Pipeline(
+            columns={
+                'broken': Broken(),
+                'sma': SimpleMovingAverage(
+                    inputs=[USEquityPricing.close], window_length=3,
+                ),
+            },
+        )
+        with self.assertRaises(ValueError):
+            engine.run_pipeline(pipeline, self.dates[10], self.dates[-1])
+
+        with self.assertRaises(ValueError):
+            self.make_adjusted_pricing_engine(0, num_threads=0)
+
 
 class SyntheticBcolzTestCase(TestCase):
 
@@ -15,6 +15,7 @@
 """
 Tests for USEquityPricingLoader and related classes.
 """
+import os
 from unittest import TestCase
 
 from numpy import (
@@ -34,14 +35,20 @@ from pandas import (
     Int64Index,
     Timestamp,
 )
+from pandas.util.testing import assert_frame_equal
 from testfixtures import TempDirectory
 from toolz.curried.operator import getitem
 
 from zipline.lib.adjustment import Float64Multiply
+from zipline.pipeline import Pipeline
+from zipline.pipeline.cache import TermResultCache
+from zipline.pipeline.engine import SimplePipelineEngine
+from zipline.pipeline.factors import SimpleMovingAverage
 from zipline.pipeline.loaders.synthetic import (
     NullAdjustmentReader,
     SyntheticDailyBarWriter,
 )
+from zipline.data.daily_bar_cube import DailyBarCubeWriter
 from zipline.data.us_equity_pricing import (
     BcolzDailyBarReader,
     SQLiteAdjustmentReader,
@@ -55,6 +62,7 @@ from zipline.errors import WindowLengthTooLong
 from zipline.finance.trading import TradingEnvironment
 from zipline.pipeline.data import USEquityPricing
 from zipline.testing import (
+    make_simple_equity_info,
     seconds_to_timestamp,
     str_to_seconds,
 )
@@ -257,6 +265,41 @@ DIVIDENDS_EXPECTED = DataFrame(
 )
 
 
+# Sid 1 has a split effective on a Saturday, and a merger and a dividend
+# effective on the following Monday, so all three should be applied on the
+# Monday, in the order split, merger, dividend.
+OFF_CALENDAR_SPLITS = DataFrame(
+    [{'effective_date': str_to_seconds('2015-06-13'),
+      'ratio': 0.5,
+      'sid': 1}],
+    columns=['effective_date', 'ratio', 'sid'],
+)
+
+
+OFF_CALENDAR_MERGERS = DataFrame(
+    [{'effective_date': str_to_seconds('2015-06-15'),
+      'ratio': 0.8,
+      'sid': 1}],
+    columns=['effective_date', 'ratio', 'sid'],
+)
+
+
+OFF_CALENDAR_DIVIDENDS = DataFrame(
+    [{'declared_date': Timestamp('2015-06-01', tz='UTC').to_datetime64(),
+      'ex_date': Timestamp('2015-06-15', tz='UTC').to_datetime64(),
+      'record_date': Timestamp('2015-06-17', tz='UTC').to_datetime64(),
+      'pay_date': Timestamp('2015-06-19', tz='UTC').to_datetime64(),
+      'amount': 10.0,
+      'sid': 1}],
+    columns=['declared_date',
+             'ex_date',
+             'record_date',
+             'pay_date',
+             'amount',
+             'sid'],
+)
+
+
 class MockDailyBarSpotReader(object):
     """
     A BcolzDailyBarReader which returns a constant value for spot price.
@@ -278,7 +321,7 @@ class USEquityPricingLoaderTestCase(TestCase):
         daily_bar_reader = MockDailyBarSpotReader()
         writer = SQLiteAdjustmentWriter(cls.db_path, cls.calendar_days,
                                         daily_bar_reader)
-        writer.write(SPLITS, MERGERS, DIVIDENDS)
+        writer.write(SPLITS, MERGERS, DIVIDENDS, adjustment_factors=True)
 
         cls.assets = TEST_QUERY_ASSETS
         cls.asset_info = EQUITY_INFO
@@ -395,6 +438,119 @@ class USEquityPricingLoaderTestCase(TestCase):
                 self.assertEqual(adj.last_col, expected.last_col)
                 assert_allclose(adj.value, expected.value)
 
+    def test_load_adjustments_in_memory(self):
+        def adjustment_key(adjustment):
+            return adjustment._key()
+
+        columns = [USEquityPricing.close, USEquityPricing.volume]
+        query_days = self.calendar_days_between(
+            TEST_QUERY_START,
+            TEST_QUERY_STOP,
+        )
+
+        expected = SQLiteAdjustmentReader(self.db_path).load_adjustments(
+            columns,
+            query_days,
+            self.assets,
+        )
+        reader = SQLiteAdjustmentReader(self.db_path, in_memory=True)
+        # Load twice to read from the index built by the first load.
+        for _ in range(2):
+            adjustments = reader.load_adjustments(
+                columns,
+                query_days,
+                self.assets,
+            )
+            self.assertEqual(len(adjustments), len(expected))
+            for packed, expected_column in zip(adjustments, expected):
+                column_adjustments = packed.to_dict()
+                self.assertEqual(
+                    sorted(column_adjustments),
+                    sorted(expected_column),
+                )
+                for key in expected_column:
+                    self.assertEqual(
+                        sorted(column_adjustments[key], key=adjustment_key),
+                        sorted(expected_column[key], key=adjustment_key),
+                    )
+
+    def test_load_adjustments_in_memory_off_calendar(self):
+        db_path = self.test_data_dir.getpath('off_calendar_adjustments.db')
+        SQLiteAdjustmentWriter(
+            db_path,
+            self.calendar_days,
+            MockDailyBarSpotReader(),
+        ).write(
+            OFF_CALENDAR_SPLITS,
+            OFF_CALENDAR_MERGERS,
+            OFF_CALENDAR_DIVIDENDS,
+        )
+
+        columns = [USEquityPricing.close, USEquityPricing.volume]
+        query_days = self.calendar_days_between(
+            TEST_QUERY_START,
+            TEST_QUERY_STOP,
+        )
+        expected = SQLiteAdjustmentReader(db_path).load_adjustments(
+            columns,
+            query_days,
+            self.assets,
+        )
+        monday = query_days.get_loc(Timestamp('2015-06-15', tz='UTC'))
+        self.assertEqual(
+            [[a.value for a in column[monday]] for column in expected],
+            [[0.5, 0.8, 0.9], [2.0]],
+        )
+
+        adjustments = SQLiteAdjustmentReader(
+            db_path,
+            in_memory=True,
+        ).load_adjustments(columns, query_days, self.assets)
+        self.assertEqual(len(adjustments), len(expected))
+        for packed, expected_column in zip(adjustments, expected):
+            column_adjustments = packed.to_dict()
+            self.assertEqual(sorted(column_adjustments), [monday])
+            self.assertEqual(
+                [a._key() for a in column_adjustments[monday]],
+                [a._key() for a in expected_column[monday]],
+            )
+
+    def test_adjust_as_of(self):
+        reader = SQLiteAdjustmentReader(self.db_path)
+        columns = [USEquityPricing.close, USEquityPricing.volume]
+        days = self.calendar_days
+        raw_arrays = BcolzDailyBarReader(self.bcolz_path).load_raw_arrays(
+            columns,
+            days[0],
+            days[-1],
+            self.assets,
+        )
+
+        for as_of_date in days[0], TEST_QUERY_START, days[-1]:
+            close, volume = reader.adjust_as_of(
+                raw_arrays, columns, days, self.assets, as_of_date,
+            )
+
+            expected_close = raw_arrays[0].astype(float64)
+            expected_volume = raw_arrays[1].astype(float64)
+            for table in SPLITS, MERGERS, DIVIDENDS_EXPECTED:
+                for eff_date_secs, ratio, sid in table.itertuples(index=False):
+                    eff_date = Timestamp(eff_date_secs, unit='s', tz='UTC')
+                    # Days before an adjustment effective by the as of date
+                    # are adjusted, and days on or after one effective later
+                    # are unadjusted.
+                    if eff_date <= as_of_date:
+                        rows = days < eff_date
+                    else:
+                        rows = days >= eff_date
+                        ratio = 1.0 / ratio
+                    expected_close[rows, sid - 1] *= ratio
+                    if table is SPLITS:
+                        expected_volume[rows, sid - 1] /= ratio
+
+            assert_allclose(close, expected_close)
+            assert_allclose(volume, expected_volume)
+
     def test_read_no_adjustments(self):
         adjustment_reader = NullAdjustmentReader()
         columns = [USEquityPricing.close, USEquityPricing.volume]
@@ -561,3 +717,112 @@ class USEquityPricingLoaderTestCase(TestCase):
             highs.traverse(windowlen + 1)
         with self.assertRaises(WindowLengthTooLong):
             volumes.traverse(windowlen + 1)
+
+    def test_read_from_cube(self):
+        columns = [USEquityPricing.high, USEquityPricing.volume]
+        query_days = self.calendar_days_between(
+            TEST_QUERY_START,
+            TEST_QUERY_STOP
+        )
+        mask = ones((len(query_days), len(self.assets)), dtype=bool)
+
+        cube_path = self.test_data_dir.getpath('cube')
+        DailyBarCubeWriter(cube_path).write_from_bcolz(
+            BcolzDailyBarReader(self.bcolz_path)._table,
+        )
+        cube_loader = USEquityPricingLoader.from_cube(
+            cube_path,
+            self.db_path,
+        )
+        bcolz_loader = USEquityPricingLoader.from_files(
+            self.bcolz_path,
+            self.db_path,
+        )
+
+        cube_results = cube_loader.load_adjusted_array(
+            columns, query_days, self.assets, mask,
+        )
+        bcolz_results = bcolz_loader.load_adjusted_array(
+            columns, query_days, self.assets, mask,
+        )
+        for column in columns:
+            cube_array = cube_results[column]
+            bcolz_array = bcolz_results[column]
+            assert_array_equal(cube_array.data, bcolz_array.data)
+            for cube_window, bcolz_window in zip(cube_array.traverse(3),
+                                                 bcolz_array.traverse(3)):
+                assert_array_equal(cube_window, bcolz_window)
+
+    def test_data_version(self):
+        loader = USEquityPricingLoader.from_files(
+            self.bcolz_path, self.db_path,
+        )
+        self.assertIsNotNone(loader.data_version)
+        self.assertEqual(
+            USEquityPricingLoader.from_files(
+                self.bcolz_path, self.db_path,
+            ).data_version,
+            loader.data_version,
+        )
+        self.assertIsNone(
+            USEquityPricingLoader(
+                BcolzDailyBarReader(self.bcolz_path),
+                SQLiteAdjustmentReader(self.db_path),
+            ).data_version,
+        )
+
+        # Rewriting either store changes the version.
+        bcolz_attrs_path = os.path.join(self.bcolz_path, '__attrs__')
+        for path in self.db_path, bcolz_attrs_path:
+            stat = os.stat(path)
+            os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+            try:
+                self.assertNotEqual(
+                    USEquityPricingLoader.from_files(
+                        self.bcolz_path, self.db_path,
+                    ).data_version,
+                    loader.data_version,
+                )
+            finally:
+                os.utime(path, (stat.st_atime, stat.st_mtime))
+
+    def test_cached_pipeline_results(self):
+        env = TradingEnvironment()
+        env.write_data(equities_df=make_simple_equity_info(
+            self.assets, TEST_CALENDAR_START, TEST_CALENDAR_STOP,
+        ))
+        result_cache = TermResultCache(self.test_data_dir.getpath('cache'))
+        sma = SimpleMovingAverage(
+            inputs=[USEquityPricing.close], window_length=3,
+        )
+        pipeline = Pipeline(columns={'sma': sma, 'rank': sma.rank()})
+
+        def run_pipeline(loader):
+            engine = SimplePipelineEngine(
+                lambda column: loader,
+                self.calendar_days,
+                env.asset_finder,
+                result_cache=result_cache,
+            )
+            return engine.run_pipeline(
+                pipeline, TEST_QUERY_START, TEST_QUERY_STOP,
+            )
+
+        expected = run_pipeline(
+            USEquityPricingLoader.from_files(self.bcolz_path, self.db_path),
+        )
+
+        loader = USEquityPricingLoader.from_files(
+            self.bcolz_path, self.db_path,
+        )
+        load_calls = []
+
+        def load_adjusted_array(*args, **kwargs):
+            load_calls.append(args)
+            return USEquityPricingLoader.load_adjusted_array(
+                loader, *args, **kwargs
+            )
+        loader.load_adjusted_array = load_adjusted_array
+
+        assert_frame_equal(run_pipeline(loader), expected)
+        self.assertEqual(load_calls, [])
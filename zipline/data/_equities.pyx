@@ -127,6 +127,103 @@ cpdef _compute_row_slices(dict asset_starts_absolute,
     return first_row_a, last_row_a, offset_a
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef _chunk_aligned_ranges(intp_t[:] first_rows,
+                           intp_t[:] last_rows,
+                           intp_t chunklen,
+                           intp_t nrows):
+    """
+    Compute the smallest set of disjoint, chunk-aligned row ranges of a carray
+    that cover the rows requested for each asset.
+
+    Parameters
+    ----------
+    first_rows : ndarray[intp]
+    last_rows : ndarray[intp]
+        Arrays in the format returned by _compute_row_slices.
+    chunklen : intp
+        The number of rows stored in each compressed chunk of the carray.
+    nrows : intp
+        The total number of rows in the carray.
+
+    Returns
+    -------
+    range_starts, range_stops, read_positions : 3-tuple of ndarrays
+        ``range_starts[i]:range_stops[i]`` is the i-th range of rows to read.
+        ``read_positions[j]`` is the index of ``first_rows[j]`` in the buffer
+        formed by concatenating the ranges in order.
+
+    Notes
+    -----
+    Ranges are widened to chunk boundaries and then merged, so reading each
+    range with ``carray[start:stop]`` decompresses every required chunk
+    exactly once and never touches a chunk that doesn't contain a requested
+    row.
+    """
+    cdef:
+        intp_t nassets = len(first_rows)
+        intp_t i
+        intp_t j
+        intp_t asset
+        intp_t lo
+        intp_t hi
+        intp_t nranges = 0
+        intp_t buffer_start = 0
+        ndarray[dtype=intp_t, ndim=1] chunk_starts = zeros(nassets, dtype=intp)
+        ndarray[dtype=intp_t, ndim=1] chunk_stops = zeros(nassets, dtype=intp)
+        ndarray[dtype=intp_t, ndim=1] order
+        ndarray[dtype=intp_t, ndim=1] range_starts = zeros(nassets, dtype=intp)
+        ndarray[dtype=intp_t, ndim=1] range_stops = zeros(nassets, dtype=intp)
+        ndarray[dtype=intp_t, ndim=1] read_positions = zeros(
+            nassets, dtype=intp,
+        )
+
+    for i in range(nassets):
+        chunk_starts[i] = (first_rows[i] // chunklen) * chunklen
+        chunk_stops[i] = min(
+            ((last_rows[i] // chunklen) + 1) * chunklen,
+            nrows,
+        )
+
+    order = chunk_starts.argsort(kind='mergesort').astype(intp)
+    for j in range(nassets):
+        asset = order[j]
+        if last_rows[asset] < first_rows[asset]:
+            # The asset has no data in the queried range.
+            continue
+
+        lo = chunk_starts[asset]
+        hi = chunk_stops[asset]
+        if nranges == 0 or lo > range_stops[nranges - 1]:
+            # Start a new range.
+            if nranges:
+                buffer_start += range_stops[nranges - 1] - \
+                    range_starts[nranges - 1]
+            range_starts[nranges] = lo
+            range_stops[nranges] = hi
+            nranges += 1
+        elif hi > range_stops[nranges - 1]:
+            # Extend the current range.
+            range_stops[nranges - 1] = hi
+
+        read_positions[asset] = (
+            buffer_start + first_rows[asset] - range_starts[nranges - 1]
+        )
+
+    return range_starts[:nranges], range_stops[:nranges], read_positions
+
+
+cdef inline object _read_range(object read_range,
+                              object carray,
+                              str column_name,
+                              intp_t start,
+                              intp_t stop):
+    if read_range is None:
+        return carray[start:stop]
+    return read_range(carray, column_name, start, stop)
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cpdef _read_bcolz_data(ctable_t table,
@@ -134,10 +231,14 @@ cpdef _read_bcolz_data(ctable_t table,
                        list columns,
                        intp_t[:] first_rows,
                        intp_t[:] last_rows,
-                       intp_t[:] offsets):
+                       intp_t[:] offsets,
+                       object read_range=None):
     """
     Load raw bcolz data for the given columns and indices.
 
+    Only the compressed chunks that contain rows in the requested ranges are
+    decompressed.
+
     Parameters
     ----------
     table : bcolz.ctable
@@ -151,6 +252,11 @@ cpdef _read_bcolz_data(ctable_t table,
     last_rows : ndarray[intp]
     offsets : ndarray[intp
         Arrays in the format returned by _compute_row_slices.
+    read_range : callable, optional
+        Function of (carray, column_name, start, stop) returning
+        ``carray[start:stop]``.  Used to read the chunk-aligned ranges through
+        a cache, e.g. a zipline.data.chunk_cache.ChunkCache.  By default the
+        carray is sliced directly.
 
     Returns
     -------
@@ -160,8 +266,18 @@ cpdef _read_bcolz_data(ctable_t table,
     cdef:
         int nassets
         str column_name
-        ndarray[dtype=uint32_t, ndim=1] raw_data
-        ndarray[dtype=uint32_t, ndim=2] outbuf
+        object carray
+        intp_t nranges
+        intp_t range_idx
+        intp_t buffer_idx
+        ndarray[dtype=intp_t, ndim=1] range_starts
+        ndarray[dtype=intp_t, ndim=1] range_stops
+        ndarray[dtype=intp_t, ndim=1] read_positions_a
+        intp_t[:] read_positions
+        ndarray[dtype=uint32_t, ndim=1] raw_data_a
+        uint32_t[:] raw_data
+        ndarray[dtype=uint32_t, ndim=2] outbuf_a
+        uint32_t[:, :] outbuf
         ndarray[dtype=uint8_t, ndim=2, cast=True] where_nan
         ndarray[dtype=float64_t, ndim=2] outbuf_as_float
         intp_t asset
@@ -177,20 +293,51 @@ cpdef _read_bcolz_data(ctable_t table,
         raise ValueError("Incompatible index arrays.")
 
     for column_name in columns:
-        raw_data = table[column_name][:]
-        outbuf = zeros(shape=shape, dtype=uint32)
-        for asset in range(nassets):
-            first_row = first_rows[asset]
-            last_row = last_rows[asset]
-            offset = offsets[asset]
-            for out_idx, raw_idx in enumerate(range(first_row, last_row + 1)):
-                outbuf[out_idx + offset, asset] = raw_data[raw_idx]
+        carray = table[column_name]
+        range_starts, range_stops, read_positions_a = _chunk_aligned_ranges(
+            first_rows,
+            last_rows,
+            carray.chunklen,
+            len(carray),
+        )
+        read_positions = read_positions_a
+
+        # Decompress only the chunks covering the requested rows, packed
+        # together into a single buffer.
+        nranges = len(range_starts)
+        raw_data_a = zeros((range_stops - range_starts).sum(), dtype=uint32)
+        buffer_idx = 0
+        for range_idx in range(nranges):
+            raw_data_a[
+                buffer_idx:
+                buffer_idx + range_stops[range_idx] - range_starts[range_idx]
+            ] = _read_range(
+                read_range,
+                carray,
+                column_name,
+                range_starts[range_idx],
+                range_stops[range_idx],
+            )
+            buffer_idx += range_stops[range_idx] - range_starts[range_idx]
+        raw_data = raw_data_a
+
+        outbuf_a = zeros(shape=shape, dtype=uint32)
+        outbuf = outbuf_a
+        with nogil:
+            for asset in range(nassets):
+                first_row = first_rows[asset]
+                last_row = last_rows[asset]
+                offset = offsets[asset]
+                raw_idx = read_positions[asset]
+                for out_idx in range(last_row - first_row + 1):
+                    outbuf[out_idx + offset, asset] = \
+                        raw_data[raw_idx + out_idx]
 
         if column_name in {'open', 'high', 'low', 'close'}:
-            where_nan = (outbuf == 0)
-            outbuf_as_float = outbuf.astype(float64) * .001
+            where_nan = (outbuf_a == 0)
+            outbuf_as_float = outbuf_a.astype(float64) * .001
             outbuf_as_float[where_nan] = NAN
             results.append(outbuf_as_float)
         else:
-            results.append(outbuf)
+            results.append(outbuf_a)
     return results
@@ -0,0 +1,302 @@
+#
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Internal helpers for BcolzMinuteBarReader.
+"""
+cimport cython
+from libc.string cimport memcpy
+from numpy import (
+    array,
+    empty,
+    int64,
+    intp,
+)
+from numpy cimport (
+    float64_t,
+    int64_t,
+    intp_t,
+    ndarray,
+    NPY_UINT32,
+    PyArray_DATA,
+    PyArray_ISCARRAY,
+    PyArray_ISCARRAY_RO,
+    PyArray_NDIM,
+    PyArray_TYPE,
+    uint32_t,
+)
+from numpy.math cimport NAN
+
+cdef int64_t NANOS_IN_MINUTE = 60000000000
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline intp_t _position_of_minute(int64_t[:] market_opens,
+                                       intp_t minutes_per_day,
+                                       int64_t minute_val) nogil:
+    """
+    Compute the position of `minute_val`, in nanoseconds since the epoch, or
+    -1 if it is not a minute in any of the trading sessions.
+    """
+    cdef:
+        int64_t minute
+        intp_t lo = 0
+        intp_t hi = market_opens.shape[0]
+        intp_t mid
+        int64_t offset
+
+    if minute_val % NANOS_IN_MINUTE:
+        return -1
+    minute = minute_val // NANOS_IN_MINUTE
+
+    # Find the last market open at or before the minute.
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if market_opens[mid] <= minute:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == 0:
+        return -1
+
+    offset = minute - market_opens[lo - 1]
+    if offset >= minutes_per_day:
+        return -1
+    return (lo - 1) * minutes_per_day + offset
+
+
+def find_position_of_minute(ndarray[int64_t, ndim=1] market_opens,
+                            intp_t minutes_per_day,
+                            int64_t minute_val):
+    """
+    Find the position of a minute in the enumeration of every trading minute
+    written by BcolzMinuteBarWriter.
+
+    The position is computed as ``day_index * minutes_per_day + offset``,
+    where ``day_index`` is the index of the session containing the minute
+    and ``offset`` is the number of minutes since that session's open.
+
+    Parameters
+    ----------
+    market_opens : np.ndarray[int64]
+        The market open of each session, in minutes since the epoch, sorted
+        ascending.
+    minutes_per_day : int
+        The number of minutes stored for each session.
+    minute_val : int
+        The minute to look up, in nanoseconds since the epoch.
+
+    Returns
+    -------
+    position : int
+        The position of the minute.
+
+    Raises
+    ------
+    KeyError
+        If the minute is not within the first ``minutes_per_day`` minutes of
+        any session.
+    """
+    cdef intp_t pos = _position_of_minute(
+        market_opens, minutes_per_day, minute_val,
+    )
+    if pos < 0:
+        raise KeyError(minute_val)
+    return pos
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def find_positions_of_minutes(ndarray[int64_t, ndim=1] market_opens,
+                              intp_t minutes_per_day,
+                              object minute_vals):
+    """
+    Vectorized version of ``find_position_of_minute``.
+
+    Parameters
+    ----------
+    market_opens : np.ndarray[int64]
+        The market open of each session, in minutes since the epoch, sorted
+        ascending.
+    minutes_per_day : int
+        The number of minutes stored for each session.
+    minute_vals : array-like[int64]
+        The minutes to look up, in nanoseconds since the epoch.
+
+    Returns
+    -------
+    positions : np.ndarray[intp]
+        The position of each minute.
+
+    Raises
+    ------
+    KeyError
+        If any of the minutes is not within the first ``minutes_per_day``
+        minutes of any session.
+    """
+    cdef:
+        int64_t[:] minutes = array(minute_vals, dtype=int64, ndmin=1)
+        ndarray[intp_t, ndim=1] positions_a = empty(len(minutes), dtype=intp)
+        intp_t[:] positions = positions_a
+        int64_t[:] opens = market_opens
+        intp_t i
+        intp_t missing = -1
+
+    with nogil:
+        for i in range(minutes.shape[0]):
+            positions[i] = _position_of_minute(
+                opens, minutes_per_day, minutes[i],
+            )
+            if positions[i] < 0 and missing < 0:
+                missing = i
+
+    if missing >= 0:
+        raise KeyError(minutes[missing])
+    return positions_a
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef _scale_minute_prices(uint32_t[:, :] raw,
+                           float64_t[:, :] out,
+                           float64_t ohlc_inverse,
+                           intp_t start_row,
+                           intp_t stop_row):
+    """
+    Convert rows [start_row, stop_row) of raw minute prices to floats.
+
+    Zeros, which mark minutes without a trade, become NaN.  All other values
+    are multiplied by `ohlc_inverse`.  The conversion runs without the GIL,
+    so disjoint row ranges may be converted concurrently from many threads.
+
+    Parameters
+    ----------
+    raw : np.ndarray[uint32, ndim=2]
+        The prices as stored on disk, with a row per sid.
+    out : np.ndarray[float64, ndim=2]
+        The buffer into which to write the converted prices.  Must have the
+        same shape as `raw`.
+    ohlc_inverse : float
+        The inverse of the ratio by which the prices were multiplied to be
+        stored as integers.
+    start_row, stop_row : int
+        The range of rows to convert.
+    """
+    cdef:
+        intp_t row
+        intp_t col
+        intp_t ncols = raw.shape[1]
+        uint32_t value
+
+    if raw.shape[0] != out.shape[0] or raw.shape[1] != out.shape[1]:
+        raise ValueError(
+            "raw and out have different shapes: %s != %s" % (
+                (raw.shape[0], raw.shape[1]),
+                (out.shape[0], out.shape[1]),
+            )
+        )
+    if not 0 <= start_row <= stop_row <= raw.shape[0]:
+        raise ValueError(
+            "Invalid row range [%d, %d) for %d rows." % (
+                start_row, stop_row, raw.shape[0],
+            )
+        )
+
+    with nogil:
+        for row in range(start_row, stop_row):
+            for col in range(ncols):
+                value = raw[row, col]
+                if value == 0:
+                    out[row, col] = NAN
+                else:
+                    out[row, col] = value * ohlc_inverse
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef _copy_minute_segments(ndarray raw, list segments):
+    """
+    Copy runs of decompressed chunk values into rows of a window.
+
+    The segments are validated while holding the GIL, and then all of them
+    are copied without it, so disjoint rows may be filled concurrently from
+    many threads.
+
+    Parameters
+    ----------
+    raw : np.ndarray[uint32, ndim=2]
+        The C-contiguous window to fill, with a row per sid.
+    segments : list of (chunk, src_start, row, dest_start, length)
+        Copy ``chunk[src_start:src_start + length]`` into
+        ``raw[row, dest_start:dest_start + length]``.  Each chunk must be a
+        C-contiguous uint32 array, and is only read.
+    """
+    cdef:
+        intp_t nsegments = len(segments)
+        intp_t nrows
+        intp_t ncols
+        intp_t i
+        intp_t src_start
+        intp_t row
+        intp_t dest_start
+        intp_t length
+        ndarray chunk
+        ndarray[intp_t, ndim=1] sources = empty(nsegments, dtype=intp)
+        ndarray[intp_t, ndim=1] dests = empty(nsegments, dtype=intp)
+        ndarray[intp_t, ndim=1] lengths = empty(nsegments, dtype=intp)
+        uint32_t *raw_data
+
+    if (PyArray_NDIM(raw) != 2 or
+            PyArray_TYPE(raw) != NPY_UINT32 or
+            not PyArray_ISCARRAY(raw)):
+        raise ValueError("raw must be a writeable C-contiguous uint32 matrix")
+    nrows = raw.shape[0]
+    ncols = raw.shape[1]
+    raw_data = <uint32_t *> PyArray_DATA(raw)
+
+    for i in range(nsegments):
+        chunk, src_start, row, dest_start, length = segments[i]
+        if (PyArray_NDIM(chunk) != 1 or
+                PyArray_TYPE(chunk) != NPY_UINT32 or
+                not PyArray_ISCARRAY_RO(chunk)):
+            raise ValueError("chunks must be C-contiguous uint32 vectors")
+        if not (0 <= src_start and
+                0 <= length and
+                src_start + length <= chunk.shape[0] and
+                0 <= row < nrows and
+                0 <= dest_start and
+                dest_start + length <= ncols):
+            raise ValueError(
+                "Invalid segment: chunk[%d:%d] to row %d, columns [%d:%d]" % (
+                    src_start,
+                    src_start + length,
+                    row,
+                    dest_start,
+                    dest_start + length,
+                )
+            )
+        # The chunks are kept alive by `segments` until we return.
+        sources[i] = <intp_t> (<uint32_t *> PyArray_DATA(chunk) + src_start)
+        dests[i] = row * ncols + dest_start
+        lengths[i] = length
+
+    with nogil:
+        for i in range(nsegments):
+            memcpy(
+                raw_data + dests[i],
+                <uint32_t *> sources[i],
+                lengths[i] * sizeof(uint32_t),
+            )
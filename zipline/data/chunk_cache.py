@@ -0,0 +1,243 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Size-bounded cache of decompressed bcolz chunks.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+from numpy import (
+    asarray,
+    concatenate,
+    empty,
+    intp,
+    unique,
+)
+
+# 256 MiB
+DEFAULT_CHUNK_CACHE_BYTES = 1 << 28
+
+
+class ChunkCache(object):
+    """
+    A least-recently-used cache of decompressed carray chunks with a bound on
+    the total number of bytes held.
+
+    Entries are keyed by ``(table, column, chunk_index)``, where ``table`` is
+    any hashable identifying the store being read (usually its rootdir) and
+    ``chunk_index`` is the index of a chunk of ``chunklen`` rows in the
+    carray.  A single cache may be shared between many readers.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        The maximum number of bytes of decompressed data to hold.  When
+        inserting a chunk would exceed this budget, the least recently used
+        chunks are evicted.  A chunk larger than the whole budget is returned
+        but not stored.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups served from the cache.
+    misses : int
+        Number of lookups that required decompressing a chunk.
+    evictions : int
+        Number of chunks dropped to stay within ``max_bytes``.
+    nbytes : int
+        Number of bytes currently held.
+
+    Notes
+    -----
+    The cache may be used from many threads.  Chunks are decompressed outside
+    of the cache's lock, so two threads missing on the same key at the same
+    time may both decompress it.
+    """
+    def __init__(self, max_bytes=DEFAULT_CHUNK_CACHE_BYTES):
+        if max_bytes < 0:
+            raise ValueError(
+                "max_bytes must be non-negative, got %d" % max_bytes
+            )
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._chunks = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __contains__(self, key):
+        return key in self._chunks
+
+    def __repr__(self):
+        return (
+            "<{name}: {nchunks} chunks, {nbytes}/{max_bytes} bytes, "
+            "hits={hits}, misses={misses}, evictions={evictions}>"
+        ).format(
+            name=type(self).__name__,
+            nchunks=len(self),
+            nbytes=self.nbytes,
+            max_bytes=self.max_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+    def clear(self):
+        """
+        Drop all cached chunks.  The hit/miss/eviction counters are kept.
+        """
+        with self._lock:
+            self._chunks.clear()
+            self.nbytes = 0
+
+    def get(self, key, load):
+        """
+        Look up ``key``, calling ``load()`` to produce the value on a miss.
+
+        Parameters
+        ----------
+        key : hashable
+            The cache key.
+        load : callable
+            Function of no arguments returning an ndarray.
+
+        Returns
+        -------
+        value : np.ndarray
+            The cached value.  The array is marked read-only because it is
+            shared between all consumers of the cache.
+        """
+        chunks = self._chunks
+        with self._lock:
+            try:
+                # Re-insert to mark as most recently used.
+                value = chunks.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                chunks[key] = value
+                return value
+
+        value = asarray(load())
+        value.flags.writeable = False
+        if value.nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            # Another thread may have loaded the same chunk in the meantime.
+            if key not in chunks:
+                self._evict(self.max_bytes - value.nbytes)
+                self.nbytes += value.nbytes
+                chunks[key] = value
+        return value
+
+    def _evict(self, target_nbytes):
+        chunks = self._chunks
+        while self.nbytes > target_nbytes:
+            _, evicted = chunks.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def chunk(self, carray, key, chunk_index):
+        """
+        Get a decompressed chunk of a carray.
+
+        Parameters
+        ----------
+        carray : bcolz.carray
+            The carray to read on a miss.
+        key : tuple
+            ``(table, column)`` identifying ``carray``.
+        chunk_index : int
+            The index of the chunk to read.
+
+        Returns
+        -------
+        chunk : np.ndarray
+            Rows ``[chunk_index * chunklen, (chunk_index + 1) * chunklen)``
+            of the carray.  The final chunk may be shorter.
+        """
+        chunklen = carray.chunklen
+        start = chunk_index * chunklen
+        return self.get(
+            key + (chunk_index,),
+            lambda: carray[start:start + chunklen],
+        )
+
+    def read(self, carray, key, start, stop):
+        """
+        Read ``carray[start:stop]`` through the cache.
+
+        Parameters
+        ----------
+        carray : bcolz.carray
+            The carray to read on a miss.
+        key : tuple
+            ``(table, column)`` identifying ``carray``.
+        start, stop : int
+            The range of rows to read.
+
+        Returns
+        -------
+        values : np.ndarray
+            The requested rows.  This may be a read-only view into the cache.
+        """
+        chunklen = carray.chunklen
+        if stop <= start:
+            return empty(0, dtype=carray.dtype)
+        first_chunk = start // chunklen
+        last_chunk = (stop - 1) // chunklen
+        base = first_chunk * chunklen
+        if first_chunk == last_chunk:
+            chunk = self.chunk(carray, key, first_chunk)
+            return chunk[start - base:stop - base]
+        values = concatenate([
+            self.chunk(carray, key, chunk_index)
+            for chunk_index in range(first_chunk, last_chunk + 1)
+        ])
+        return values[start - base:stop - base]
+
+    def take(self, carray, key, indices):
+        """
+        Gather ``carray[indices]`` through the cache, decompressing each
+        distinct chunk touched at most once.
+
+        Parameters
+        ----------
+        carray : bcolz.carray
+            The carray to read on a miss.
+        key : tuple
+            ``(table, column)`` identifying ``carray``.
+        indices : array-like[int]
+            The rows to read.
+
+        Returns
+        -------
+        values : np.ndarray
+            An array the same length as `indices`.
+        """
+        indices = asarray(indices, dtype=intp)
+        chunklen = carray.chunklen
+        out = empty(len(indices), dtype=carray.dtype)
+        chunk_indices = indices // chunklen
+        for chunk_index in unique(chunk_indices):
+            mask = chunk_indices == chunk_index
+            chunk = self.chunk(carray, key, chunk_index)
+            out[mask] = chunk[indices[mask] - chunk_index * chunklen]
+        return out
@@ -0,0 +1,204 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-memory indices of the corporate actions in an adjustments database.
+"""
+import numpy as np
+import pandas as pd
+
+# table -> (date column, [(column, dtype)])
+CORPORATE_ACTION_TABLES = {
+    'splits': (
+        'effective_date',
+        [('sid', np.int64), ('ratio', np.float64)],
+    ),
+    'mergers': (
+        'effective_date',
+        [('sid', np.int64), ('ratio', np.float64)],
+    ),
+    'dividends': (
+        'effective_date',
+        [('sid', np.int64), ('ratio', np.float64)],
+    ),
+    'dividend_payouts': (
+        'ex_date',
+        [('sid', np.int64),
+         ('declared_date', np.int64),
+         ('record_date', np.int64),
+         ('pay_date', np.int64),
+         ('amount', np.float64)],
+    ),
+    'stock_dividend_payouts': (
+        'ex_date',
+        [('sid', np.int64),
+         ('declared_date', np.int64),
+         ('record_date', np.int64),
+         ('pay_date', np.int64),
+         ('payment_sid', np.int64),
+         ('ratio', np.float64)],
+    ),
+}
+
+
+def _to_seconds(dt):
+    return pd.Timestamp(dt).value // 1000000000
+
+
+class EventIndex(object):
+    """
+    The events of one table, sorted by date, with the range of events on each
+    trading day precomputed.
+
+    Parameters
+    ----------
+    date_column : str
+        The name of the column holding the date of each event.
+    columns : dict[str -> np.ndarray]
+        The columns of the table, including `date_column` and 'sid'.  Dates
+        are in seconds since the epoch.
+    calendar : pd.DatetimeIndex
+        The trading days for which to precompute the range of events.
+    """
+    def __init__(self, date_column, columns, calendar):
+        order = np.argsort(columns[date_column], kind='mergesort')
+        self._date_column = date_column
+        self._columns = {
+            name: values[order] for name, values in columns.items()
+        }
+        self._dates = dates = self._columns[date_column]
+        self._sids = self._columns['sid']
+
+        self._calendar_seconds = days = calendar.asi8 // 1000000000
+        # Events on calendar day i are in [day_starts[i], day_stops[i]).
+        self._day_starts = dates.searchsorted(days, side='left')
+        self._day_stops = dates.searchsorted(days, side='right')
+
+    def __len__(self):
+        return len(self._dates)
+
+    def _bounds(self, seconds):
+        days = self._calendar_seconds
+        loc = days.searchsorted(seconds)
+        if loc < len(days) and days[loc] == seconds:
+            return self._day_starts[loc], self._day_stops[loc]
+        dates = self._dates
+        return (
+            dates.searchsorted(seconds, side='left'),
+            dates.searchsorted(seconds, side='right'),
+        )
+
+    def _select(self, start, stop, sids):
+        if sids is None:
+            return {
+                name: values[start:stop]
+                for name, values in self._columns.items()
+            }
+        mask = np.in1d(
+            self._sids[start:stop],
+            np.asarray(sids, dtype=np.int64),
+        )
+        return {
+            name: values[start:stop][mask]
+            for name, values in self._columns.items()
+        }
+
+    def on(self, day, sids=None):
+        """
+        Get the events on a day.
+
+        Parameters
+        ----------
+        day : pd.Timestamp
+            Midnight UTC of the day.
+        sids : array-like[int], optional
+            The sids whose events to get.  By default, the events of every sid
+            are returned.
+
+        Returns
+        -------
+        events : dict[str -> np.ndarray]
+            The columns of the events, in date order.
+        """
+        start, stop = self._bounds(_to_seconds(day))
+        return self._select(start, stop, sids)
+
+    def between(self, start_day, end_day, sids=None):
+        """
+        Get the events between two days, inclusive.
+
+        Parameters
+        ----------
+        start_day : pd.Timestamp
+            Midnight UTC of the first day.
+        end_day : pd.Timestamp
+            Midnight UTC of the last day.
+        sids : array-like[int], optional
+            The sids whose events to get.  By default, the events of every sid
+            are returned.
+
+        Returns
+        -------
+        events : dict[str -> np.ndarray]
+            The columns of the events, in date order.
+        """
+        start, _ = self._bounds(_to_seconds(start_day))
+        _, stop = self._bounds(_to_seconds(end_day))
+        return self._select(start, stop, sids)
+
+
+class CorporateActionIndex(object):
+    """
+    Index of the splits, mergers, dividends and dividend payouts in an
+    adjustments database, built once so that the events of a day are a slice
+    of in-memory arrays rather than a SQL query.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        A connection to a database written by SQLiteAdjustmentWriter.
+    calendar : pd.DatetimeIndex
+        The trading days for which to precompute the range of events.
+
+    Attributes
+    ----------
+    splits, mergers, dividends : EventIndex
+        Price adjustments, indexed by effective date.
+    dividend_payouts, stock_dividend_payouts : EventIndex
+        Cash and stock dividends, indexed by ex date.
+    """
+    def __init__(self, conn, calendar):
+        for table, (date_column, columns) in CORPORATE_ACTION_TABLES.items():
+            columns = [(date_column, np.int64)] + columns
+            rows = conn.execute(
+                "SELECT {columns} FROM {table}".format(
+                    columns=', '.join(name for name, _ in columns),
+                    table=table,
+                )
+            ).fetchall()
+            values = list(zip(*rows)) or [()] * len(columns)
+            setattr(self, table, EventIndex(
+                date_column,
+                {
+                    name: np.array(column, dtype=dtype)
+                    for (name, dtype), column in zip(columns, values)
+                },
+                calendar,
+            ))
+
+    @classmethod
+    def from_adjustment_reader(cls, adjustment_reader, calendar):
+        """
+        Build an index of the tables read by a SQLiteAdjustmentReader.
+        """
+        return cls(adjustment_reader.conn, calendar)
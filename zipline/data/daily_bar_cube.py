@@ -0,0 +1,256 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Dense, date-major storage of daily OHLCV bars.
+
+The bcolz daily bar tape is stored asset-major, so every pipeline load has to
+scatter each asset's block into a ``(dates, assets)`` buffer.  A "price cube"
+stores each column as a single 2D ``(calendar_day, sid_index)`` array that
+already has the layout pipeline wants, so a window over a run of sids is just
+a slice of a memory map.
+"""
+import json
+import os
+
+from numpy import (
+    array,
+    asarray,
+    diff,
+    dtype,
+    float64,
+    int64,
+    intp,
+    load as load_npy,
+    uint32,
+)
+from numpy.lib.format import open_memmap
+from pandas import DatetimeIndex
+
+from ._equities import _compute_row_slices, _read_bcolz_data
+
+CUBE_COLUMN_DTYPES = {
+    'open': dtype(float64),
+    'high': dtype(float64),
+    'low': dtype(float64),
+    'close': dtype(float64),
+    'volume': dtype(uint32),
+}
+
+
+def _cube_path(rootdir, colname):
+    return os.path.join(rootdir, '{0}.npy'.format(colname))
+
+
+class DailyBarCubeMetadata(object):
+    """
+    Metadata describing the axes of a daily bar cube.
+
+    Parameters
+    ----------
+    calendar : list[int64]
+        The row labels of the cube, in asi8 format (ns since EPOCH).
+    sids : list[int]
+        The column labels of the cube, in ascending order.
+    """
+    METADATA_FILENAME = 'metadata.json'
+
+    def __init__(self, calendar, sids):
+        self.calendar = calendar
+        self.sids = sids
+
+    @classmethod
+    def metadata_path(cls, rootdir):
+        return os.path.join(rootdir, cls.METADATA_FILENAME)
+
+    @classmethod
+    def read(cls, rootdir):
+        with open(cls.metadata_path(rootdir)) as fp:
+            raw_data = json.load(fp)
+        return cls(raw_data['calendar'], raw_data['sids'])
+
+    def write(self, rootdir):
+        """
+        Write the metadata to a JSON file in the rootdir.
+        """
+        metadata = {
+            'calendar': self.calendar,
+            'sids': self.sids,
+        }
+        with open(self.metadata_path(rootdir), 'w+') as fp:
+            json.dump(metadata, fp)
+
+
+class DailyBarCubeWriter(object):
+    """
+    Class capable of precomputing a daily bar cube from a ctable written by
+    BcolzDailyBarWriter.
+
+    Parameters
+    ----------
+    rootdir : str
+        Directory into which to write one ``.npy`` file per column and the
+        cube's metadata.
+
+    See Also
+    --------
+    DailyBarCubeReader : Consumer of the data written by this class.
+    """
+    # Number of calendar days to transpose at a time.
+    BLOCK_DAYS = 256
+
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+    def write_from_bcolz(self, table):
+        """
+        Transpose the asset-major tape in ``table`` into a date-major cube.
+
+        Parameters
+        ----------
+        table : bcolz.ctable
+            A table written by BcolzDailyBarWriter.
+
+        Returns
+        -------
+        reader : DailyBarCubeReader
+            A reader over the newly-written cube.
+        """
+        if not os.path.exists(self._rootdir):
+            os.makedirs(self._rootdir)
+
+        calendar = list(table.attrs['calendar'])
+        first_rows = {
+            int(sid): row for sid, row in table.attrs['first_row'].items()
+        }
+        last_rows = {
+            int(sid): row for sid, row in table.attrs['last_row'].items()
+        }
+        calendar_offsets = {
+            int(sid): offset
+            for sid, offset in table.attrs['calendar_offset'].items()
+        }
+        sids = array(sorted(first_rows), dtype=int64)
+        ndays, nsids = len(calendar), len(sids)
+
+        colnames = sorted(CUBE_COLUMN_DTYPES)
+        cubes = [
+            open_memmap(
+                _cube_path(self._rootdir, colname),
+                mode='w+',
+                dtype=CUBE_COLUMN_DTYPES[colname],
+                shape=(ndays, nsids),
+            )
+            for colname in colnames
+        ]
+        for start in range(0, ndays, self.BLOCK_DAYS):
+            end = min(start + self.BLOCK_DAYS, ndays) - 1
+            blocks = _read_bcolz_data(
+                table,
+                (end - start + 1, nsids),
+                colnames,
+                *_compute_row_slices(
+                    first_rows,
+                    last_rows,
+                    calendar_offsets,
+                    start,
+                    end,
+                    sids,
+                )
+            )
+            for cube, block in zip(cubes, blocks):
+                cube[start:end + 1] = block
+
+        for cube in cubes:
+            cube.flush()
+        del cubes
+
+        DailyBarCubeMetadata(calendar, sids.tolist()).write(self._rootdir)
+        return DailyBarCubeReader(self._rootdir)
+
+
+class DailyBarCubeReader(object):
+    """
+    Reader for daily bar cubes written by DailyBarCubeWriter.
+
+    Implements the ``load_raw_arrays`` interface of BcolzDailyBarReader, so it
+    can be used as the ``raw_price_loader`` of a USEquityPricingLoader.
+
+    Parameters
+    ----------
+    rootdir : str
+        The directory containing the cube's ``.npy`` files and metadata.
+
+    Notes
+    -----
+    When the requested assets are a contiguous run of the sids in the cube,
+    ``load_raw_arrays`` returns read-only views into the memory-mapped cube
+    without copying any data.  Otherwise the requested columns are gathered
+    with a single fancy-indexing operation per field.
+
+    See Also
+    --------
+    zipline.data.us_equity_pricing.BcolzDailyBarReader
+    zipline.pipeline.loaders.equity_pricing_loader.USEquityPricingLoader
+    """
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+        metadata = DailyBarCubeMetadata.read(rootdir)
+        self._calendar = DatetimeIndex(metadata.calendar, tz='UTC')
+        self._sids = array(metadata.sids, dtype=int64)
+        self._cubes = {
+            colname: load_npy(_cube_path(rootdir, colname), mmap_mode='r')
+            for colname in CUBE_COLUMN_DTYPES
+        }
+
+    @property
+    def sids(self):
+        """
+        The column labels of the cube.
+        """
+        return self._sids
+
+    def _sid_locs(self, assets):
+        """
+        Compute the indexer selecting ``assets`` from the columns of the cube.
+
+        Returns a slice when ``assets`` is a contiguous run of the sids in the
+        cube, so that indexing with it produces a view.
+        """
+        assets = asarray(assets, dtype=int64)
+        sids = self._sids
+        locs = sids.searchsorted(assets).astype(intp)
+        found = locs < len(sids)
+        found[found] = sids[locs[found]] == assets[found]
+        if not found.all():
+            raise KeyError(
+                "No data in cube for sids: %s" % assets[~found].tolist()
+            )
+        if len(locs) and (diff(locs) == 1).all():
+            return slice(locs[0], locs[-1] + 1)
+        return locs
+
+    def load_raw_arrays(self, columns, start_date, end_date, assets):
+        # Assumes that the given dates are actually in calendar.
+        start_idx = self._calendar.get_loc(start_date)
+        end_idx = self._calendar.get_loc(end_date)
+        sid_locs = self._sid_locs(assets)
+
+        results = []
+        for column in columns:
+            colname = column.name
+            results.append(
+                self._cubes[colname][start_idx:end_idx + 1, sid_locs]
+            )
+        return results
@@ -12,8 +12,19 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import OrderedDict
+import warnings
 
 from logbook import Logger
+import numpy as np
+import pandas as pd
+
+from zipline.assets import Future
+from zipline.data.corporate_actions import CorporateActionIndex
+from zipline.data.us_equity_pricing import NoDataOnDate
+from zipline.errors import NoFurtherDataError
+from zipline.pipeline.data import USEquityPricing
+from zipline.utils.memoize import lazyval
 
 log = Logger('DataPortal')
 
@@ -28,15 +39,89 @@ BASE_FIELDS = {
     'price': 'close'
 }
 
+STOCK_DIVIDEND_FIELDS = (
+    'sid',
+    'ex_date',
+    'declared_date',
+    'record_date',
+    'pay_date',
+    'payment_sid',
+    'ratio',
+)
+
+# Maximum number of distinct history windows kept for sliding updates.
+DEFAULT_HISTORY_WINDOW_CACHE_SIZE = 256
+
+_NO_ADJUSTMENTS = (
+    np.array([], dtype='datetime64[ns]'),
+    np.array([], dtype=np.float64),
+    np.array([], dtype=np.float64),
+)
+
+
+def _day_bounds(start_day, end_day):
+    """
+    Convert a pair of days to an array of datetime64[ns].
+    """
+    return np.array(
+        [pd.Timestamp(start_day).value, pd.Timestamp(end_day).value],
+        dtype=np.int64,
+    ).view('datetime64[ns]')
+
+
+def _ffill_rows(values):
+    """
+    Forward-fill NaNs down each column of `values` in place.
+    """
+    for i in range(1, len(values)):
+        row = values[i]
+        missing = np.isnan(row)
+        row[missing] = values[i - 1][missing]
+
 
 class DataPortal(object):
+    """
+    Interface to all of the pricing and adjustment data available to a
+    simulation.
+
+    Prices are read directly from the daily and minute bar readers, and
+    history windows are adjusted for splits, mergers and dividends from the
+    adjustment reader.
+
+    Parameters
+    ----------
+    env : TradingEnvironment
+        The trading environment supplying the trading calendar.
+    equity_daily_reader : BcolzDailyBarReader, optional
+        Reader for daily equity bars.
+    equity_minute_reader : BcolzMinuteBarReader, optional
+        Reader for minute equity bars.
+    future_daily_reader : FutureDailyReader, optional
+        Reader for daily future bars.
+    future_minute_reader : FutureMinuteReader, optional
+        Reader for minute future bars.
+    adjustment_reader : SQLiteAdjustmentReader, optional
+        Reader for splits, mergers and dividends.  Without one, no
+        adjustments are applied.
+    history_window_cache_size : int, optional
+        The number of distinct history windows to keep.  Requesting a window
+        one bar after a kept window only reads the new bar.
+
+    Notes
+    -----
+    Spot values are cached until a value is requested for a different dt,
+    so looking up the same asset and field many times in one bar only reads
+    it once.
+    """
     def __init__(self,
                  env,
                  equity_daily_reader=None,
                  equity_minute_reader=None,
                  future_daily_reader=None,
                  future_minute_reader=None,
-                 adjustment_reader=None):
+                 adjustment_reader=None,
+                 history_window_cache_size=DEFAULT_HISTORY_WINDOW_CACHE_SIZE):
+        self.env = env
 
         self._adjustment_reader = adjustment_reader
 
@@ -45,6 +130,58 @@ class DataPortal(object):
         self._future_daily_reader = future_daily_reader
         self._future_minute_reader = future_minute_reader
 
+        # (sid, field, data_frequency) -> value at self._spot_value_cache_dt
+        self._spot_value_cache_dt = None
+        self._spot_value_cache = {}
+
+        # sid -> (effective dates, price ratios, volume ratios)
+        self._adjustments_cache = {}
+
+        # (frequency, sids, bar_count, column, ffill) -> (dts, values), in
+        # least to most recently used order.
+        self._history_windows = OrderedDict()
+        self._history_window_cache_size = history_window_cache_size
+
+    def _get_reader(self, asset, data_frequency):
+        if isinstance(asset, Future):
+            if data_frequency == 'daily':
+                reader = self._future_daily_reader
+            else:
+                reader = self._future_minute_reader
+        elif data_frequency == 'daily':
+            reader = self._equity_daily_reader
+        else:
+            reader = self._equity_minute_reader
+        if reader is None:
+            raise ValueError(
+                "No {0} data available for {1}.".format(data_frequency, asset)
+            )
+        return reader
+
+    def _get_window_reader(self, assets, data_frequency):
+        """
+        Get the single reader from which a history window of `assets` is
+        read.
+
+        Raises a ValueError if `assets` are read from different readers,
+        e.g. if they mix equities and futures.
+        """
+        reader = None
+        for asset in assets:
+            asset_reader = self._get_reader(asset, data_frequency)
+            if reader is None:
+                reader = asset_reader
+            elif asset_reader is not reader:
+                raise ValueError(
+                    "Cannot get a {0} history window of assets with "
+                    "different readers: {1}".format(data_frequency, assets)
+                )
+        if reader is None:
+            # There are no assets, so the window is empty whichever reader
+            # it's read from.
+            reader = self._get_reader(None, data_frequency)
+        return reader
+
     def get_previous_value(self, asset, field, dt, data_frequency):
         """
         Given an asset and a column and a dt, returns the previous value for
@@ -73,7 +210,11 @@ class DataPortal(object):
         -------
         The value of the desired field at the desired time.
         """
-        raise NotImplementedError
+        if data_frequency == 'daily':
+            previous_dt = self.env.previous_trading_day(dt)
+        else:
+            previous_dt = self.env.previous_market_minute(dt)
+        return self._get_spot_value(asset, field, previous_dt, data_frequency)
 
     def get_spot_value(self, asset, field, dt, data_frequency):
         """
@@ -83,7 +224,7 @@ class DataPortal(object):
         Parameters
         ---------
         asset : Asset
-            The asset whose data is desired.gith
+            The asset whose data is desired.
 
         field: string
             The desired field of the asset.  Valid values are "open",
@@ -101,7 +242,147 @@ class DataPortal(object):
         -------
         The value of the desired field at the desired time.
         """
-        raise NotImplementedError
+        if dt != self._spot_value_cache_dt:
+            self._spot_value_cache.clear()
+            self._spot_value_cache_dt = dt
+
+        key = (int(asset), field, data_frequency)
+        try:
+            return self._spot_value_cache[key]
+        except KeyError:
+            value = self._spot_value_cache[key] = self._get_spot_value(
+                asset, field, dt, data_frequency,
+            )
+            return value
+
+    def _get_spot_value(self, asset, field, dt, data_frequency):
+        try:
+            column = BASE_FIELDS[field]
+        except KeyError:
+            raise KeyError("Invalid column: " + str(field))
+
+        # Only 'price' is forward-filled from the asset's last trade.
+        ffill = field == 'price'
+        if data_frequency == 'daily':
+            return self._get_daily_spot_value(asset, column, dt, ffill)
+        return self._get_minute_spot_value(asset, column, dt, ffill)
+
+    def _get_daily_spot_value(self, asset, column, dt, ffill):
+        reader = self._get_reader(asset, 'daily')
+        day = self.env.normalize_date(dt)
+        try:
+            value = reader.spot_price(int(asset), day, column)
+        except NoDataOnDate:
+            return 0 if column == 'volume' else np.nan
+
+        # The daily reader returns -1 where the price is 0, i.e. there was
+        # no trade.
+        if value != -1:
+            return value
+        if column == 'volume':
+            return 0
+        if not ffill:
+            return np.nan
+
+        sid = int(asset)
+        value, last_day = self._last_daily_trade(reader, sid, day)
+        return value * self._adjustment_ratio(sid, column, last_day, day)
+
+    def _last_daily_trade(self, reader, sid, day):
+        """
+        Find the close of `sid` on the last day before `day` on which it
+        traded, along with that day.  The close is unadjusted.
+        """
+        trading_days = self.env.trading_days
+        day_loc = trading_days.searchsorted(day)
+        for loc in range(day_loc - 1, -1, -1):
+            previous_day = trading_days[loc]
+            try:
+                value = reader.spot_price(sid, previous_day, 'close')
+            except NoDataOnDate:
+                break
+            if value != -1:
+                return value, previous_day
+        return np.nan, day
+
+    def _get_minute_spot_value(self, asset, column, dt, ffill):
+        reader = self._get_reader(asset, 'minute')
+        if not ffill:
+            return reader.get_value(int(asset), dt, column)
+
+        last_traded_dt = reader.get_last_traded_dt(int(asset), dt)
+        if last_traded_dt is pd.NaT:
+            return np.nan
+        value = reader.get_last_traded_value(int(asset), dt, column)
+        return value * self._adjustment_ratio(
+            int(asset),
+            column,
+            self.env.normalize_date(last_traded_dt),
+            self.env.normalize_date(dt),
+        )
+
+    def _get_adjustments(self, sid):
+        """
+        Get the effective dates and the price and volume ratios of all of the
+        splits, mergers and dividends of `sid`, sorted by effective date.
+        """
+        try:
+            return self._adjustments_cache[sid]
+        except KeyError:
+            pass
+
+        if self._adjustment_reader is None:
+            adjustments = _NO_ADJUSTMENTS
+        else:
+            adjustments = self._adjustment_reader.adjustments_of_sid(sid)
+        self._adjustments_cache[sid] = adjustments
+        return adjustments
+
+    def _get_column_adjustments(self, sid, column):
+        dates, price_ratios, volume_ratios = self._get_adjustments(sid)
+        if column == 'volume':
+            return dates, volume_ratios
+        return dates, price_ratios
+
+    def _adjustment_ratio(self, sid, column, start_day, end_day):
+        """
+        The product of the ratios of the adjustments to `column` for `sid`
+        effective after `start_day` and on or before `end_day`.
+        """
+        dates, ratios = self._get_column_adjustments(sid, column)
+        lo, hi = dates.searchsorted(
+            _day_bounds(start_day, end_day), side='right',
+        )
+        return ratios[lo:hi].prod()
+
+    def _has_adjustments(self, sids, start_day, end_day):
+        """
+        Whether any of `sids` has an adjustment effective after `start_day`
+        and on or before `end_day`.
+        """
+        bounds = _day_bounds(start_day, end_day)
+        for sid in sids:
+            lo, hi = self._get_adjustments(sid)[0].searchsorted(
+                bounds, side='right',
+            )
+            if hi > lo:
+                return True
+        return False
+
+    def _apply_adjustments(self, values, dts, sids, column):
+        """
+        Adjust the rows of `values`, labeled by `dts`, in place as of the day
+        of the last row.
+        """
+        row_days = np.asarray(
+            dts.normalize().values, dtype='datetime64[ns]',
+        )
+        bounds = row_days[[0, -1]]
+        for col, sid in enumerate(sids):
+            dates, ratios = self._get_column_adjustments(sid, column)
+            lo, hi = dates.searchsorted(bounds, side='right')
+            for effective_date, ratio in zip(dates[lo:hi], ratios[lo:hi]):
+                values[row_days < effective_date, col] *= ratio
 
     def get_history_window(self, assets, end_dt, bar_count, frequency, field,
                            ffill=True):
@@ -130,8 +411,247 @@ class DataPortal(object):
         Returns
         -------
         A dataframe containing the requested data.
+
+        Notes
+        -----
+        A window requested one bar after a window with the same assets,
+        length and field only reads the new bar, unless an adjustment took
+        effect in between.
+
+        When minute data is available and `end_dt` is intraday, the last bar
+        of a daily window is built from the minutes of the session through
+        `end_dt`.
         """
-        raise NotImplementedError
+        try:
+            column = BASE_FIELDS[field]
+        except KeyError:
+            raise KeyError("Invalid column: " + str(field))
+        ffill = ffill and field == 'price'
+        sids = tuple(int(asset) for asset in assets)
+
+        if frequency == '1m':
+            dts, values = self._get_window(
+                self._get_window_reader(assets, 'minute'),
+                'minute',
+                sids,
+                end_dt,
+                bar_count,
+                column,
+                ffill,
+            )
+        elif frequency == '1d':
+            dts, values = self._get_daily_history_window(
+                assets, sids, end_dt, bar_count, column, ffill,
+            )
+        else:
+            raise ValueError("Invalid frequency: {0}".format(frequency))
+
+        # The cached windows are shared with later calls.
+        return pd.DataFrame(values.copy(), index=dts, columns=list(assets))
+
+    def _get_daily_history_window(self, assets, sids, end_dt, bar_count,
+                                  column, ffill):
+        reader = self._get_window_reader(assets, 'daily')
+        end_day = self.env.normalize_date(end_dt)
+        minute_reader = None
+        if end_dt != end_day:
+            try:
+                minute_reader = self._get_window_reader(assets, 'minute')
+            except ValueError:
+                # Without minute data, the daily bars are used as they are.
+                pass
+        if minute_reader is None:
+            return self._get_window(
+                reader, 'daily', sids, end_day, bar_count, column, ffill,
+            )
+
+        # The session containing end_dt is still in progress, so its bar is
+        # aggregated from the minutes traded so far.
+        partial = self._partial_session_bar(
+            minute_reader, sids, end_dt, column,
+        )
+        if bar_count == 1:
+            dts = pd.DatetimeIndex([end_day])
+            values = partial[np.newaxis]
+            if ffill:
+                self._seed_window(reader, values, dts, sids, 'daily')
+            return dts, values
+
+        dts, values = self._get_window(
+            reader,
+            'daily',
+            sids,
+            self.env.previous_trading_day(end_day),
+            bar_count - 1,
+            column,
+            ffill,
+        )
+        if ffill:
+            missing = np.isnan(partial)
+            partial[missing] = values[-1][missing]
+        return (
+            dts.append(pd.DatetimeIndex([end_day])),
+            np.vstack([values, partial]),
+        )
+
+    def _partial_session_bar(self, reader, sids, end_dt, column):
+        """
+        Aggregate the minutes of the session containing `end_dt`, through
+        `end_dt`, into a single bar.
+        """
+        market_open, _ = self.env.get_open_and_close(end_dt)
+        minutes = reader.unadjusted_window(
+            [column], market_open, end_dt, sids,
+        )[0].astype(np.float64)
+
+        if column == 'volume':
+            return minutes.sum(axis=1)
+
+        with warnings.catch_warnings():
+            # Sids without any trades in the session have all-NaN rows.
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            if column == 'high':
+                return np.nanmax(minutes, axis=1)
+            if column == 'low':
+                return np.nanmin(minutes, axis=1)
+
+        traded = ~np.isnan(minutes)
+        if column == 'open':
+            ix = traded.argmax(axis=1)
+        else:
+            ix = minutes.shape[1] - 1 - traded[:, ::-1].argmax(axis=1)
+        out = minutes[np.arange(len(sids)), ix]
+        out[~traded.any(axis=1)] = np.nan
+        return out
+
+    def _get_window(self, reader, frequency, sids, end, bar_count, column,
+                    ffill):
+        """
+        Get the adjusted (bar_count, len(sids)) window of `column` ending at
+        `end` from `reader`, sliding a cached window forward by one bar if
+        possible.
+        """
+        key = (frequency, sids, bar_count, column, ffill)
+        windows = self._history_windows
+        cached = windows.pop(key, None)
+        if cached is not None:
+            dts, values = cached
+            if dts[-1] == end:
+                windows[key] = cached
+                return cached
+            if (self._next_bar(dts[-1], frequency) == end and
+                    not self._has_adjustments(
+                        sids,
+                        self.env.normalize_date(dts[-1]),
+                        self.env.normalize_date(end),
+                    )):
+                row = self._read_bar(reader, sids, end, column, frequency)
+                if ffill:
+                    missing = np.isnan(row)
+                    row[missing] = values[-1][missing]
+                cached = windows[key] = (
+                    dts[1:].append(pd.DatetimeIndex([end])),
+                    np.vstack([values[1:], row]),
+                )
+                return cached
+
+        dts = self._window_dts(end, bar_count, frequency)
+        values = self._read_window(reader, sids, dts, column, frequency)
+        self._apply_adjustments(values, dts, sids, column)
+        if ffill:
+            self._seed_window(reader, values, dts, sids, frequency)
+            _ffill_rows(values)
+
+        if self._history_window_cache_size:
+            if len(windows) >= self._history_window_cache_size:
+                windows.popitem(last=False)
+            windows[key] = dts, values
+        return dts, values
+
+    def _next_bar(self, dt, frequency):
+        if frequency == 'minute':
+            return self.env.next_market_minute(dt)
+        return self.env.next_trading_day(dt)
+
+    def _window_dts(self, end, bar_count, frequency):
+        if frequency == 'minute':
+            return self.env.market_minute_window(end, bar_count, step=-1)[::-1]
+
+        trading_days = self.env.trading_days
+        end_loc = trading_days.get_loc(end)
+        if end_loc + 1 < bar_count:
+            raise NoFurtherDataError(
+                msg="Cannot get a window of {0} days ending on {1}.".format(
+                    bar_count, end,
+                )
+            )
+        return trading_days[end_loc + 1 - bar_count:end_loc + 1]
+
+    def _read_window(self, reader, sids, dts, column, frequency):
+        """
+        Read the unadjusted values of `column` for `sids` at `dts` from
+        `reader`, as a (len(dts), len(sids)) array of float64.
+        """
+        if frequency == 'minute':
+            raw = reader.unadjusted_window([column], dts[0], dts[-1], sids)[0]
+            # The window read from the minute reader may include minutes
+            # after an early close, which are not market minutes.
+            positions = reader._find_positions_of_minutes(dts)
+            return raw[:, positions - positions[0]].T.astype(np.float64)
+
+        return reader.load_raw_arrays(
+            [getattr(USEquityPricing, column)],
+            dts[0],
+            dts[-1],
+            pd.Int64Index(sids),
+        )[0].astype(np.float64)
+
+    def _read_bar(self, reader, sids, dt, column, frequency):
+        """
+        Read the unadjusted values of `column` for `sids` at `dt` from
+        `reader`.
+        """
+        if frequency == 'minute':
+            return reader.get_values(sids, dt, [column])[0].astype(np.float64)
+
+        values = reader.spot_prices(sids, dt, [column])[0]
+        # spot_prices returns -1 where there was no trade, and NaN for sids
+        # without data on the day.
+        if column == 'volume':
+            values[(values == -1) | np.isnan(values)] = 0
+        else:
+            values[values == -1] = np.nan
+        return values
+
+    def _seed_window(self, reader, values, dts, sids, frequency):
+        """
+        Fill the NaNs in the first row of the adjusted window `values` with
+        each sid's last close before the window, as read from `reader`.
+        """
+        end_day = self.env.normalize_date(dts[-1])
+        first_row = values[0]
+        for col in np.flatnonzero(np.isnan(first_row)):
+            sid = sids[col]
+            if frequency == 'minute':
+                last_dt = reader.get_last_traded_dt(sid, dts[0])
+                if last_dt is pd.NaT:
+                    continue
+                value = reader.get_last_traded_value(sid, dts[0], 'close')
+                last_day = self.env.normalize_date(last_dt)
+            else:
+                value, last_day = self._last_daily_trade(reader, sid, dts[0])
+            first_row[col] = value * self._adjustment_ratio(
+                sid, 'close', last_day, end_day,
+            )
+
+    @lazyval
+    def _corporate_actions(self):
+        # Built on first use, so simulations without corporate actions never
+        # read the tables.
+        return CorporateActionIndex.from_adjustment_reader(
+            self._adjustment_reader,
+            self.env.trading_days,
+        )
 
     def get_splits(self, sids, dt):
         """
@@ -150,7 +670,11 @@ class DataPortal(object):
         -------
         list: List of splits, where each split is a (sid, ratio) tuple.
         """
-        raise NotImplementedError
+        if self._adjustment_reader is None or not sids:
+            return []
+
+        splits = self._corporate_actions.splits.on(dt, sids)
+        return list(zip(splits['sid'].tolist(), splits['ratio'].tolist()))
 
     def get_stock_dividends(self, sid, trading_days):
         """
@@ -170,7 +694,23 @@ class DataPortal(object):
         list: A list of objects with all relevant attributes populated.
         All timestamp fields are converted to pd.Timestamps.
         """
-        raise NotImplementedError
+        if self._adjustment_reader is None or not len(trading_days):
+            return []
+
+        dividends = self._corporate_actions.stock_dividend_payouts.between(
+            trading_days[0], trading_days[-1], [sid],
+        )
+        out = []
+        for row in zip(*(dividends[field].tolist()
+                         for field in STOCK_DIVIDEND_FIELDS)):
+            dividend = dict(zip(STOCK_DIVIDEND_FIELDS, row))
+            for field in ('ex_date', 'declared_date', 'record_date',
+                          'pay_date'):
+                dividend[field] = pd.Timestamp(
+                    dividend[field], unit='s', tz='UTC',
+                )
+            out.append(dividend)
+        return out
 
     def get_fetcher_assets(self, day):
         """
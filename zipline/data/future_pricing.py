@@ -11,17 +11,347 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import namedtuple
+import os
 
+import numpy as np
+import pandas as pd
 
-class FutureDailyReader(object):
+from zipline.data.minute_bars import (
+    BcolzMinuteBarReader,
+    DEFAULT_MAX_OPEN_CARRAYS,
+)
+from zipline.data.us_equity_pricing import BcolzDailyBarReader
+
+ADJUSTMENT_STYLES = frozenset(['mul', 'add', None])
+
+# Minimal stand-in for a BoundColumn, which is all load_raw_arrays reads.
+_Column = namedtuple('_Column', ['name'])
+
+
+class FutureDailyReader(BcolzDailyBarReader):
     """
-    Stubbed out. Currently unimplemented.
+    Reader for daily future bars.
+
+    Future bars are written by BcolzDailyBarWriter in the same format as
+    equity bars, one block of rows per contract, so the reader supports the
+    same ``load_raw_arrays``, ``spot_price`` and ``spot_prices`` API as
+    BcolzDailyBarReader.
     """
-    pass
 
 
-class FutureMinuteReader(object):
+class FutureMinuteReader(BcolzMinuteBarReader):
+    """
+    Reader for minute future bars written by BcolzMinuteBarWriter.
 
-    def __init__(self, rootdir, sid_path_func=None):
+    Parameters
+    ----------
+    rootdir : str
+        The root directory containing the metadata and contract bcolz
+        directories.
+    sid_path_func : callable, optional
+        Function of (rootdir, sid) returning the directory containing the
+        carrays of a contract, for stores not using the default sid
+        subdirectory layout.
+    chunk_cache : ChunkCache, optional
+        Cache of decompressed chunks through which all reads are served.
+    max_open_carrays : int, optional
+        The maximum number of (field, sid) carrays to keep open.
+    num_threads : int, optional
+        The number of threads across which ``unadjusted_window`` splits the
+        requested sids.
+    """
+    def __init__(self,
+                 rootdir,
+                 sid_path_func=None,
+                 chunk_cache=None,
+                 max_open_carrays=DEFAULT_MAX_OPEN_CARRAYS,
+                 num_threads=1):
+        super(FutureMinuteReader, self).__init__(
+            rootdir,
+            chunk_cache=chunk_cache,
+            max_open_carrays=max_open_carrays,
+            num_threads=num_threads,
+        )
         self.rootdir = rootdir
         self.sid_path_func = sid_path_func
+
+    def _get_carray_path(self, sid, field, partition=None):
+        if self.sid_path_func is None:
+            return super(FutureMinuteReader, self)._get_carray_path(
+                sid, field, partition,
+            )
+        rootdir = self.rootdir
+        if partition is not None:
+            rootdir = os.path.join(rootdir, partition)
+        return os.path.join(self.sid_path_func(rootdir, sid), field)
+
+
+def _is_valid_date(dt):
+    return dt is not None and not pd.isnull(dt)
+
+
+def _roll_date(contract):
+    """
+    The date on which positions in `contract` are closed: its auto close
+    date, or else the earlier of its notice and expiration dates.
+
+    Returns None if the contract has none of those dates.
+    """
+    if _is_valid_date(contract.auto_close_date):
+        return pd.Timestamp(contract.auto_close_date).normalize()
+    dates = [
+        dt for dt in (contract.notice_date, contract.expiration_date)
+        if _is_valid_date(dt)
+    ]
+    if not dates:
+        return None
+    return pd.Timestamp(min(dates)).normalize()
+
+
+class RollSchedule(namedtuple('RollSchedule', ['sids',
+                                               'contract_ix',
+                                               'adjustments'])):
+    """
+    The front contract of a root symbol on each trading day, and the
+    back-adjustment applied to its prices.
+
+    Parameters
+    ----------
+    sids : np.ndarray[int64]
+        The contracts of the chain, in roll order.
+    contract_ix : np.ndarray[intp]
+        For each trading day, the index into `sids` of the front contract, or
+        -1 if no contract of the chain is trading.
+    adjustments : np.ndarray[float64]
+        For each trading day, the factor by which (or amount to which) the
+        front contract's prices are multiplied (or added) to be continuous
+        with the prices of the last contract.
+    """
+    __slots__ = ()
+
+
+class ContinuousFutureBuilder(object):
+    """
+    Builds back-adjusted continuous price series for future root symbols
+    from the daily bars of their contracts.
+
+    The front contract of a root symbol is the first contract in its chain,
+    as returned by ``AssetFinder.lookup_future_chain``, which has not reached
+    its roll date: its auto close date, or the earlier of its notice and
+    expiration dates.  At each roll, the prices of every earlier day are
+    adjusted by the ratio of (or difference between) the new and old
+    contracts' closes on the day before the roll, so the series has no jumps
+    at rolls.
+
+    The roll schedule and adjustments of a root symbol are computed once,
+    over the whole calendar, and the series of each field is cached, so
+    windows are slices of in-memory arrays.
+
+    Parameters
+    ----------
+    asset_finder : zipline.assets.AssetFinder
+        The finder used to look up the chain of each root symbol.
+    daily_reader : FutureDailyReader
+        The reader of the contracts' daily bars.
+    trading_days : pd.DatetimeIndex
+        The trading days over which series are built.
+    roll_offset : int, optional
+        The number of trading days before a contract's roll date on which to
+        roll to the next contract.
+    adjustment : {'mul', 'add', None}, optional
+        Whether earlier prices are multiplied by the ratio of, or added to the
+        difference between, the new and old contracts' closes at each roll.
+        If None, prices are not adjusted.
+    """
+    def __init__(self,
+                 asset_finder,
+                 daily_reader,
+                 trading_days,
+                 roll_offset=0,
+                 adjustment='mul'):
+        if adjustment not in ADJUSTMENT_STYLES:
+            raise ValueError(
+                "adjustment must be one of 'mul', 'add' or None, got %r" % (
+                    adjustment,
+                )
+            )
+        self._asset_finder = asset_finder
+        self._daily_reader = daily_reader
+        self._trading_days = trading_days
+        self._roll_offset = roll_offset
+        self._adjustment = adjustment
+        # root_symbol -> RollSchedule
+        self._schedules = {}
+        # (root_symbol, field) -> np.ndarray[float64] over trading_days
+        self._series = {}
+
+    def roll_schedule(self, root_symbol):
+        """
+        Get the RollSchedule of a root symbol.
+
+        Parameters
+        ----------
+        root_symbol : str
+            The root symbol of the chain.
+
+        Returns
+        -------
+        schedule : RollSchedule
+            The front contract and adjustment of each trading day.
+        """
+        try:
+            return self._schedules[root_symbol]
+        except KeyError:
+            pass
+
+        trading_days = self._trading_days
+        num_days = len(trading_days)
+
+        chain = []
+        roll_locs = []
+        for contract in self._asset_finder.lookup_future_chain(
+                root_symbol, pd.NaT):
+            roll_date = _roll_date(contract)
+            if roll_date is None:
+                continue
+            chain.append(contract.sid)
+            roll_locs.append(trading_days.searchsorted(roll_date))
+        sids = np.array(chain, dtype=np.int64)
+
+        # Contract i is the front contract on the days in
+        # [roll_locs[i - 1], roll_locs[i]).
+        roll_locs = np.clip(
+            np.array(roll_locs, dtype=np.intp) - self._roll_offset,
+            0,
+            num_days,
+        )
+        roll_locs = np.maximum.accumulate(roll_locs)
+        contract_ix = roll_locs.searchsorted(
+            np.arange(num_days), side='right',
+        )
+        contract_ix[contract_ix == len(sids)] = -1
+
+        if self._adjustment == 'mul':
+            adjustments = np.ones(num_days)
+        else:
+            adjustments = np.zeros(num_days)
+
+        if self._adjustment is not None:
+            rolls = np.flatnonzero(contract_ix[1:] != contract_ix[:-1]) + 1
+            for roll in rolls[::-1]:
+                old, new = contract_ix[roll - 1], contract_ix[roll]
+                if old == -1 or new == -1:
+                    continue
+                old_close, new_close = self._daily_reader.spot_prices(
+                    sids[[old, new]], trading_days[roll - 1], ['close'],
+                )[0]
+                if not (old_close > 0 and new_close > 0):
+                    # Without both closes there is nothing to adjust by.
+                    continue
+                if self._adjustment == 'mul':
+                    adjustments[:roll] *= new_close / old_close
+                else:
+                    adjustments[:roll] += new_close - old_close
+
+        schedule = self._schedules[root_symbol] = RollSchedule(
+            sids, contract_ix, adjustments,
+        )
+        return schedule
+
+    def _field_series(self, root_symbol, field):
+        try:
+            return self._series[root_symbol, field]
+        except KeyError:
+            pass
+
+        trading_days = self._trading_days
+        sids, contract_ix, adjustments = self.roll_schedule(root_symbol)
+        out = np.full(len(trading_days), np.nan)
+
+        active = np.flatnonzero(contract_ix != -1)
+        if len(active):
+            start, stop = active[0], active[-1] + 1
+            # Read every contract of the chain over the span in which the
+            # chain trades, then select the front contract of each day.
+            raw = self._daily_reader.load_raw_arrays(
+                [_Column(field)],
+                trading_days[start],
+                trading_days[stop - 1],
+                pd.Int64Index(sids),
+            )[0].astype(np.float64)
+            ix = contract_ix[start:stop]
+            valid = ix != -1
+            out[start:stop][valid] = raw[np.flatnonzero(valid), ix[valid]]
+
+            if field == 'volume':
+                # Missing volume is 0, like the readers' volume windows.
+                out[np.isnan(out)] = 0
+            elif self._adjustment == 'mul':
+                out *= adjustments
+            elif self._adjustment == 'add':
+                out += adjustments
+
+        self._series[root_symbol, field] = out
+        return out
+
+    def load_raw_arrays(self, columns, start_date, end_date, root_symbols):
+        """
+        Load continuous series of root symbols.
+
+        Parameters
+        ----------
+        columns : list of BoundColumn or objects with a ``name`` attribute
+            'open', 'high', 'low', 'close', or 'volume'
+        start_date : pd.Timestamp
+            The first trading day of the window.
+        end_date : pd.Timestamp
+            The last trading day of the window, inclusive.
+        root_symbols : list[str]
+            The root symbols to load.
+
+        Returns
+        -------
+        list of np.ndarray[float64]
+            An array per column of shape (days in window, len(root_symbols)).
+            Prices are back-adjusted and NaN on days with no front contract
+            or no trade.  Volume is not adjusted, and is 0 where there is no
+            trade.
+        """
+        start = self._trading_days.get_loc(start_date)
+        stop = self._trading_days.get_loc(end_date) + 1
+        return [
+            np.column_stack([
+                self._field_series(root_symbol, column.name)[start:stop]
+                for root_symbol in root_symbols
+            ])
+            for column in columns
+        ]
+
+    def front_contracts(self, root_symbol, start_date, end_date):
+        """
+        Get the front contract of a root symbol on each trading day.
+
+        Parameters
+        ----------
+        root_symbol : str
+            The root symbol of the chain.
+        start_date : pd.Timestamp
+            The first trading day.
+        end_date : pd.Timestamp
+            The last trading day, inclusive.
+
+        Returns
+        -------
+        contracts : pd.Series[int64]
+            The sid of the front contract on each trading day, or -1 if no
+            contract of the chain is trading.
+        """
+        sids, contract_ix, _ = self.roll_schedule(root_symbol)
+        start = self._trading_days.get_loc(start_date)
+        stop = self._trading_days.get_loc(end_date) + 1
+        ix = contract_ix[start:stop]
+        return pd.Series(
+            np.where(ix == -1, -1, sids[ix]),
+            index=self._trading_days[start:stop],
+        )
@@ -0,0 +1,455 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-memory index of the price adjustments in an adjustments database.
+"""
+import numpy as np
+import pandas as pd
+
+from zipline.lib.adjustment import (
+    Float64Multiply,
+    MULTIPLY,
+    PackedAdjustments,
+)
+
+# The adjustment tables, in the order their adjustments are applied.  Splits
+# also adjust volume, by the inverse of their ratio.
+SPLIT, MERGER, DIVIDEND = 0, 1, 2
+ADJUSTMENT_TABLES = ('splits', 'mergers', 'dividends')
+
+# Sids and effective dates are packed into a single sort key of
+# sid << 32 | effective_date.  Effective dates are seconds since the epoch,
+# which fit in 32 bits until 2106.
+_DATE_BITS = 32
+
+
+def _keys(sids, dates):
+    return (
+        np.asarray(sids, dtype=np.int64) << _DATE_BITS
+    ) | np.asarray(dates, dtype=np.int64)
+
+
+class IndexedAdjustments(object):
+    """
+    The splits, mergers and dividends of an adjustments database, held in
+    memory as arrays sorted by (sid, effective_date).
+
+    Finding the adjustments of a set of assets over a range of dates is two
+    vectorized binary searches, rather than a query per table.
+
+    Parameters
+    ----------
+    sids : np.ndarray[int64]
+        The sid of each adjustment.
+    effective_dates : np.ndarray[int64]
+        The effective date of each adjustment, in seconds since the epoch.
+    ratios : np.ndarray[float64]
+        The ratio of each adjustment.
+    kinds : np.ndarray[int8]
+        The table of each adjustment: SPLIT, MERGER or DIVIDEND.
+    """
+    def __init__(self, sids, effective_dates, ratios, kinds):
+        keys = _keys(sids, effective_dates)
+        order = np.lexsort((kinds, keys))
+        self._keys = keys[order]
+        self._effective_dates = np.asarray(
+            effective_dates, dtype=np.int64,
+        )[order]
+        self._ratios = np.asarray(ratios, dtype=np.float64)[order]
+        self._kinds = np.asarray(kinds, dtype=np.int8)[order]
+
+    @classmethod
+    def from_sqlite(cls, conn):
+        """
+        Load every adjustment in a database written by SQLiteAdjustmentWriter.
+
+        Parameters
+        ----------
+        conn : sqlite3.Connection
+            The connection to the adjustments database.
+        """
+        rows = []
+        kinds = []
+        for kind, table in enumerate(ADJUSTMENT_TABLES):
+            table_rows = conn.execute(
+                "SELECT sid, effective_date, ratio FROM %s" % table
+            ).fetchall()
+            rows.extend(table_rows)
+            kinds.extend([kind] * len(table_rows))
+
+        if rows:
+            sids, effective_dates, ratios = zip(*rows)
+        else:
+            sids = effective_dates = ratios = ()
+        return cls(
+            np.array(sids, dtype=np.int64),
+            np.array(effective_dates, dtype=np.int64),
+            np.array(ratios, dtype=np.float64),
+            np.array(kinds, dtype=np.int8),
+        )
+
+    def __len__(self):
+        return len(self._keys)
+
+    def adjustments_of_sid(self, sid):
+        """
+        Get every adjustment of `sid`.
+
+        Parameters
+        ----------
+        sid : int
+            The asset whose adjustments are needed.
+
+        Returns
+        -------
+        effective_dates : np.ndarray[datetime64[ns]]
+            The effective date of each adjustment, in ascending order.
+        price_ratios : np.ndarray[float64]
+            The ratio by which each adjustment multiplies prices.
+        volume_ratios : np.ndarray[float64]
+            The ratio by which each adjustment multiplies volumes: the inverse
+            of the price ratio for splits, and 1 otherwise.
+        """
+        start, stop = self._keys.searchsorted(_keys([sid, sid + 1], 0))
+        price_ratios = self._ratios[start:stop]
+        volume_ratios = np.ones_like(price_ratios)
+        splits = self._kinds[start:stop] == SPLIT
+        volume_ratios[splits] = 1.0 / price_ratios[splits]
+        effective_dates = self._effective_dates[start:stop].astype(
+            'datetime64[s]',
+        ).astype('datetime64[ns]')
+        return effective_dates, price_ratios, volume_ratios
+
+    def _select(self, start_date, end_date, assets):
+        """
+        Get the positions in the index of the adjustments of `assets`
+        effective in [start_date, end_date], and the column of each.
+        """
+        assets = np.asarray(assets, dtype=np.int64)
+        starts = self._keys.searchsorted(
+            _keys(assets, start_date), side='left',
+        )
+        stops = self._keys.searchsorted(_keys(assets, end_date), side='right')
+
+        counts = stops - starts
+        total = counts.sum()
+        columns = np.repeat(np.arange(len(assets)), counts)
+        # Expand each [start, stop) into its positions.
+        offsets = np.arange(total) - np.repeat(
+            np.cumsum(counts) - counts, counts,
+        )
+        return np.repeat(starts, counts) + offsets, columns
+
+    def _adjustments_between(self, dates, assets):
+        """
+        Get the kind, row, column and ratio of each adjustment of `assets`
+        over `dates`, in the order they are applied.
+        """
+        dates_seconds = dates.asi8 // 1000000000
+        positions, asset_ixs = self._select(
+            dates_seconds[0], dates_seconds[-1], assets,
+        )
+        date_locs = dates_seconds.searchsorted(
+            self._effective_dates[positions], side='left',
+        )
+
+        # Apply splits, then mergers, then dividends.
+        kinds = self._kinds[positions]
+        order = np.argsort(kinds, kind='mergesort')
+        return (
+            kinds[order],
+            date_locs[order],
+            asset_ixs[order],
+            self._ratios[positions][order],
+        )
+
+    def load_packed_adjustments(self, columns, dates, assets):
+        """
+        Build the adjustments of `assets` over `dates` as PackedAdjustments,
+        without creating an object per adjustment.
+
+        Parameters
+        ----------
+        columns : list[str]
+            List of column names for which adjustments are needed.
+        dates : pd.DatetimeIndex
+            Dates for which adjustments are needed.
+        assets : pd.Int64Index
+            Assets for which adjustments are needed.
+
+        Returns
+        -------
+        adjustments : list[PackedAdjustments]
+            The adjustments of each column.  Each packs the same adjustments
+            as the corresponding dict returned by ``load_adjustments``.
+        """
+        kinds, date_locs, asset_ixs, ratios = self._adjustments_between(
+            dates, assets,
+        )
+        splits = kinds == SPLIT
+
+        results = []
+        for column in columns:
+            if column != 'volume':
+                rows, cols, values = date_locs, asset_ixs, ratios
+            else:
+                rows = date_locs[splits]
+                cols = asset_ixs[splits]
+                values = 1.0 / ratios[splits]
+            results.append(PackedAdjustments(
+                rows=rows,
+                first_rows=np.zeros_like(rows),
+                last_rows=rows,
+                first_cols=cols,
+                last_cols=cols,
+                kinds=np.full(len(rows), MULTIPLY, dtype=np.uint8),
+                values=values,
+            ))
+        return results
+
+    def load_adjustments(self, columns, dates, assets):
+        """
+        Build the adjustments of `assets` over `dates`.
+
+        Produces the same output as ``load_adjustments_from_sqlite``.
+
+        Parameters
+        ----------
+        columns : list[str]
+            List of column names for which adjustments are needed.
+        dates : pd.DatetimeIndex
+            Dates for which adjustments are needed.
+        assets : pd.Int64Index
+            Assets for which adjustments are needed.
+
+        Returns
+        -------
+        adjustments : list[dict[int -> list[Float64Multiply]]]
+            A dict per column mapping row index to the adjustments applied at
+            that row.
+        """
+        kinds, date_locs, asset_ixs, ratios = self._adjustments_between(
+            dates, assets,
+        )
+
+        results = [{} for _ in columns]
+        for kind, date_loc, asset_ix, ratio in zip(kinds.tolist(),
+                                                   date_locs.tolist(),
+                                                   asset_ixs.tolist(),
+                                                   ratios.tolist()):
+            price_adj = Float64Multiply(0, date_loc, asset_ix, asset_ix, ratio)
+            for column, col_adjustments in zip(columns, results):
+                if column != 'volume':
+                    adj = price_adj
+                elif kind == SPLIT:
+                    adj = Float64Multiply(
+                        0, date_loc, asset_ix, asset_ix, 1.0 / ratio,
+                    )
+                else:
+                    continue
+                try:
+                    col_adjustments[date_loc].append(adj)
+                except KeyError:
+                    col_adjustments[date_loc] = [adj]
+        return results
+
+
+class AdjustmentFactors(object):
+    """
+    The cumulative price and volume adjustment factors of each sid, stored at
+    the effective dates of its adjustments.
+
+    The factor of a sid on a day is the product of the ratios of all of its
+    adjustments effective after that day, so the prices of day ``t`` as of
+    day ``D`` are the raw prices of ``t`` multiplied by
+    ``factor[t] / factor[D]``.  Volume factors are the product of the
+    inverse ratios of splits only.
+
+    Parameters
+    ----------
+    sids : np.ndarray[int64]
+        The sid of each factor.
+    effective_dates : np.ndarray[int64]
+        The effective date of each factor, in seconds since the epoch.  Each
+        factor applies to the days before its effective date and on or after
+        the previous effective date of the same sid.
+    price_factors : np.ndarray[float64]
+        The cumulative price factor of each row.
+    volume_factors : np.ndarray[float64]
+        The cumulative volume factor of each row.
+    """
+    def __init__(self, sids, effective_dates, price_factors, volume_factors):
+        keys = _keys(sids, effective_dates)
+        order = np.argsort(keys, kind='mergesort')
+        self._keys = keys[order]
+        self._price_factors = np.asarray(
+            price_factors, dtype=np.float64,
+        )[order]
+        self._volume_factors = np.asarray(
+            volume_factors, dtype=np.float64,
+        )[order]
+
+    @classmethod
+    def from_adjustments(cls, adjustments):
+        """
+        Compute the cumulative factors of an IndexedAdjustments.
+
+        Parameters
+        ----------
+        adjustments : IndexedAdjustments
+            The splits, mergers and dividends from which to compute factors.
+        """
+        ratios = adjustments._ratios
+        frame = pd.DataFrame({
+            'sid': adjustments._keys >> _DATE_BITS,
+            'effective_date': adjustments._effective_dates,
+            'price_factor': ratios,
+            'volume_factor': np.where(
+                adjustments._kinds == SPLIT, 1.0 / ratios, 1.0,
+            ),
+        })
+        # Multiply the ratios of each sid from its last adjustment backwards.
+        frame = frame.iloc[::-1]
+        factors = ['price_factor', 'volume_factor']
+        frame[factors] = frame.groupby('sid')[factors].cumprod()
+        # The last of the reversed rows of a date includes every adjustment
+        # on that date.
+        frame = frame.groupby(['sid', 'effective_date']).last().reset_index()
+        return cls(
+            frame['sid'].values,
+            frame['effective_date'].values,
+            frame['price_factor'].values,
+            frame['volume_factor'].values,
+        )
+
+    @classmethod
+    def from_sqlite(cls, conn):
+        """
+        Load the factors written by SQLiteAdjustmentWriter.
+
+        Parameters
+        ----------
+        conn : sqlite3.Connection
+            The connection to the adjustments database.
+        """
+        exists = conn.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'adjustment_factors'"
+        ).fetchall()
+        if not exists:
+            raise ValueError(
+                "The adjustments database has no adjustment factors. Write "
+                "it with SQLiteAdjustmentWriter.write(..., "
+                "adjustment_factors=True)."
+            )
+        rows = conn.execute(
+            "SELECT sid, effective_date, price_factor, volume_factor "
+            "FROM adjustment_factors"
+        ).fetchall()
+        columns = list(zip(*rows)) or [()] * 4
+        return cls(
+            np.array(columns[0], dtype=np.int64),
+            np.array(columns[1], dtype=np.int64),
+            np.array(columns[2], dtype=np.float64),
+            np.array(columns[3], dtype=np.float64),
+        )
+
+    def __len__(self):
+        return len(self._keys)
+
+    def to_frame(self):
+        """
+        Get the factors as a frame with columns 'sid', 'effective_date',
+        'price_factor' and 'volume_factor'.
+        """
+        return pd.DataFrame(
+            {
+                'sid': self._keys >> _DATE_BITS,
+                'effective_date': self._keys & ((1 << _DATE_BITS) - 1),
+                'price_factor': self._price_factors,
+                'volume_factor': self._volume_factors,
+            },
+            columns=['sid', 'effective_date', 'price_factor', 'volume_factor'],
+        )
+
+    def load_factors(self, dates, assets):
+        """
+        Get the factors of `assets` on `dates`.
+
+        Parameters
+        ----------
+        dates : pd.DatetimeIndex
+            The days for which to get factors.
+        assets : pd.Int64Index
+            The assets for which to get factors.
+
+        Returns
+        -------
+        price_factors, volume_factors : np.ndarray[float64]
+            Arrays of shape (len(dates), len(assets)).
+        """
+        shape = (len(dates), len(assets))
+        if not len(self):
+            return np.ones(shape), np.ones(shape)
+
+        dates_seconds = dates.asi8 // 1000000000
+        assets = np.asarray(assets, dtype=np.int64)
+        # The factor of a day is that of the first adjustment effective
+        # after it, if the asset has one.
+        positions = self._keys.searchsorted(
+            _keys(assets[np.newaxis, :], dates_seconds[:, np.newaxis]),
+            side='right',
+        )
+        found = positions < len(self)
+        positions[~found] = 0
+        found &= (self._keys[positions] >> _DATE_BITS) == assets
+        return (
+            np.where(found, self._price_factors[positions], 1.0),
+            np.where(found, self._volume_factors[positions], 1.0),
+        )
+
+    def adjust(self, raw_arrays, columns, dates, assets, as_of_date):
+        """
+        Adjust raw arrays to be as of a day.
+
+        Parameters
+        ----------
+        raw_arrays : list[np.ndarray]
+            Unadjusted arrays of shape (len(dates), len(assets)), such as
+            those returned by ``BcolzDailyBarReader.load_raw_arrays``.
+        columns : list[str]
+            The column name of each array.
+        dates : pd.DatetimeIndex
+            The days of the rows of the arrays.
+        assets : pd.Int64Index
+            The assets of the columns of the arrays.
+        as_of_date : pd.Timestamp
+            The day as of which to adjust.  Every adjustment effective on or
+            before it and after a row's day is applied to that row.
+
+        Returns
+        -------
+        adjusted : list[np.ndarray[float64]]
+            The adjusted arrays.
+        """
+        price, volume = self.load_factors(dates, assets)
+        as_of_price, as_of_volume = self.load_factors(
+            pd.DatetimeIndex([as_of_date]), assets,
+        )
+        price /= as_of_price
+        volume /= as_of_volume
+        return [
+            raw * (volume if column == 'volume' else price)
+            for raw, column in zip(raw_arrays, columns)
+        ]
@@ -0,0 +1,404 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Uncompressed, memory-mapped storage for daily OHLCV bars.
+
+The data is laid out exactly like the tape written by ``BcolzDailyBarWriter``,
+but each column is stored as a raw little-endian ``.npy`` file instead of a
+compressed bcolz carray.  Readers map the files with ``np.load(...,
+mmap_mode='r')``, so opening a store is nearly free, no decompression is ever
+required, and every process reading the same store shares its pages through
+the OS page cache.
+"""
+import json
+import os
+
+from numpy import (
+    arange,
+    cumsum,
+    dtype,
+    full,
+    load as load_npy,
+    maximum,
+    nan,
+    repeat,
+    uint32,
+    zeros,
+)
+from numpy.lib.format import open_memmap
+from pandas import DatetimeIndex
+from six import iteritems
+
+from zipline.utils.memoize import lazyval
+
+from ._equities import _compute_row_slices
+from .us_equity_pricing import (
+    NoDataOnDate,
+    OHLC,
+    US_EQUITY_PRICING_BCOLZ_COLUMNS,
+    _calendar_locs,
+    _sid_day_indices,
+    _sid_lookup_arrays,
+    _spot_values,
+)
+
+RAW_DTYPE = dtype('<u4')
+
+
+class MemmapDailyBarMetadata(object):
+    """
+    Metadata describing the layout of a memory-mapped daily bar store.
+
+    Parameters
+    ----------
+    first_row : dict
+        Map from asset_id -> index of first row in the dataset with that id.
+    last_row : dict
+        Map from asset_id -> index of last row in the dataset with that id.
+    calendar_offset : dict
+        Map from asset_id -> calendar index of first row.
+    calendar : list[int64]
+        Calendar used to compute offsets, in asi8 format (ns since EPOCH).
+
+    These are the same values stored in the ``attrs`` of a ctable written by
+    ``BcolzDailyBarWriter``.
+    """
+    METADATA_FILENAME = 'metadata.json'
+
+    def __init__(self, first_row, last_row, calendar_offset, calendar):
+        self.first_row = first_row
+        self.last_row = last_row
+        self.calendar_offset = calendar_offset
+        self.calendar = calendar
+
+    @classmethod
+    def metadata_path(cls, rootdir):
+        return os.path.join(rootdir, cls.METADATA_FILENAME)
+
+    @classmethod
+    def read(cls, rootdir):
+        with open(cls.metadata_path(rootdir)) as fp:
+            raw_data = json.load(fp)
+        return cls(
+            raw_data['first_row'],
+            raw_data['last_row'],
+            raw_data['calendar_offset'],
+            raw_data['calendar'],
+        )
+
+    def write(self, rootdir):
+        """
+        Write the metadata to a JSON file in the rootdir.
+        """
+        metadata = {
+            'first_row': self.first_row,
+            'last_row': self.last_row,
+            'calendar_offset': self.calendar_offset,
+            'calendar': self.calendar,
+        }
+        with open(self.metadata_path(rootdir), 'w+') as fp:
+            json.dump(metadata, fp)
+
+
+def _column_path(rootdir, colname):
+    return os.path.join(rootdir, '{0}.npy'.format(colname))
+
+
+class MemmapDailyBarWriter(object):
+    """
+    Class capable of writing daily OHLCV data to disk in a format that can be
+    read by MemmapDailyBarReader.
+
+    Parameters
+    ----------
+    rootdir : str
+        Directory into which to write one ``.npy`` file per column and the
+        store's metadata.
+
+    See Also
+    --------
+    MemmapDailyBarReader : Consumer of the data written by this class.
+    """
+    # Number of rows to copy at a time when converting a bcolz table.
+    BLOCK_SIZE = 1 << 20
+
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+    def write_from_bcolz(self, table):
+        """
+        Convert a ctable written by BcolzDailyBarWriter.
+
+        Columns are copied a block at a time, so the table never needs to fit
+        in memory.
+
+        Parameters
+        ----------
+        table : bcolz.ctable
+            The table to convert.
+
+        Returns
+        -------
+        reader : MemmapDailyBarReader
+            A reader over the newly-written store.
+        """
+        if not os.path.exists(self._rootdir):
+            os.makedirs(self._rootdir)
+
+        block_size = self.BLOCK_SIZE
+        for colname in US_EQUITY_PRICING_BCOLZ_COLUMNS:
+            carray = table[colname]
+            nrows = len(carray)
+            out = open_memmap(
+                _column_path(self._rootdir, colname),
+                mode='w+',
+                dtype=RAW_DTYPE,
+                shape=(nrows,),
+            )
+            for start in range(0, nrows, block_size):
+                stop = start + block_size
+                out[start:stop] = carray[start:stop]
+            out.flush()
+            del out
+
+        MemmapDailyBarMetadata(
+            dict(table.attrs['first_row']),
+            dict(table.attrs['last_row']),
+            dict(table.attrs['calendar_offset']),
+            list(table.attrs['calendar']),
+        ).write(self._rootdir)
+        return MemmapDailyBarReader(self._rootdir)
+
+
+class MemmapDailyBarReader(object):
+    """
+    Reader for raw pricing data written by MemmapDailyBarWriter.
+
+    The data and the metadata are interpreted exactly as by
+    BcolzDailyBarReader, whose API this class implements.
+
+    Parameters
+    ----------
+    rootdir : str
+        The directory containing the store's ``.npy`` files and metadata.
+
+    Notes
+    -----
+    Columns are mapped read-only.  Reads only page in the rows that are
+    actually requested, and no per-process copy of a column is ever made.
+
+    See Also
+    --------
+    zipline.data.us_equity_pricing.BcolzDailyBarReader
+    """
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+        metadata = MemmapDailyBarMetadata.read(rootdir)
+        self._calendar = DatetimeIndex(metadata.calendar, tz='UTC')
+        self._first_rows = {
+            int(asset_id): start_index
+            for asset_id, start_index in iteritems(metadata.first_row)
+        }
+        self._last_rows = {
+            int(asset_id): end_index
+            for asset_id, end_index in iteritems(metadata.last_row)
+        }
+        self._calendar_offsets = {
+            int(id_): offset
+            for id_, offset in iteritems(metadata.calendar_offset)
+        }
+        self._columns = {
+            colname: load_npy(_column_path(rootdir, colname), mmap_mode='r')
+            for colname in US_EQUITY_PRICING_BCOLZ_COLUMNS
+        }
+        for colname, column in iteritems(self._columns):
+            if column.dtype != RAW_DTYPE:
+                raise TypeError(
+                    "Expected column {colname!r} to have dtype {expected}, "
+                    "but got {actual}.".format(
+                        colname=colname,
+                        expected=RAW_DTYPE,
+                        actual=column.dtype,
+                    )
+                )
+
+    def _compute_slices(self, start_idx, end_idx, assets):
+        """
+        Compute the raw row indices to load for each asset on a query for the
+        given dates.
+
+        See Also
+        --------
+        zipline.data.us_equity_pricing.BcolzDailyBarReader._compute_slices
+        """
+        return _compute_row_slices(
+            self._first_rows,
+            self._last_rows,
+            self._calendar_offsets,
+            start_idx,
+            end_idx,
+            assets,
+        )
+
+    def load_raw_arrays(self, columns, start_date, end_date, assets):
+        # Assumes that the given dates are actually in calendar.
+        start_idx = self._calendar.get_loc(start_date)
+        end_idx = self._calendar.get_loc(end_date)
+        first_rows, last_rows, offsets = self._compute_slices(
+            start_idx,
+            end_idx,
+            assets,
+        )
+        shape = (end_idx - start_idx + 1, len(assets))
+
+        # Compute the (row, column) location in the output and the row in the
+        # tape of every value we need to read.  These are shared by all the
+        # requested columns.
+        lengths = maximum(last_rows - first_rows + 1, 0)
+        run_starts = cumsum(lengths) - lengths
+        within_run = arange(lengths.sum()) - repeat(run_starts, lengths)
+        out_rows = within_run + repeat(offsets, lengths)
+        out_cols = repeat(arange(len(assets)), lengths)
+        raw_rows = within_run + repeat(first_rows, lengths)
+
+        results = []
+        for column in columns:
+            colname = column.name
+            raw = zeros(shape, dtype=uint32)
+            raw[out_rows, out_cols] = self._columns[colname][raw_rows]
+            if colname in OHLC:
+                out = full(shape, nan)
+                where = raw != 0
+                out[where] = raw[where] * 0.001
+                results.append(out)
+            else:
+                results.append(raw)
+        return results
+
+    def _spot_col(self, colname):
+        """
+        Get the memory-mapped column with the given name.
+
+        Parameters
+        ----------
+        colname : string
+            A name of a OHLCV column in the store.
+
+        Returns
+        -------
+        array (uint32)
+            Read-only memory map of the column.
+        """
+        return self._columns[colname]
+
+    def sid_day_index(self, sid, day):
+        """
+        Parameters
+        ----------
+        sid : int
+            The asset identifier.
+        day : datetime64-like
+            Midnight of the day for which data is requested.
+
+        Returns
+        -------
+        int
+            Index into the data tape for the given sid and day.
+            Raises a NoDataOnDate exception if the given day and sid is before
+            or after the date range of the equity.
+        """
+        day_loc = self._calendar.get_loc(day)
+        offset = day_loc - self._calendar_offsets[sid]
+        if offset < 0:
+            raise NoDataOnDate(
+                "No data on or before day={0} for sid={1}".format(
+                    day, sid))
+        ix = self._first_rows[sid] + offset
+        if ix > self._last_rows[sid]:
+            raise NoDataOnDate(
+                "No data on or after day={0} for sid={1}".format(
+                    day, sid))
+        return ix
+
+    def spot_price(self, sid, day, colname):
+        """
+        Parameters
+        ----------
+        sid : int
+            The asset identifier.
+        day : datetime64-like
+            Midnight of the day for which data is requested.
+        colname : string
+            The price field. e.g. ('open', 'high', 'low', 'close', 'volume')
+
+        Returns
+        -------
+        float
+            The spot price for colname of the given sid on the given day.
+            Raises a NoDataOnDate exception if the given day and sid is before
+            or after the date range of the equity.
+            Returns -1 if the day is within the date range, but the price is
+            0.
+        """
+        ix = self.sid_day_index(sid, day)
+        price = self._spot_col(colname)[ix]
+        if price == 0:
+            return -1
+        if colname != 'volume':
+            return price * 0.001
+        else:
+            return price
+
+    @lazyval
+    def _lookup_arrays(self):
+        return _sid_lookup_arrays(
+            self._first_rows,
+            self._last_rows,
+            self._calendar_offsets,
+        )
+
+    def spot_prices(self, sids, day, colnames):
+        """
+        Vectorized version of ``spot_price`` for many sids and fields.
+
+        See Also
+        --------
+        zipline.data.us_equity_pricing.BcolzDailyBarReader.spot_prices
+        """
+        indices, valid = _sid_day_indices(
+            self._lookup_arrays,
+            sids,
+            self._calendar.get_loc(day),
+        )
+        indices = indices[valid]
+        return [
+            _spot_values(self._spot_col(colname)[indices], valid, colname)
+            for colname in colnames
+        ]
+
+    def spot_prices_at(self, sids, days, colname):
+        """
+        Vectorized version of ``spot_price`` for many (sid, day) pairs.
+
+        See Also
+        --------
+        zipline.data.us_equity_pricing.BcolzDailyBarReader.spot_prices_at
+        """
+        day_locs, on_calendar = _calendar_locs(self._calendar, days)
+        indices, valid = _sid_day_indices(self._lookup_arrays, sids, day_locs)
+        valid &= on_calendar
+        return _spot_values(
+            self._spot_col(colname)[indices[valid]], valid, colname,
+        )
@@ -11,15 +11,32 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import OrderedDict, deque, namedtuple
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
 from textwrap import dedent
+from threading import Lock
+from time import time
 
 import bcolz
 from bcolz import ctable
+from click import progressbar
+import logbook
 import numpy as np
 from os.path import join
 import json
 import os
 import pandas as pd
+import warnings
+
+from zipline.data.chunk_cache import ChunkCache
+from zipline.data._minute_bar_internal import (
+    _copy_minute_segments,
+    _scale_minute_prices,
+    find_position_of_minute,
+    find_positions_of_minutes,
+)
+from zipline.utils.memoize import lazyval
 
 US_EQUITIES_MINUTES_PER_DAY = 390
 
@@ -27,22 +44,71 @@ DEFAULT_EXPECTEDLEN = US_EQUITIES_MINUTES_PER_DAY * 252 * 15
 
 OHLC_RATIO = 1000
 
+logger = logbook.Logger('MinuteBars')
+
+# Maximum number of (field, sid) carrays held open by a BcolzMinuteBarReader.
+DEFAULT_MAX_OPEN_CARRAYS = 10000
+
+NANOS_IN_MINUTE = 60000000000
+
 
 class BcolzMinuteOverlappingData(Exception):
     pass
 
 
-def _calc_minute_index(market_opens, minutes_per_day):
-    minutes = np.zeros(len(market_opens) * minutes_per_day,
-                       dtype='datetime64[ns]')
-    deltas = np.arange(0, minutes_per_day, dtype='timedelta64[m]')
-    for i, market_open in enumerate(market_opens):
-        start = market_open.asm8
-        minute_values = start + deltas
-        start_ix = minutes_per_day * i
-        end_ix = start_ix + minutes_per_day
-        minutes[start_ix:end_ix] = minute_values
-    return pd.to_datetime(minutes, utc=True, box=True)
+def _market_open_minutes(market_opens):
+    """
+    Convert datetime-like market opens to int64 minutes since the epoch.
+    """
+    return np.asarray(market_opens, dtype='datetime64[m]').view(np.int64)
+
+
+def _minute_values(dts):
+    """
+    Convert datetime-likes to int64 nanoseconds since the epoch.
+    """
+    return np.asarray(dts, dtype='datetime64[ns]').view(np.int64)
+
+
+PARTITION_FORMATS = {
+    'year': '%Y',
+    'month': '%Y-%m',
+}
+
+
+def _calc_partitions(trading_days, partition_by):
+    """
+    Compute the partitions of a minute bar dataset.
+
+    Parameters:
+    -----------
+    trading_days : pd.DatetimeIndex
+        The trading days in the dataset.
+    partition_by : str or None
+        'year', 'month', or None for a single, unlabeled partition.
+
+    Returns:
+    --------
+    partitions : list of (str or None, int)
+        The label and index in `trading_days` of the first day of each
+        partition.
+    """
+    if partition_by is None:
+        return [(None, 0)]
+    try:
+        fmt = PARTITION_FORMATS[partition_by]
+    except KeyError:
+        raise ValueError(
+            "partition_by must be one of {0} or None, got {1!r}".format(
+                sorted(PARTITION_FORMATS), partition_by,
+            )
+        )
+    partitions = []
+    for i, day in enumerate(trading_days):
+        label = day.strftime(fmt)
+        if not partitions or partitions[-1][0] != label:
+            partitions.append((label, i))
+    return partitions
 
 
 def _sid_subdir_path(sid):
@@ -91,42 +157,89 @@ class BcolzMinuteBarMetadata(object):
             raw_data = json.load(fp)
             first_trading_day = pd.Timestamp(
                 raw_data['first_trading_day'], tz='UTC')
-            minute_index = pd.to_datetime(raw_data['minute_index'],
-                                          utc=True)
+            market_opens = pd.to_datetime(
+                np.array(raw_data['market_opens'], dtype='datetime64[m]'),
+                utc=True,
+            )
+            market_closes = pd.to_datetime(
+                np.array(raw_data['market_closes'], dtype='datetime64[m]'),
+                utc=True,
+            )
+            try:
+                minutes_per_day = raw_data['minutes_per_day']
+            except KeyError:
+                # Older datasets wrote out every minute instead of the number
+                # of minutes in each day.
+                minutes_per_day = (
+                    len(raw_data['minute_index']) // len(market_opens)
+                )
             ohlc_ratio = raw_data['ohlc_ratio']
+            partitions = [
+                (label, start)
+                for label, start in raw_data.get('partitions', [[None, 0]])
+            ]
             return cls(first_trading_day,
-                       minute_index,
-                       None,  # currently only writing market_opens
-                       None,  # currently only writing market_closes
-                       ohlc_ratio)
+                       None,
+                       market_opens,
+                       market_closes,
+                       ohlc_ratio,
+                       minutes_per_day,
+                       partitions)
 
     def __init__(self,
                  first_trading_day,
                  minute_index,
                  market_opens,
                  market_closes,
-                 ohlc_ratio):
+                 ohlc_ratio,
+                 minutes_per_day=None,
+                 partitions=((None, 0),)):
         """
         Parameters:
         -----------
         first_trading_day : datetime-like
             UTC midnight of the first day available in the dataset.
-        minute_index : pd.DatetimeIndex
-            The minutes which act as an index into the corresponding values
-            written into each sid's ctable.
+        minute_index : pd.DatetimeIndex or None
+            Deprecated.  The minutes of every day are no longer stored, so
+            this is only used to infer `minutes_per_day` when it isn't
+            passed.  Pass None instead.
         market_opens : pd.DatetimeIndex
-            The market opens for each day in the data set. (Not yet required.)
+            The market opens for each day in the data set.
         market_closes : pd.DatetimeIndex
             The market closes for each day in the data set. (Not yet required.)
         ohlc_ratio : int
              The factor by which the pricing data is multiplied so that the
              float data can be stored as an integer.
+        minutes_per_day : int, optional
+            The number of minutes written for each day, starting from the
+            day's market open.  Required unless `minute_index` is passed.
+        partitions : list of (str or None, int)
+            The label and index of the first day of each partition of the
+            data set.  Each sid's data in a partition is stored under a
+            subdirectory of the rootdir named by the label.  The default is a
+            single partition, with no label, covering every day.
         """
+        if minute_index is not None:
+            warnings.warn(
+                "BcolzMinuteBarMetadata's minute_index is deprecated.  Pass "
+                "minutes_per_day instead.",
+                category=DeprecationWarning,
+                stacklevel=2,
+            )
+            if minutes_per_day is None:
+                minutes_per_day = len(minute_index) // len(market_opens)
+        elif minutes_per_day is None:
+            raise TypeError(
+                "BcolzMinuteBarMetadata requires minutes_per_day when no "
+                "minute_index is given."
+            )
+
         self.first_trading_day = first_trading_day
-        self.minute_index = minute_index
         self.market_opens = market_opens
         self.market_closes = market_closes
         self.ohlc_ratio = ohlc_ratio
+        self.minutes_per_day = minutes_per_day
+        self.partitions = list(partitions)
 
     def write(self, rootdir):
         """
@@ -136,23 +249,31 @@ class BcolzMinuteBarMetadata(object):
         first_trading_day : string
             'YYYY-MM-DD' formatted representation of the first trading day
              available in the dataset.
-        minute_index : list of integers
-             nanosecond integer representation of the minutes, the enumeration
-             of which corresponds to the values in each bcolz carray.
+        market_opens : list of integers
+             minute integer representation of the market open of each day.
+             The position of a minute in each bcolz carray is
+             ``day_index * minutes_per_day + minutes since the open``.
+        market_closes : list of integers
+             minute integer representation of the market close of each day.
         ohlc_ratio : int
              The factor by which the pricing data is multiplied so that the
              float data can be stored as an integer.
+        minutes_per_day : int
+             The number of minutes written for each day.
+        partitions : list of [string or null, int]
+             The label and first day index of each partition.
         """
         metadata = {
             'first_trading_day': str(self.first_trading_day.date()),
-            'minute_index': self.minute_index.asi8.tolist(),
-            'market_opens': self.market_opens.values.
-            astype('datetime64[m]').
-            astype(int).tolist(),
-            'market_closes': self.market_closes.values.
-            astype('datetime64[m]').
-            astype(int).tolist(),
+            'market_opens': _market_open_minutes(
+                self.market_opens.values,
+            ).tolist(),
+            'market_closes': _market_open_minutes(
+                self.market_closes.values,
+            ).tolist(),
             'ohlc_ratio': self.ohlc_ratio,
+            'minutes_per_day': self.minutes_per_day,
+            'partitions': [list(partition) for partition in self.partitions],
         }
         with open(self.metadata_path(rootdir), 'w+') as fp:
             json.dump(metadata, fp)
@@ -198,8 +319,23 @@ class BcolzMinuteBarWriter(object):
     corresponding position of the enumeration of the aforementioned datetime
     index.
 
-    The datetimes which correspond to each position are written in the metadata
-    as integer nanoseconds since the epoch into the `minute_index` key.
+    The market opens of each day are written in the metadata as integer
+    minutes since the epoch into the `market_opens` key, along with
+    `minutes_per_day`, so that the position of any minute can be computed
+    as ``day_index * minutes_per_day + minutes since the open``.
+
+    The data may optionally be partitioned by date, e.g. by year.  Each
+    partition holds a ctable per sid under a subdirectory of the rootdir
+    named for the partition, indexed from the first day of the partition.
+    Sids without data in a partition have no ctable in it.  Appending new
+    days only touches the ctables of the partitions containing those days.
+
+    Each table also has a 'last_traded' column of np.int64 holding, for every
+    minute, the position of the last minute at or before it with a non-zero
+    close, or -1 if the sid has not traded yet.  Positions are counted from
+    the first trading day of the whole data set, even when the data is
+    partitioned, so that forward-filled lookups only need to read a single
+    value from each of two columns.
     """
     def __init__(self,
                  first_trading_day,
@@ -208,7 +344,8 @@ class BcolzMinuteBarWriter(object):
                  market_closes,
                  minutes_per_day,
                  ohlc_ratio=OHLC_RATIO,
-                 expectedlen=DEFAULT_EXPECTEDLEN):
+                 expectedlen=DEFAULT_EXPECTEDLEN,
+                 partition_by=None):
         """
         Parameters:
         -----------
@@ -263,6 +400,13 @@ class BcolzMinuteBarWriter(object):
             Defaults to supporting 15 years of NYSE equity market data.
 
             see: http://bcolz.blosc.org/opt-tips.html#informing-about-the-length-of-your-carrays # noqa
+
+            When the data is partitioned, the expected length of each
+            partition's ctables is the number of minutes in the partition.
+
+        partition_by : {'year', 'month'}, optional
+            Partition the data by the year or month of each trading day.
+            By default, the data is not partitioned.
         """
         self._rootdir = rootdir
         self._first_trading_day = first_trading_day
@@ -270,20 +414,27 @@ class BcolzMinuteBarWriter(object):
             market_opens.index.slice_indexer(start=self._first_trading_day)]
         self._market_closes = market_closes[
             market_closes.index.slice_indexer(start=self._first_trading_day)]
-        self._trading_days = market_opens.index
+        self._trading_days = self._market_opens.index
         self._minutes_per_day = minutes_per_day
         self._expectedlen = expectedlen
         self._ohlc_ratio = ohlc_ratio
 
-        self._minute_index = _calc_minute_index(
-            self._market_opens, self._minutes_per_day)
+        self._market_open_minutes = _market_open_minutes(
+            self._market_opens.values)
+
+        self._partitions = _calc_partitions(self._trading_days, partition_by)
+        self._partition_starts = np.array(
+            [start for _, start in self._partitions], dtype=np.int64,
+        )
 
         metadata = BcolzMinuteBarMetadata(
             self._first_trading_day,
-            self._minute_index,
+            None,
             self._market_opens,
             self._market_closes,
             self._ohlc_ratio,
+            self._minutes_per_day,
+            self._partitions,
         )
         metadata.write(self._rootdir)
 
@@ -291,12 +442,14 @@ class BcolzMinuteBarWriter(object):
     def first_trading_day(self):
         return self._first_trading_day
 
-    def sidpath(self, sid):
+    def sidpath(self, sid, partition=None):
         """
         Parameters:
         -----------
         sid : int
             Asset identifier.
+        partition : str, optional
+            The label of the partition.  Required if the data is partitioned.
 
         Returns:
         --------
@@ -304,7 +457,35 @@ class BcolzMinuteBarWriter(object):
             Full path to the bcolz rootdir for the given sid.
         """
         sid_subdir = _sid_subdir_path(sid)
-        return join(self._rootdir, sid_subdir)
+        if partition is None:
+            return join(self._rootdir, sid_subdir)
+        return join(self._rootdir, partition, sid_subdir)
+
+    def _partition_of_day(self, day_ix):
+        """
+        Get the index of the partition containing the trading day at `day_ix`.
+        """
+        return self._partition_starts.searchsorted(day_ix, side='right') - 1
+
+    def _partition_length(self, partition_ix):
+        """
+        The number of trading days in the partition at `partition_ix`.
+        """
+        if partition_ix + 1 < len(self._partitions):
+            end = self._partitions[partition_ix + 1][1]
+        else:
+            end = len(self._trading_days)
+        return end - self._partitions[partition_ix][1]
+
+    def _num_days_in_output(self, sid, partition):
+        sizes_path = "{0}/close/meta/sizes".format(
+            self.sidpath(sid, partition))
+        if not os.path.exists(sizes_path):
+            return 0
+        with open(sizes_path, mode='r') as f:
+            sizes = f.read()
+        data = json.loads(sizes)
+        return data['shape'][0] // self._minutes_per_day
 
     def last_date_in_output_for_sid(self, sid):
         """
@@ -319,19 +500,14 @@ class BcolzMinuteBarWriter(object):
             The midnight of the last date written in to the output for the
             given sid.
         """
-        sizes_path = "{0}/close/meta/sizes".format(self.sidpath(sid))
-        if not os.path.exists(sizes_path):
-            return pd.NaT
-        with open(sizes_path, mode='r') as f:
-            sizes = f.read()
-        data = json.loads(sizes)
-        num_days = data['shape'][0] / self._minutes_per_day
-        if num_days == 0:
-            # empty container
-            return pd.NaT
-        return self._trading_days[num_days - 1]
-
-    def _init_ctable(self, path):
+        for label, start in reversed(self._partitions):
+            num_days = self._num_days_in_output(sid, label)
+            if num_days:
+                return self._trading_days[start + num_days - 1]
+        # empty container
+        return pd.NaT
+
+    def _init_ctable(self, path, expectedlen):
         """
         Create empty ctable for given path.
 
@@ -339,6 +515,8 @@ class BcolzMinuteBarWriter(object):
         -----------
         path : string
             The path to rootdir of the new ctable.
+        expectedlen : int
+            The expected length of the ctable.
         """
         # Only create the containing subdir on creation.
         # This is not to be confused with the `.bcolz` directory, but is the
@@ -346,7 +524,13 @@ class BcolzMinuteBarWriter(object):
         sid_containing_dirname = os.path.dirname(path)
         if not os.path.exists(sid_containing_dirname):
             # Other sids may have already created the containing directory.
-            os.makedirs(sid_containing_dirname)
+            try:
+                os.makedirs(sid_containing_dirname)
+            except OSError:
+                # Another process writing a different sid may have created
+                # it in the meantime.
+                if not os.path.isdir(sid_containing_dirname):
+                    raise
         initial_array = np.empty(0, np.uint32)
         table = ctable(
             rootdir=path,
@@ -356,32 +540,64 @@ class BcolzMinuteBarWriter(object):
                 initial_array,
                 initial_array,
                 initial_array,
+                np.empty(0, np.int64),
             ],
             names=[
                 'open',
                 'high',
                 'low',
                 'close',
-                'volume'
+                'volume',
+                'last_traded',
             ],
-            expectedlen=self._expectedlen,
+            expectedlen=expectedlen,
             mode='w',
         )
         table.flush()
         return table
 
-    def _ensure_ctable(self, sid):
-        """Ensure that a ctable exists for ``sid``, then return it."""
-        sidpath = self.sidpath(sid)
+    def _ensure_ctable(self, sid, partition_ix=0):
+        """
+        Ensure that a ctable exists for ``sid`` in the partition at
+        ``partition_ix``, then return it.
+        """
+        label = self._partitions[partition_ix][0]
+        sidpath = self.sidpath(sid, label)
         if not os.path.exists(sidpath):
-            return self._init_ctable(sidpath)
+            if label is None:
+                expectedlen = self._expectedlen
+            else:
+                expectedlen = (
+                    self._partition_length(partition_ix) *
+                    self._minutes_per_day
+                )
+            return self._init_ctable(sidpath, expectedlen)
         return bcolz.ctable(rootdir=sidpath, mode='a')
 
-    def _zerofill(self, table, numdays):
+    def _last_traded_before(self, sid, partition_ix, table):
+        """
+        The position of the last minute with a non-zero close written for
+        ``sid`` before the end of ``table``, the sid's ctable in the partition
+        at ``partition_ix``, or -1 if there is none.
+        """
+        if len(table):
+            return int(table['last_traded'][len(table) - 1])
+        for label, _ in reversed(self._partitions[:partition_ix]):
+            sidpath = self.sidpath(sid, label)
+            if os.path.exists(sidpath):
+                previous = bcolz.ctable(rootdir=sidpath, mode='r')
+                if len(previous):
+                    return int(previous['last_traded'][len(previous) - 1])
+        return -1
+
+    def _zerofill(self, table, numdays, last_traded=-1):
         num_to_prepend = numdays * self._minutes_per_day
         prepend_array = np.zeros(num_to_prepend, np.uint32)
         # Fill all OHLCV with zeros.
-        table.append([prepend_array] * 5)
+        columns = [prepend_array] * 5
+        if 'last_traded' in table.names:
+            columns.append(np.full(num_to_prepend, last_traded, np.int64))
+        table.append(columns)
         table.flush()
 
     def pad(self, sid, date):
@@ -392,6 +608,9 @@ class BcolzMinuteBarWriter(object):
         output, 2 x `minute_per_day` worth of zeros will be added to the
         output.
 
+        When the data is partitioned, only the partition containing `date` is
+        padded, from the start of the partition.
+
         Parameters:
         -----------
         sid : int
@@ -401,26 +620,29 @@ class BcolzMinuteBarWriter(object):
             The padding is done through the date, i.e. after the padding is
             done the `last_date_in_output_for_sid` will be equal to `date`
         """
-        table = self._ensure_ctable(sid)
-
-        last_date = self.last_date_in_output_for_sid(sid)
-
         tds = self._trading_days
 
-        if date <= last_date or date < tds[0]:
+        if date < tds[0]:
             # No need to pad.
             return
 
-        if last_date == pd.NaT:
-            # If there is no data, determine how many days to add so that
-            # desired days are written to the correct slots.
-            days_to_zerofill = tds[tds.slice_indexer(end=date)]
-        else:
-            days_to_zerofill = tds[tds.slice_indexer(
-                start=last_date + tds.freq,
-                end=date)]
+        # The index of the last trading day on or before `date`.
+        day_ix = tds.searchsorted(date, side='right') - 1
+        partition_ix = self._partition_of_day(day_ix)
+        table = self._ensure_ctable(sid, partition_ix)
 
-        self._zerofill(table, len(days_to_zerofill))
+        numdays = (
+            day_ix - self._partitions[partition_ix][1] + 1 -
+            len(table) // self._minutes_per_day
+        )
+        if numdays <= 0:
+            # No need to pad.
+            return
+
+        last_traded = -1
+        if 'last_traded' in table.names:
+            last_traded = self._last_traded_before(sid, partition_ix, table)
+        self._zerofill(table, numdays, last_traded)
 
         new_last_date = self.last_date_in_output_for_sid(sid)
         assert new_last_date == date, "new_last_date={0} != date={1}".format(
@@ -461,6 +683,84 @@ class BcolzMinuteBarWriter(object):
         dts = df.index.values
         self.write_cols(sid, dts, cols)
 
+    def write_many(self, data, processes=None, show_progress=False):
+        """
+        Write the OHLCV data for many sids, writing the sids concurrently
+        in a pool of processes.
+
+        Each sid's data is written as if by ``write``.
+
+        Parameters:
+        -----------
+        data : iterable of (int, pd.DataFrame)
+            Pairs of sid and DataFrame of market data, in the format accepted
+            by ``write``.  May be a lazy iterator; items are consumed as the
+            workers become available, on the calling thread.  Each sid may
+            appear at most once.
+        processes : int, optional
+            The number of worker processes.  Defaults to the number of CPUs.
+            If 1, the data is written in the calling process.
+        show_progress : bool, optional
+            Whether or not to show a progress bar while writing.
+
+        Returns:
+        --------
+        stats : MinuteBarWriteStats
+            The number of sids and minute bars written and the time taken.
+        """
+        start = time()
+        nsids = 0
+        nbars = 0
+
+        # The input is consumed and validated on the calling thread, so
+        # errors in it are raised here rather than in the pool's task
+        # handler thread, which would leave the pool waiting forever.
+        tasks = _iter_write_tasks(data)
+        if processes == 1:
+            results = (_write_task(self, task) for task in tasks)
+            pool = None
+        else:
+            if processes is None:
+                processes = cpu_count()
+            pool = Pool(
+                processes,
+                initializer=_init_write_worker,
+                initargs=(self,),
+            )
+            results = _imap_bounded(
+                pool, _write_worker, tasks, 2 * processes,
+            )
+
+        try:
+            if show_progress:
+                with progressbar(
+                    results,
+                    item_show_func=lambda i: i if i is None else str(i[0]),
+                    label="Writing minute bars:",
+                ) as pbar_iterator:
+                    for _, task_nbars in pbar_iterator:
+                        nsids += 1
+                        nbars += task_nbars
+            else:
+                for _, task_nbars in results:
+                    nsids += 1
+                    nbars += task_nbars
+        finally:
+            # All of the results have been consumed unless a write failed, in
+            # which case the remaining writes are abandoned.
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        stats = MinuteBarWriteStats(nsids, nbars, time() - start)
+        logger.info(
+            "Wrote {stats.bars} minute bars for {stats.sids} sids in "
+            "{stats.seconds:.2f}s ({rate:.0f} bars/s).",
+            stats=stats,
+            rate=stats.bars_per_second,
+        )
+        return stats
+
     def write_cols(self, sid, dts, cols):
         """
         Write the OHLCV data for the given sid.
@@ -486,35 +786,83 @@ class BcolzMinuteBarWriter(object):
                 low  : float64
                 close : float64
                 volume : float64|int64
-        """
-        table = self._ensure_ctable(sid)
-
-        tds = self._trading_days
-        input_first_day = pd.Timestamp(dts[0].astype('datetime64[D]'),
-                                       tz='UTC')
-        input_last_day = pd.Timestamp(dts[-1].astype('datetime64[D]'),
-                                      tz='UTC')
-
-        last_date = self.last_date_in_output_for_sid(sid)
-
-        if last_date >= input_first_day:
-            raise BcolzMinuteOverlappingData(dedent("""
-            Data with last_date={0} already includes input start={1} for
-            sid={2}""".strip()).format(last_date, input_first_day, sid))
-
-        day_before_input = input_first_day - tds.freq
 
-        self.pad(sid, day_before_input)
-        table = self._ensure_ctable(sid)
+        Raises:
+        -------
+        KeyError
+            If any of `dts` is not within the first ``minutes_per_day``
+            minutes of a session.  Nothing is written for the sid.
+        """
+        if not len(dts):
+            return
 
-        days_to_write = tds[tds.slice_indexer(start=input_first_day,
-                                              end=input_last_day)]
+        minutes_per_day = self._minutes_per_day
 
-        minutes_count = len(days_to_write) * self._minutes_per_day
+        dt_ixs = find_positions_of_minutes(
+            self._market_open_minutes,
+            minutes_per_day,
+            _minute_values(dts),
+        )
+        partition_ixs = self._partition_of_day(dt_ixs // minutes_per_day)
+        first_partition_ix = partition_ixs.min()
+
+        # Data may only be appended after the last partition holding data for
+        # the sid.
+        for partition_ix in range(len(self._partitions) - 1,
+                                  first_partition_ix,
+                                  -1):
+            label = self._partitions[partition_ix][0]
+            if self._num_days_in_output(sid, label):
+                self._raise_overlap(sid, dt_ixs.min() // minutes_per_day)
+
+        if first_partition_ix == partition_ixs.max():
+            self._write_partition(sid, first_partition_ix, dt_ixs, cols)
+            return
 
-        all_minutes = self._minute_index
-        indexer = all_minutes.slice_indexer(start=days_to_write[0])
-        all_minutes_in_window = all_minutes[indexer]
+        for partition_ix in np.unique(partition_ixs):
+            mask = partition_ixs == partition_ix
+            self._write_partition(
+                sid,
+                partition_ix,
+                dt_ixs[mask],
+                {name: values[mask] for name, values in cols.items()},
+            )
+
+    def _raise_overlap(self, sid, first_day_ix):
+        raise BcolzMinuteOverlappingData(dedent("""
+        Data with last_date={0} already includes input start={1} for
+        sid={2}""".strip()).format(
+            self.last_date_in_output_for_sid(sid),
+            self._trading_days[first_day_ix],
+            sid,
+        ))
+
+    def _write_partition(self, sid, partition_ix, dt_ixs, cols):
+        """
+        Append the values in `cols` at the positions `dt_ixs`, all of which
+        fall into the partition at `partition_ix`, to the sid's ctable in
+        that partition.
+        """
+        minutes_per_day = self._minutes_per_day
+        table = self._ensure_ctable(sid, partition_ix)
+
+        # Make the positions relative to the start of the partition.
+        dt_ixs = dt_ixs - self._partitions[partition_ix][1] * minutes_per_day
+        first_day_ix = dt_ixs.min() // minutes_per_day
+        last_day_ix = dt_ixs.max() // minutes_per_day
+
+        # The number of minutes already in the output, including padding.
+        num_written = len(table)
+        if first_day_ix * minutes_per_day < num_written:
+            self._raise_overlap(
+                sid, first_day_ix + self._partitions[partition_ix][1],
+            )
+
+        # Zero-fill the days between the end of the existing output and the
+        # first input day in the same append as the input itself, instead of
+        # padding separately.
+        minutes_count = (last_day_ix + 1) * minutes_per_day - num_written
+        dt_ixs = dt_ixs - num_written
 
         open_col = np.zeros(minutes_count, dtype=np.uint32)
         high_col = np.zeros(minutes_count, dtype=np.uint32)
@@ -522,9 +870,6 @@ class BcolzMinuteBarWriter(object):
         close_col = np.zeros(minutes_count, dtype=np.uint32)
         vol_col = np.zeros(minutes_count, dtype=np.uint32)
 
-        dt_ixs = np.searchsorted(all_minutes_in_window.values,
-                                 dts.astype('datetime64[ns]'))
-
         ohlc_ratio = self._ohlc_ratio
         open_col[dt_ixs] = (cols['open'] * ohlc_ratio).astype(np.uint32)
         high_col[dt_ixs] = (cols['high'] * ohlc_ratio).astype(np.uint32)
@@ -533,19 +878,121 @@ class BcolzMinuteBarWriter(object):
             np.uint32)
         vol_col[dt_ixs] = cols['volume'].astype(np.uint32)
 
-        table.append([
+        columns = [
             open_col,
             high_col,
             low_col,
             close_col,
             vol_col
-        ])
+        ]
+        # Tables written before the 'last_traded' column was added keep
+        # their original layout.
+        if 'last_traded' in table.names:
+            # The absolute position of each minute being appended.
+            base = (
+                self._partitions[partition_ix][1] * minutes_per_day +
+                num_written
+            )
+            last_traded = np.where(
+                close_col != 0,
+                np.arange(minutes_count, dtype=np.int64),
+                -1,
+            )
+            np.maximum.accumulate(last_traded, out=last_traded)
+            traded = last_traded >= 0
+            last_traded[traded] += base
+            last_traded[~traded] = self._last_traded_before(
+                sid, partition_ix, table,
+            )
+            columns.append(last_traded)
+
+        table.append(columns)
         table.flush()
 
 
+class MinuteBarWriteStats(namedtuple('MinuteBarWriteStats',
+                                     'sids bars seconds')):
+    """
+    Summary of a call to BcolzMinuteBarWriter.write_many.
+
+    Attributes
+    ----------
+    sids : int
+        The number of sids written.
+    bars : int
+        The number of input minute bars written.
+    seconds : float
+        The wall time taken.
+    """
+    @property
+    def bars_per_second(self):
+        if not self.seconds:
+            return float('nan')
+        return self.bars / self.seconds
+
+
+def _iter_write_tasks(data):
+    """
+    Convert (sid, DataFrame) pairs into the picklable arguments of
+    ``BcolzMinuteBarWriter.write_cols``, checking that no sid is repeated.
+    """
+    seen = set()
+    for sid, df in data:
+        if sid in seen:
+            raise ValueError("sid %d appears more than once." % sid)
+        seen.add(sid)
+        yield sid, df.index.values, {
+            'open': df.open.values,
+            'high': df.high.values,
+            'low': df.low.values,
+            'close': df.close.values,
+            'volume': df.volume.values,
+        }
+
+
+def _imap_bounded(pool, func, tasks, max_pending):
+    """
+    Lazily apply `func` to each of `tasks` in `pool`, yielding the results in
+    order.
+
+    Unlike ``pool.imap``, `tasks` is consumed by the caller of the returned
+    iterator, at most `max_pending` tasks ahead of the results consumed.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _write_task(writer, task):
+    sid, dts, cols = task
+    writer.write_cols(sid, dts, cols)
+    return sid, len(dts)
+
+
+# The writer used by each process in the pool of write_many.
+_worker_writer = None
+
+
+def _init_write_worker(writer):
+    global _worker_writer
+    _worker_writer = writer
+
+
+def _write_worker(task):
+    return _write_task(_worker_writer, task)
+
+
 class BcolzMinuteBarReader(object):
 
-    def __init__(self, rootdir):
+    def __init__(self,
+                 rootdir,
+                 chunk_cache=None,
+                 max_open_carrays=DEFAULT_MAX_OPEN_CARRAYS,
+                 num_threads=1):
         """
         Reader for data written by BcolzMinuteBarWriter
 
@@ -554,43 +1001,199 @@ class BcolzMinuteBarReader(object):
         rootdir : string
             The root directory containing the metadata and asset bcolz
             directories.
+        chunk_cache : ChunkCache, optional
+            Cache of decompressed chunks through which all reads are served.
+            May be shared with other readers.  By default, each reader
+            creates its own.
+        max_open_carrays : int, optional
+            The maximum number of (field, sid) carrays to keep open.  The
+            least recently used carray is closed when the limit is reached.
+        num_threads : int, optional
+            The number of threads across which ``unadjusted_window`` splits
+            the requested sids.  By default, windows are read on the calling
+            thread.
         """
         self._rootdir = rootdir
 
         metadata = self._get_metadata()
 
         self._first_trading_day = metadata.first_trading_day
-        self._minute_index = metadata.minute_index
+        self._market_open_minutes = _market_open_minutes(
+            metadata.market_opens.values)
+        self._minutes_per_day = metadata.minutes_per_day
         self._ohlc_inverse = 1.0 / metadata.ohlc_ratio
+        self._partition_labels = [label for label, _ in metadata.partitions]
+        self._partition_start_minutes = np.array(
+            [start for _, start in metadata.partitions],
+            dtype=np.int64,
+        ) * self._minutes_per_day
+
+        if chunk_cache is None:
+            chunk_cache = ChunkCache()
+        self._chunk_cache = chunk_cache
+        self._max_open_carrays = max_open_carrays
+        # (field, sid, partition) -> carray, in least to most recently used
+        # order.
+        self._carrays = OrderedDict()
+        self._carrays_lock = Lock()
+        self._num_threads = num_threads
 
-        self._carrays = {
-            'open': {},
-            'high': {},
-            'low': {},
-            'close': {},
-            'volume': {},
-        }
+    @property
+    def chunk_cache(self):
+        """
+        The ChunkCache through which this reader decompresses its carrays.
+        """
+        return self._chunk_cache
+
+    @lazyval
+    def _thread_pool(self):
+        return ThreadPool(self._num_threads)
 
     def _get_metadata(self):
         return BcolzMinuteBarMetadata.read(self._rootdir)
 
-    def _get_carray_path(self, sid, field):
+    def _get_carray_path(self, sid, field, partition=None):
         sid_subdir = _sid_subdir_path(sid)
         # carrays are subdirectories of the sid's rootdir
-        return os.path.join(self._rootdir, sid_subdir, field)
+        if partition is None:
+            return os.path.join(self._rootdir, sid_subdir, field)
+        return os.path.join(self._rootdir, partition, sid_subdir, field)
 
-    def _open_minute_file(self, field, sid):
-        sid = int(sid)
+    def _open_minute_file(self, field, sid, partition=None):
+        """
+        Open the carray for the given field and sid.
 
-        try:
-            carray = self._carrays[field][sid]
-        except KeyError:
-            carray = self._carrays[field][sid] = \
-                bcolz.carray(rootdir=self._get_carray_path(sid, field),
-                             mode='r')
+        When the data is partitioned, returns None if the sid has no data in
+        the given partition.  Returns None for the 'last_traded' field of
+        unpartitioned tables written before that column was added.  Either
+        way, the result is kept with the open carrays, so the file system is
+        only checked when the carray is opened.
+        """
+        sid = int(sid)
+        key = (field, sid, partition)
+        carrays = self._carrays
+
+        with self._carrays_lock:
+            try:
+                # Re-insert to mark as most recently used.
+                carray = carrays.pop(key)
+            except KeyError:
+                path = self._get_carray_path(sid, field, partition)
+                if ((partition is not None or field == 'last_traded') and
+                        not os.path.exists(path)):
+                    carray = None
+                else:
+                    carray = bcolz.carray(rootdir=path, mode='r')
+                if len(carrays) >= self._max_open_carrays:
+                    carrays.popitem(last=False)
+            carrays[key] = carray
 
         return carray
 
+    def _read_minutes(self, field, sid, start, stop):
+        """
+        Read the raw values at positions [start, stop) of the carray for the
+        given field and sid through the chunk cache.
+
+        When the data is partitioned, only the partitions overlapping the
+        range are read.
+        """
+        sid = int(sid)
+        starts = self._partition_start_minutes
+        if len(starts) == 1:
+            return self._read_partition_minutes(field, sid, 0, start, stop)
+
+        first = starts.searchsorted(start, side='right') - 1
+        last = starts.searchsorted(stop - 1, side='right') - 1
+        if first == last:
+            return self._read_partition_minutes(
+                field, sid, first, start, stop,
+            )
+        bounds = [start] + starts[first + 1:last + 1].tolist() + [stop]
+        return np.concatenate([
+            self._read_partition_minutes(
+                field, sid, partition_ix, bounds[i], bounds[i + 1],
+            )
+            for i, partition_ix in enumerate(range(first, last + 1))
+        ])
+
+    def _read_partition_minutes(self, field, sid, partition_ix, start, stop):
+        """
+        Read the raw values at the absolute positions [start, stop), all of
+        which fall into the partition at `partition_ix`.
+        """
+        label = self._partition_labels[partition_ix]
+        partition_start = self._partition_start_minutes[partition_ix]
+        carray = self._open_minute_file(field, sid, label)
+        if carray is None:
+            return np.zeros(stop - start, dtype=np.uint32)
+
+        values = self._chunk_cache.read(
+            carray,
+            ((self._rootdir, label, sid), field),
+            start - partition_start,
+            stop - partition_start,
+        )
+        if label is not None and len(values) < stop - start:
+            # The partition has not been written through the end of the
+            # range, e.g. because it is the current partition.
+            values = np.concatenate([
+                values,
+                np.zeros(stop - start - len(values), dtype=np.uint32),
+            ])
+        return values
+
+    def _append_minute_segments(self, segments, field, sid, row, start, stop):
+        """
+        Find the decompressed chunks holding the raw values at positions
+        [start, stop) of the carrays for the given field and sid.
+
+        A ``(chunk, src_start, row, dest_start, length)`` tuple is appended
+        to `segments` for each run of values, where
+        ``chunk[src_start:src_start + length]`` holds the values at positions
+        ``start + dest_start`` onwards.  Positions with no stored values are
+        not covered by any segment, and should be read as zero.
+        """
+        sid = int(sid)
+        starts = self._partition_start_minutes
+        if len(starts) == 1:
+            first = last = 0
+        else:
+            first = starts.searchsorted(start, side='right') - 1
+            last = starts.searchsorted(stop - 1, side='right') - 1
+        for partition_ix in range(first, last + 1):
+            label = self._partition_labels[partition_ix]
+            carray = self._open_minute_file(field, sid, label)
+            if carray is None:
+                continue
+            chunklen = carray.chunklen
+            key = ((self._rootdir, label, sid), field)
+            partition_start = int(starts[partition_ix])
+            pos = max(start, partition_start) - partition_start
+            if partition_ix < last:
+                partition_stop = int(starts[partition_ix + 1])
+            else:
+                partition_stop = stop
+            partition_stop = min(partition_stop - partition_start, len(carray))
+            while pos < partition_stop:
+                chunk_index = pos // chunklen
+                chunk = self._chunk_cache.chunk(carray, key, chunk_index)
+                src_start = pos - chunk_index * chunklen
+                length = min(
+                    partition_stop - pos,
+                    len(chunk) - src_start,
+                )
+                if length <= 0:
+                    break
+                segments.append((
+                    chunk,
+                    src_start,
+                    row,
+                    partition_start + pos - start,
+                    length,
+                ))
+                pos += length
+
     def get_value(self, sid, dt, field):
         """
         Retrieve the pricing info for the given sid, dt, and field.
@@ -620,7 +1223,7 @@ class BcolzMinuteBarReader(object):
             (A volume of 0 signifies no trades for the given dt.)
         """
         minute_pos = self._find_position_of_minute(dt)
-        value = self._open_minute_file(field, sid)[minute_pos]
+        value = self._read_minutes(field, sid, minute_pos, minute_pos + 1)[0]
         if value == 0:
             if field != 'volume':
                 return np.nan
@@ -630,6 +1233,168 @@ class BcolzMinuteBarReader(object):
             value *= self._ohlc_inverse
         return value
 
+    def get_values(self, sids, dt, fields):
+        """
+        Vectorized version of ``get_value`` for many sids and fields.
+
+        Reads a single minute window with ``unadjusted_window``, so the chunk
+        holding `dt` is looked up once per sid and field, and is then copied
+        and converted for all sids at once without the GIL.
+
+        Parameters:
+        -----------
+        sids : iterable of int
+            Asset identifiers.
+        dt : datetime-like
+            The datetime at which the trades occurred.
+        fields : list of str
+            The types of pricing data to retrieve.
+            ('open', 'high', 'low', 'close', 'volume')
+
+        Returns:
+        --------
+        out : list of np.ndarray
+            An array per entry in `fields` with the value for each sid.
+
+        For OHLC:
+            An array of float64, containing np.nan for each sid that did not
+            trade at the given dt.
+
+        For volume:
+            An array of uint32, containing 0 for each sid that did not trade
+            at the given dt.
+        """
+        windows = self.unadjusted_window(fields, dt, dt, list(sids))
+        # Each window has a single column, so raveling it is a view.
+        return [window.ravel() for window in windows]
+
+    def _last_traded_position(self, sid, minute_pos):
+        """
+        The position of the last minute at or before `minute_pos` at which
+        `sid` traded, or -1 if it had not traded by then.
+        """
+        sid = int(sid)
+        starts = self._partition_start_minutes
+        partition_ix = starts.searchsorted(minute_pos, side='right') - 1
+        while partition_ix >= 0:
+            label = self._partition_labels[partition_ix]
+            carray = self._open_minute_file('last_traded', sid, label)
+            if carray is None and label is None:
+                return self._scan_last_traded_position(sid, minute_pos)
+            if carray is not None and len(carray):
+                # The table may not have been written through `minute_pos`,
+                # in which case the sid's last trade is the last one written.
+                offset = min(minute_pos - starts[partition_ix],
+                             len(carray) - 1)
+                return int(self._chunk_cache.read(
+                    carray,
+                    ((self._rootdir, label, sid), 'last_traded'),
+                    offset,
+                    offset + 1,
+                )[0])
+            # The sid has no data in this partition; its last trade is in an
+            # earlier one, if any.
+            partition_ix -= 1
+        return -1
+
+    def _scan_last_traded_position(self, sid, minute_pos):
+        """
+        Find the last traded position by scanning the close column, for
+        tables written without a 'last_traded' column.
+        """
+        closes = self._read_minutes('close', sid, 0, minute_pos + 1)
+        traded = np.flatnonzero(closes)
+        if not len(traded):
+            return -1
+        return int(traded[-1])
+
+    def get_last_traded_dt(self, sid, dt):
+        """
+        Get the latest minute at or before `dt` at which `sid` traded.
+
+        Parameters:
+        -----------
+        sid : int
+            Asset identifier.
+        dt : datetime-like
+            The minute from which to look back.
+
+        Returns:
+        --------
+        out : pd.Timestamp
+            The minute of the last trade, or pd.NaT if the sid had not traded
+            by `dt`.
+        """
+        pos = self._last_traded_position(
+            sid, self._find_position_of_minute(dt),
+        )
+        if pos < 0:
+            return pd.NaT
+        day_ix, offset = divmod(pos, self._minutes_per_day)
+        return pd.Timestamp(np.datetime64(
+            int(self._market_open_minutes[day_ix] + offset), 'm',
+        )).tz_localize('UTC')
+
+    def get_last_traded_value(self, sid, dt, field):
+        """
+        Retrieve the value of `field` for `sid` at the last minute at or
+        before `dt` at which it traded.
+
+        Unlike ``get_value``, which returns np.nan for a minute without a
+        trade, this forward-fills from the sid's last trade.  The position of
+        the last trade is read from the 'last_traded' column written by
+        BcolzMinuteBarWriter, so the cost does not depend on how long ago the
+        last trade was.
+
+        Parameters:
+        -----------
+        sid : int
+            Asset identifier.
+        dt : datetime-like
+            The minute from which to look back.
+        field : string
+            The type of pricing data to retrieve.
+            ('open', 'high', 'low', 'close', 'volume')
+
+        Returns:
+        --------
+        out : float|int
+            The value at the last trade, or np.nan for OHLC and 0 for volume
+            if the sid had not traded by `dt`.
+        """
+        pos = self._last_traded_position(
+            sid, self._find_position_of_minute(dt),
+        )
+        if pos < 0:
+            return 0 if field == 'volume' else np.nan
+        value = self._read_minutes(field, sid, pos, pos + 1)[0]
+        if field != 'volume':
+            value *= self._ohlc_inverse
+        return value
+
+    def prefetch(self, fields, sids, session):
+        """
+        Read the minutes of `session` for every field and sid into the chunk
+        cache, so that later reads of the session are served from memory.
+
+        Parameters:
+        -----------
+        fields : list of str
+            The fields to read. ('open', 'high', 'low', 'close', 'volume')
+        sids : iterable of int
+            Asset identifiers.
+        session : datetime-like
+            UTC midnight of the trading day to read.
+        """
+        day_ix = self._market_open_minutes.searchsorted(
+            _minute_values([session])[0] // NANOS_IN_MINUTE,
+        )
+        start = day_ix * self._minutes_per_day
+        stop = start + self._minutes_per_day
+        for field in fields:
+            for sid in sids:
+                self._read_minutes(field, sid, start, stop)
+
     def _find_position_of_minute(self, minute_dt):
         """
         Internal method that returns the position of the given minute in the
@@ -651,7 +1416,34 @@ class BcolzMinuteBarReader(object):
         The position of the given minute in the list of all trading minutes
         since market open on the first trading day.
         """
-        return self._minute_index.get_loc(minute_dt)
+        try:
+            minute_val = minute_dt.value
+        except AttributeError:
+            minute_val = pd.Timestamp(minute_dt).value
+        return find_position_of_minute(
+            self._market_open_minutes,
+            self._minutes_per_day,
+            minute_val,
+        )
+
+    def _find_positions_of_minutes(self, minute_dts):
+        """
+        Vectorized version of ``_find_position_of_minute``.
+
+        Parameters
+        ----------
+        minute_dts : array-like of datetime64-like
+            The minutes whose positions should be calculated.
+
+        Returns
+        -------
+        out : np.ndarray[intp]
+        """
+        return find_positions_of_minutes(
+            self._market_open_minutes,
+            self._minutes_per_day,
+            _minute_values(minute_dts),
+        )
 
     def unadjusted_window(self, fields, start_dt, end_dt, sids):
         """
@@ -677,22 +1469,61 @@ class BcolzMinuteBarReader(object):
         start_idx = self._find_position_of_minute(start_dt)
         end_idx = self._find_position_of_minute(end_dt)
 
-        results = []
-
         shape = (len(sids), (end_idx - start_idx + 1))
 
+        # Split the sids into a contiguous block of rows per thread.
+        nblocks = max(min(self._num_threads, len(sids)), 1)
+        bounds = np.linspace(0, len(sids), nblocks + 1).astype(int)
+
+        results = []
+        tasks = []
         for field in fields:
+            raw = np.zeros(shape, dtype=np.uint32)
             if field != 'volume':
-                out = np.full(shape, np.nan)
+                out = np.empty(shape, dtype=np.float64)
             else:
-                out = np.zeros(shape, dtype=np.uint32)
-
-            for i, sid in enumerate(sids):
-                carray = self._open_minute_file(field, sid)
-                values = carray[start_idx:end_idx + 1]
-                where = values != 0
-                out[i, where] = values[where]
-            if field != 'volume':
-                out *= self._ohlc_inverse
-            results.append(out)
+                # Volume is returned as stored, so there is nothing to
+                # convert.
+                out = None
+            results.append(raw if out is None else out)
+            tasks.extend(
+                (field, raw, out, start_row, stop_row)
+                for start_row, stop_row in zip(bounds[:-1], bounds[1:])
+            )
+
+        def load(task):
+            self._load_window_rows(sids, start_idx, end_idx, *task)
+
+        if nblocks > 1:
+            self._thread_pool.map(load, tasks)
+        else:
+            for task in tasks:
+                load(task)
         return results
+
+    def _load_window_rows(self,
+                          sids,
+                          start_idx,
+                          end_idx,
+                          field,
+                          raw,
+                          out,
+                          start_row,
+                          stop_row):
+        """
+        Read the rows [start_row, stop_row) of a window for a single field
+        into `raw`, and convert them into `out` if the field is a price.
+
+        The chunks holding each row are looked up first, and then copied into
+        `raw` in a single pass without the GIL.
+        """
+        segments = []
+        for row in range(start_row, stop_row):
+            self._append_minute_segments(
+                segments, field, sids[row], row, start_idx, end_idx + 1,
+            )
+        _copy_minute_segments(raw, segments)
+        if out is not None:
+            _scale_minute_prices(
+                raw, out, self._ohlc_inverse, start_row, stop_row,
+            )
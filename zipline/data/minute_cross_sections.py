@@ -0,0 +1,315 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Dense, minute-major storage of minute OHLCV bars.
+
+The bcolz minute bar format stores a directory per sid, so reading the bar of
+every sid at a single minute touches a carray per sid and field.  A
+cross-sectional store holds, for each field, blocks of consecutive trading
+days as dense ``(minute, sid_index)`` arrays, so the bars of every sid at a
+minute are a single contiguous row of a memory map.
+"""
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+import pandas as pd
+
+from zipline.data._minute_bar_internal import (
+    find_position_of_minute,
+    find_positions_of_minutes,
+)
+from zipline.data.minute_bars import (
+    _market_open_minutes,
+    _minute_values,
+)
+
+CROSS_SECTION_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Number of trading days held in each block file.
+DEFAULT_BLOCK_DAYS = 21
+
+
+def _block_path(rootdir, field, block_ix):
+    return os.path.join(rootdir, field, '{0:06d}.npy'.format(block_ix))
+
+
+class CrossSectionalMinuteBarMetadata(object):
+    """
+    Metadata describing the axes of a cross-sectional minute bar store.
+
+    Parameters
+    ----------
+    market_opens : np.ndarray[int64]
+        The market open of each trading day, in minutes since the epoch.
+    minutes_per_day : int
+        The number of minutes stored for each trading day.
+    ohlc_ratio : int
+        The factor by which prices are multiplied to be stored as integers.
+    sids : list[int]
+        The column labels of every block, in ascending order.
+    block_days : int
+        The number of trading days in each block.
+    """
+    METADATA_FILENAME = 'metadata.json'
+
+    def __init__(self,
+                 market_opens,
+                 minutes_per_day,
+                 ohlc_ratio,
+                 sids,
+                 block_days):
+        self.market_opens = market_opens
+        self.minutes_per_day = minutes_per_day
+        self.ohlc_ratio = ohlc_ratio
+        self.sids = sids
+        self.block_days = block_days
+
+    @classmethod
+    def metadata_path(cls, rootdir):
+        return os.path.join(rootdir, cls.METADATA_FILENAME)
+
+    @classmethod
+    def read(cls, rootdir):
+        with open(cls.metadata_path(rootdir)) as fp:
+            raw_data = json.load(fp)
+        return cls(
+            np.array(raw_data['market_opens'], dtype=np.int64),
+            raw_data['minutes_per_day'],
+            raw_data['ohlc_ratio'],
+            raw_data['sids'],
+            raw_data['block_days'],
+        )
+
+    def write(self, rootdir):
+        """
+        Write the metadata to a JSON file in the rootdir.
+        """
+        metadata = {
+            'market_opens': np.asarray(self.market_opens).tolist(),
+            'minutes_per_day': self.minutes_per_day,
+            'ohlc_ratio': self.ohlc_ratio,
+            'sids': list(self.sids),
+            'block_days': self.block_days,
+        }
+        with open(self.metadata_path(rootdir), 'w+') as fp:
+            json.dump(metadata, fp)
+
+
+class CrossSectionalMinuteBarWriter(object):
+    """
+    Class capable of transposing data written by BcolzMinuteBarWriter into a
+    cross-sectional minute bar store.
+
+    Parameters
+    ----------
+    rootdir : str
+        Directory into which to write a subdirectory of block files per field
+        and the store's metadata.
+    block_days : int, optional
+        The number of trading days in each block file.
+
+    See Also
+    --------
+    CrossSectionalMinuteBarReader : Consumer of the data written by this class.
+    """
+    def __init__(self, rootdir, block_days=DEFAULT_BLOCK_DAYS):
+        self._rootdir = rootdir
+        self._block_days = block_days
+
+    def write_from_bcolz(self, minute_reader, sids):
+        """
+        Transpose the minute bars of `sids` into minute-major blocks.
+
+        Parameters
+        ----------
+        minute_reader : zipline.data.minute_bars.BcolzMinuteBarReader
+            A reader over the sid-major minute bars to transpose.
+        sids : iterable[int]
+            The sids to include in the store.
+
+        Returns
+        -------
+        reader : CrossSectionalMinuteBarReader
+            A reader over the newly-written store.
+        """
+        sids = sorted(int(sid) for sid in sids)
+        metadata = minute_reader._get_metadata()
+        market_opens = _market_open_minutes(metadata.market_opens.values)
+        minutes_per_day = metadata.minutes_per_day
+
+        block_minutes = self._block_days * minutes_per_day
+        total_minutes = len(market_opens) * minutes_per_day
+
+        for field in CROSS_SECTION_FIELDS:
+            field_dir = os.path.join(self._rootdir, field)
+            if not os.path.exists(field_dir):
+                os.makedirs(field_dir)
+
+            for block_ix, start in enumerate(
+                    range(0, total_minutes, block_minutes)):
+                stop = min(start + block_minutes, total_minutes)
+                block = open_memmap(
+                    _block_path(self._rootdir, field, block_ix),
+                    mode='w+',
+                    dtype=np.uint32,
+                    shape=(stop - start, len(sids)),
+                )
+                for col, sid in enumerate(sids):
+                    values = minute_reader._read_minutes(
+                        field, sid, start, stop,
+                    )
+                    block[:len(values), col] = values
+                block.flush()
+                del block
+
+        CrossSectionalMinuteBarMetadata(
+            market_opens,
+            minutes_per_day,
+            metadata.ohlc_ratio,
+            sids,
+            self._block_days,
+        ).write(self._rootdir)
+        return CrossSectionalMinuteBarReader(self._rootdir)
+
+
+class CrossSectionalMinuteBarReader(object):
+    """
+    Reader for cross-sectional minute bar stores written by
+    CrossSectionalMinuteBarWriter.
+
+    Parameters
+    ----------
+    rootdir : str
+        The directory containing the store's block files and metadata.
+
+    Notes
+    -----
+    Block files are memory-mapped read-only on first use.  Reading the bars
+    of every sid at a minute reads one contiguous row per field.
+    """
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+        metadata = CrossSectionalMinuteBarMetadata.read(rootdir)
+        self._market_opens = metadata.market_opens
+        self._minutes_per_day = metadata.minutes_per_day
+        self._ohlc_inverse = 1.0 / metadata.ohlc_ratio
+        self._sids = np.array(metadata.sids, dtype=np.int64)
+        self._block_minutes = metadata.block_days * metadata.minutes_per_day
+        self._blocks = {}
+
+    @property
+    def sids(self):
+        """
+        The sids in the store, in the order of the columns of every
+        cross-section.
+        """
+        return self._sids
+
+    def _block(self, field, block_ix):
+        try:
+            return self._blocks[field, block_ix]
+        except KeyError:
+            block = self._blocks[field, block_ix] = np.load(
+                _block_path(self._rootdir, field, block_ix),
+                mmap_mode='r',
+            )
+            return block
+
+    def _to_output(self, field, raw):
+        if field == 'volume':
+            return raw
+        out = raw * self._ohlc_inverse
+        out[raw == 0] = np.nan
+        return out
+
+    def _read_rows(self, field, start, stop):
+        """
+        Read the raw rows at positions [start, stop) for every sid.
+        """
+        block_minutes = self._block_minutes
+        first_block = start // block_minutes
+        last_block = (stop - 1) // block_minutes
+        if first_block == last_block:
+            base = first_block * block_minutes
+            return self._block(field, first_block)[start - base:stop - base]
+        return np.concatenate([
+            self._block(field, block_ix)[
+                max(start - block_ix * block_minutes, 0):
+                min(stop - block_ix * block_minutes, block_minutes)
+            ]
+            for block_ix in range(first_block, last_block + 1)
+        ])
+
+    def _position(self, dt):
+        return find_position_of_minute(
+            self._market_opens,
+            self._minutes_per_day,
+            pd.Timestamp(dt).value,
+        )
+
+    def get_cross_section(self, dt, fields):
+        """
+        Retrieve the bars of every sid at a minute.
+
+        Parameters
+        ----------
+        dt : datetime-like
+            The minute to read.
+        fields : list of str
+            'open', 'high', 'low', 'close', or 'volume'
+
+        Returns
+        -------
+        list of np.ndarray
+            An array per field with a value for each sid in ``self.sids``.
+            OHLC arrays are float64 with NaN where a sid did not trade.
+            Volume arrays are uint32 with 0 where a sid did not trade.
+        """
+        pos = self._position(dt)
+        block_ix, row = divmod(pos, self._block_minutes)
+        return [
+            self._to_output(field, self._block(field, block_ix)[row])
+            for field in fields
+        ]
+
+    def get_cross_sections(self, start_dt, end_dt, fields):
+        """
+        Retrieve the bars of every sid over a range of minutes.
+
+        Parameters
+        ----------
+        start_dt : datetime-like
+            The first minute to read.
+        end_dt : datetime-like
+            The last minute to read, inclusive.
+        fields : list of str
+            'open', 'high', 'low', 'close', or 'volume'
+
+        Returns
+        -------
+        list of np.ndarray
+            An array per field of shape (minutes in range, len(self.sids)).
+        """
+        start, end = find_positions_of_minutes(
+            self._market_opens,
+            self._minutes_per_day,
+            _minute_values([start_dt, end_dt]),
+        )
+        return [
+            self._to_output(field, self._read_rows(field, start, end + 1))
+            for field in fields
+        ]
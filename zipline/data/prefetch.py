@@ -0,0 +1,140 @@
+# Copyright 2016 Quantopian, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Background read-ahead of upcoming sessions' bars.
+"""
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import logbook
+
+logger = logbook.Logger('Prefetch')
+
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class SessionPrefetcher(object):
+    """
+    Reads the bars of the sessions following the current one into a reader's
+    chunk cache on a pool of threads, while the simulation thread runs the
+    current session.
+
+    Blosc releases the GIL while decompressing, so the reads overlap with the
+    algorithm's own work.
+
+    Parameters
+    ----------
+    reader : BcolzMinuteBarReader or BcolzDailyBarReader
+        The reader to prefetch through.  Must have a ``prefetch(fields, sids,
+        session)`` method which reads into the reader's chunk cache.
+    sessions : pd.DatetimeIndex
+        The trading days of the simulation.
+    fields : iterable[str], optional
+        The fields to prefetch.
+    sessions_ahead : int, optional
+        The number of sessions after the current one to read ahead.
+    num_threads : int, optional
+        The number of threads reading ahead.
+
+    Notes
+    -----
+    Prefetched data is held in the reader's ChunkCache, so the memory used is
+    bounded by the cache's ``max_bytes``.  When the cache is too small to hold
+    ``sessions_ahead`` sessions for the universe, prefetched chunks may be
+    evicted before they are used, in which case they are read again when
+    needed.
+
+    Errors while prefetching are logged and otherwise ignored: the same
+    reads are retried, and fail normally, in the simulation thread.
+    """
+    def __init__(self,
+                 reader,
+                 sessions,
+                 fields=OHLCV_FIELDS,
+                 sessions_ahead=2,
+                 num_threads=2):
+        if sessions_ahead < 1:
+            raise ValueError(
+                "sessions_ahead must be at least 1, got %d" % sessions_ahead
+            )
+        self._reader = reader
+        self._sessions = sessions
+        self._fields = list(fields)
+        self._sessions_ahead = sessions_ahead
+        self._pool = ThreadPool(num_threads)
+        # session -> AsyncResult, in session order.
+        self._pending = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _prefetch(self, sids, session):
+        # Read one sid at a time, so that a sid without data does not stop
+        # the others from being prefetched.
+        for sid in sids:
+            try:
+                self._reader.prefetch(self._fields, [sid], session)
+            except Exception as e:
+                logger.warn(
+                    "Failed to prefetch sid {sid} on {session}: {error!r}",
+                    sid=sid,
+                    session=session,
+                    error=e,
+                )
+
+    def advance(self, session, sids):
+        """
+        Start reading ahead from `session`.
+
+        Should be called at the start of each session.  The following
+        ``sessions_ahead`` sessions not already being read are scheduled for
+        `sids`.
+
+        Parameters
+        ----------
+        session : pd.Timestamp
+            The session the simulation is starting.
+        sids : iterable[int]
+            The sids to prefetch, usually the algorithm's current universe.
+        """
+        pending = self._pending
+        while pending and next(iter(pending)) <= session:
+            pending.popitem(last=False)
+
+        sids = list(sids)
+        loc = self._sessions.searchsorted(session, side='right')
+        for upcoming in self._sessions[loc:loc + self._sessions_ahead]:
+            if upcoming not in pending:
+                pending[upcoming] = self._pool.apply_async(
+                    self._prefetch, (sids, upcoming),
+                )
+
+    def wait(self):
+        """
+        Block until every scheduled read has finished.
+        """
+        for result in list(self._pending.values()):
+            result.wait()
+
+    def close(self):
+        """
+        Stop scheduling reads, wait for the running ones, and shut down the
+        thread pool.
+        """
+        self._pending.clear()
+        self._pool.close()
+        self._pool.join()
@@ -15,6 +15,7 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from contextlib import contextmanager
 from errno import ENOENT
 from os import remove
 from os.path import exists
@@ -28,12 +29,15 @@ from bcolz import (
 from click import progressbar
 from numpy import (
     array,
+    asarray,
     int64,
+    intp,
     float64,
     floating,
     full,
     iinfo,
     integer,
+    isnan,
     issubdtype,
     nan,
     uint32,
@@ -50,7 +54,10 @@ from six import (
 )
 
 from zipline.utils.input_validation import coerce_string, preprocess
+from zipline.utils.memoize import lazyval
 
+from .chunk_cache import ChunkCache
+from .indexed_adjustments import AdjustmentFactors, IndexedAdjustments
 from ._equities import _compute_row_slices, _read_bcolz_data
 from ._adjustments import load_adjustments_from_sqlite
 
@@ -104,6 +111,12 @@ SQLITE_STOCK_DIVIDEND_PAYOUT_COLUMN_DTYPES = {
     'payment_sid': integer,
     'ratio': float,
 }
+SQLITE_ADJUSTMENT_FACTOR_COLUMN_DTYPES = {
+    'sid': integer,
+    'effective_date': integer,
+    'price_factor': float,
+    'volume_factor': float,
+}
 UINT32_MAX = iinfo(uint32).max
 
 
@@ -114,6 +127,102 @@ class NoDataOnDate(Exception):
     pass
 
 
+def _sid_lookup_arrays(first_rows, last_rows, calendar_offsets):
+    """
+    Convert the per-sid dicts describing a daily bar tape into arrays, sorted
+    by sid, suitable for vectorized lookups.
+
+    Returns
+    -------
+    sids, first_rows, last_rows, calendar_offsets : 4-tuple of ndarray[int64]
+    """
+    sids = array(sorted(first_rows), dtype=int64)
+    return (
+        sids,
+        array([first_rows[sid] for sid in sids], dtype=int64),
+        array([last_rows[sid] for sid in sids], dtype=int64),
+        array([calendar_offsets[sid] for sid in sids], dtype=int64),
+    )
+
+
+def _sid_day_indices(lookup_arrays, sids, day_loc):
+    """
+    Vectorized version of ``BcolzDailyBarReader.sid_day_index``.
+
+    Parameters
+    ----------
+    lookup_arrays : tuple
+        Arrays in the format returned by _sid_lookup_arrays.
+    sids : array-like[int]
+        The asset identifiers.
+    day_loc : int or ndarray[int]
+        The index in the calendar of the day for which data is requested, or
+        of the day of each sid.
+
+    Returns
+    -------
+    indices : ndarray[intp]
+        Index into the data tape for each sid.  Only meaningful where `valid`
+        is True.
+    valid : ndarray[bool]
+        Whether or not the tape has a row for each sid on the requested day.
+
+    Raises
+    ------
+    KeyError
+        If any of the sids is not in the tape.
+    """
+    all_sids, first_rows, last_rows, calendar_offsets = lookup_arrays
+    sids = asarray(sids, dtype=int64)
+    locs = all_sids.searchsorted(sids)
+    known = locs < len(all_sids)
+    known[known] = all_sids[locs[known]] == sids[known]
+    if not known.all():
+        raise KeyError(sids[~known].tolist())
+
+    offsets = day_loc - calendar_offsets[locs]
+    indices = first_rows[locs] + offsets
+    valid = (offsets >= 0) & (indices <= last_rows[locs])
+    return indices.astype(intp), valid
+
+
+def _calendar_locs(calendar, days):
+    """
+    Get the index in `calendar` of each of `days`.
+
+    Returns
+    -------
+    locs : ndarray[int64]
+        The index of each day.  Only meaningful where `found` is True.
+    found : ndarray[bool]
+        Whether or not each day is in the calendar.
+    """
+    calendar = calendar.asi8
+    days = DatetimeIndex(days).asi8
+    locs = calendar.searchsorted(days)
+    found = locs < len(calendar)
+    found[found] = calendar[locs[found]] == days[found]
+    return locs, found
+
+
+def _spot_values(raw, valid, colname):
+    """
+    Vectorized version of the value conversion in
+    ``BcolzDailyBarReader.spot_price``.
+
+    `raw` holds the values on the tape for the entries of `valid` that are
+    True.  Values for sids without data on the requested day are NaN.  Values
+    that are zero on the tape are -1.  Prices are scaled back to dollars.
+    """
+    out = full(len(valid), nan)
+    values = raw.astype(float64)
+    if colname != 'volume':
+        values *= 0.001
+    values[raw == 0] = -1
+    out[valid] = values
+    return out
+
+
 class BcolzDailyBarWriter(with_metaclass(ABCMeta)):
     """
     Class capable of writing daily OHLCV data to disk in a format that can be
@@ -367,7 +476,7 @@ class BcolzDailyBarReader(object):
     range of queried dates.
     """
     @preprocess(table=coerce_string(open_ctable, mode='r'))
-    def __init__(self, table):
+    def __init__(self, table, chunk_cache=None):
 
         self._table = table
         self._calendar = DatetimeIndex(table.attrs['calendar'], tz='UTC')
@@ -383,11 +492,13 @@ class BcolzDailyBarReader(object):
             int(id_): offset
             for id_, offset in iteritems(table.attrs['calendar_offset'])
         }
-        # Cache of fully read np.array for the carrays in the daily bar table.
-        # raw_array does not use the same cache, but it could.
-        # Need to test keeping the entire array in memory for the course of a
-        # process first.
-        self._spot_cols = {}
+        # Decompressed chunks of the carrays in the daily bar table, shared by
+        # spot price lookups and load_raw_arrays.  In-memory tables have no
+        # rootdir, so they are keyed by a token unique to this reader.
+        if chunk_cache is None:
+            chunk_cache = ChunkCache()
+        self._chunk_cache = chunk_cache
+        self._table_key = table.rootdir or object()
 
     def _compute_slices(self, start_idx, end_idx, assets):
         """
@@ -447,29 +558,20 @@ class BcolzDailyBarReader(object):
             first_rows,
             last_rows,
             offsets,
+            self._read_range,
         )
 
-    def _spot_col(self, colname):
+    @property
+    def chunk_cache(self):
         """
-        Get the colname from daily_bar_table and read all of it into memory,
-        caching the result.
-
-        Parameters
-        ----------
-        colname : string
-            A name of a OHLCV carray in the daily_bar_table
-
-        Returns
-        -------
-        array (uint32)
-            Full read array of the carray in the daily_bar_table with the
-            given colname.
+        The ChunkCache through which this reader decompresses its columns.
         """
-        try:
-            col = self._spot_cols[colname]
-        except KeyError:
-            col = self._spot_cols[colname] = self._table[colname][:]
-        return col
+        return self._chunk_cache
+
+    def _read_range(self, carray, colname, start, stop):
+        return self._chunk_cache.read(
+            carray, (self._table_key, colname), start, stop,
+        )
 
     def sid_day_index(self, sid, day):
         """
@@ -521,7 +623,7 @@ class BcolzDailyBarReader(object):
             0.
         """
         ix = self.sid_day_index(sid, day)
-        price = self._spot_col(colname)[ix]
+        price = self._read_range(self._table[colname], colname, ix, ix + 1)[0]
         if price == 0:
             return -1
         if colname != 'volume':
@@ -529,6 +631,106 @@ class BcolzDailyBarReader(object):
         else:
             return price
 
+    @lazyval
+    def _lookup_arrays(self):
+        return _sid_lookup_arrays(
+            self._first_rows,
+            self._last_rows,
+            self._calendar_offsets,
+        )
+
+    def spot_prices(self, sids, day, colnames):
+        """
+        Vectorized version of ``spot_price`` for many sids and fields.
+
+        Parameters
+        ----------
+        sids : array-like[int]
+            The asset identifiers.
+        day : datetime64-like
+            Midnight of the day for which data is requested.
+        colnames : list[str]
+            The price fields. e.g. ('open', 'high', 'low', 'close', 'volume')
+
+        Returns
+        -------
+        list[np.ndarray[float64]]
+            An array per entry in `colnames` containing the spot price of
+            each sid on the given day.
+            Contains NaN for sids whose date range doesn't include `day`.
+            Contains -1 where the day is within the date range, but the price
+            is 0.
+        """
+        indices, valid = _sid_day_indices(
+            self._lookup_arrays,
+            sids,
+            self._calendar.get_loc(day),
+        )
+        indices = indices[valid]
+        return [
+            _spot_values(
+                self._chunk_cache.take(
+                    self._table[colname],
+                    (self._table_key, colname),
+                    indices,
+                ),
+                valid,
+                colname,
+            )
+            for colname in colnames
+        ]
+
+    def spot_prices_at(self, sids, days, colname):
+        """
+        Vectorized version of ``spot_price`` for many (sid, day) pairs.
+
+        Parameters
+        ----------
+        sids : array-like[int]
+            The asset identifiers.
+        days : pd.DatetimeIndex
+            Midnight of the day for which data is requested for each sid.
+        colname : str
+            The price field. e.g. ('open', 'high', 'low', 'close', 'volume')
+
+        Returns
+        -------
+        np.ndarray[float64]
+            The spot price of each sid on its day.
+            Contains NaN for pairs whose sid's date range doesn't include the
+            day, or whose day is not in the calendar.
+            Contains -1 where the day is within the date range, but the price
+            is 0.
+        """
+        day_locs, on_calendar = _calendar_locs(self._calendar, days)
+        indices, valid = _sid_day_indices(self._lookup_arrays, sids, day_locs)
+        valid &= on_calendar
+        return _spot_values(
+            self._chunk_cache.take(
+                self._table[colname],
+                (self._table_key, colname),
+                indices[valid],
+            ),
+            valid,
+            colname,
+        )
+
+    def prefetch(self, fields, sids, session):
+        """
+        Read the rows of `sids` on `session` into the chunk cache, so that
+        later reads of the session are served from memory.
+
+        Parameters
+        ----------
+        fields : list[str]
+            The price fields. e.g. ('open', 'high', 'low', 'close', 'volume')
+        sids : array-like[int]
+            The asset identifiers.
+        session : datetime64-like
+            Midnight of the day to read.
+        """
+        self.spot_prices(sids, session, fields)
+
 
 class SQLiteAdjustmentWriter(object):
     """
@@ -564,6 +766,78 @@ class SQLiteAdjustmentWriter(object):
 
         self._daily_bar_reader = daily_bar_reader
         self._calendar = calendar
+        # The depth of nested _bulk_write blocks.
+        self._bulk_write_depth = 0
+
+    @contextmanager
+    def _bulk_write(self):
+        """
+        Run the writes of a block in a single transaction, with journaling
+        and syncing turned down for the duration of the load.
+
+        Nested blocks join the transaction of the outermost block.
+        """
+        if self._bulk_write_depth:
+            self._bulk_write_depth += 1
+            try:
+                yield
+            finally:
+                self._bulk_write_depth -= 1
+            return
+
+        conn = self.conn
+        # Take manual control of transactions, so that creating tables
+        # doesn't implicitly commit.
+        isolation_level = conn.isolation_level
+        conn.isolation_level = None
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        self._bulk_write_depth = 1
+        conn.execute("BEGIN")
+        committed = False
+        try:
+            yield
+            conn.execute("COMMIT")
+            committed = True
+        finally:
+            if not committed:
+                conn.execute("ROLLBACK")
+            self._bulk_write_depth = 0
+            conn.execute("PRAGMA synchronous = %d" % synchronous)
+            conn.execute("PRAGMA journal_mode = %s" % journal_mode)
+            conn.isolation_level = isolation_level
+
+    def _write_table(self, tablename, frame, column_dtypes):
+        """
+        Create `tablename` with the columns of `column_dtypes` and insert the
+        rows of `frame` with a single executemany.
+        """
+        columns = sorted(column_dtypes)
+        with self._bulk_write():
+            self.conn.execute(
+                "CREATE TABLE {table} ({columns})".format(
+                    table=tablename,
+                    columns=', '.join(
+                        '%s %s' % (
+                            name,
+                            'REAL' if column_dtypes[name] in (float, floating)
+                            else 'INTEGER',
+                        )
+                        for name in columns
+                    ),
+                )
+            )
+            self.conn.executemany(
+                "INSERT INTO {table} ({columns}) VALUES ({params})".format(
+                    table=tablename,
+                    columns=', '.join(columns),
+                    params=', '.join(['?'] * len(columns)),
+                ),
+                zip(*(frame[name].values.tolist() for name in columns)),
+            )
 
     def write_frame(self, tablename, frame):
         if frozenset(frame.columns) != SQLITE_ADJUSTMENT_COLUMNS:
@@ -595,7 +869,7 @@ class SQLiteAdjustmentWriter(object):
                         actual=actual,
                     )
                 )
-        return frame.to_sql(tablename, self.conn)
+        self._write_table(tablename, frame, expected_dtypes)
 
     def write_dividend_payouts(self, frame):
         """
@@ -624,7 +898,7 @@ class SQLiteAdjustmentWriter(object):
                         actual=actual,
                     )
                 )
-        return frame.to_sql('dividend_payouts', self.conn)
+        self._write_table('dividend_payouts', frame, expected_dtypes)
 
     def write_stock_dividend_payouts(self, frame):
         if frozenset(frame.columns) != SQLITE_STOCK_DIVIDEND_PAYOUT_COLUMNS:
@@ -650,7 +924,32 @@ class SQLiteAdjustmentWriter(object):
                         actual=actual,
                     )
                 )
-        return frame.to_sql('stock_dividend_payouts', self.conn)
+        self._write_table(
+            'stock_dividend_payouts', frame, expected_dtypes,
+        )
+
+    def _prev_closes(self, sids, days):
+        """
+        Look up the close of each sid on its day, or NaN where there is no
+        data for it.
+
+        Readers providing ``spot_prices_at`` are asked for every close at
+        once.  Other readers only need to provide ``spot_price``.
+        """
+        daily_bar_reader = self._daily_bar_reader
+        spot_prices_at = getattr(daily_bar_reader, 'spot_prices_at', None)
+        if spot_prices_at is not None:
+            return spot_prices_at(sids, days, 'close')
+
+        prev_closes = full(len(sids), nan)
+        for i, (sid, day) in enumerate(zip(sids, days)):
+            try:
+                prev_closes[i] = daily_bar_reader.spot_price(
+                    sid, day, 'close',
+                )
+            except NoDataOnDate:
+                continue
+        return prev_closes
 
     def calc_dividend_ratios(self, dividends):
         """
@@ -666,48 +965,37 @@ class SQLiteAdjustmentWriter(object):
             - effective_date, the date in seconds on which to apply the ratio.
             - ratio, the ratio to apply to backwards looking pricing data.
         """
-        ex_dates = dividends.ex_date.values
-
+        ex_dates = dividends.ex_date.values.astype('datetime64[ns]')
         sids = dividends.sid.values
         amounts = dividends.amount.values
 
-        ratios = full(len(amounts), nan)
-
-        daily_bar_reader = self._daily_bar_reader
-
-        calendar = self._calendar
-
-        effective_dates = full(len(amounts), -1, dtype=int64)
-
-        for i, amount in enumerate(amounts):
-            sid = sids[i]
-            ex_date = ex_dates[i]
-            day_loc = calendar.get_loc(ex_date)
-            prev_close_date = calendar[day_loc - 1]
-            try:
-                prev_close = daily_bar_reader.spot_price(
-                    sid, prev_close_date, 'close')
-                if prev_close != 0.0:
-                    ratio = 1.0 - amount / prev_close
-                    ratios[i] = ratio
-                    # only assign effective_date when data is found
-                    effective_dates[i] = ex_date
-            except NoDataOnDate:
-                logger.warn("Couldn't compute ratio for dividend %s" % {
-                    'sid': sid,
-                    'ex_date': ex_date,
-                    'amount': amount,
-                })
-                continue
+        if len(amounts):
+            # Look up the close of the trading day before every ex date at
+            # once.
+            calendar = self._calendar
+            day_locs, on_calendar = _calendar_locs(calendar, ex_dates)
+            if not on_calendar.all():
+                raise KeyError(ex_dates[~on_calendar][0])
+            prev_closes = self._prev_closes(sids, calendar[day_locs - 1])
+        else:
+            prev_closes = full(0, nan)
+
+        missing = isnan(prev_closes)
+        for sid, ex_date, amount in zip(sids[missing],
+                                        ex_dates[missing],
+                                        amounts[missing]):
+            logger.warn("Couldn't compute ratio for dividend %s" % {
+                'sid': sid,
+                'ex_date': ex_date,
+                'amount': amount,
+            })
 
-        # Create a mask to filter out indices in the effective_date, sid, and
-        # ratio vectors for which a ratio was not calculable.
-        effective_mask = effective_dates != -1
-        effective_dates = effective_dates[effective_mask]
-        effective_dates = effective_dates.astype('datetime64[ns]').\
+        # Filter out the dividends for which a ratio was not calculable.
+        effective_mask = ~missing & (prev_closes != 0.0)
+        ratios = 1.0 - amounts[effective_mask] / prev_closes[effective_mask]
+        effective_dates = ex_dates[effective_mask].\
             astype('datetime64[s]').astype(uint32)
         sids = sids[effective_mask]
-        ratios = ratios[effective_mask]
 
         return DataFrame({
             'sid': sids,
@@ -769,7 +1057,26 @@ class SQLiteAdjustmentWriter(object):
 
         self.write_frame('dividends', dividend_ratios)
 
-    def write(self, splits, mergers, dividends, stock_dividends=None):
+    def write_adjustment_factors(self):
+        """
+        Write the cumulative adjustment factors of the splits, mergers and
+        dividend ratios already written to SQLite table `adjustment_factors`.
+        """
+        factors = AdjustmentFactors.from_adjustments(
+            IndexedAdjustments.from_sqlite(self.conn),
+        )
+        self._write_table(
+            'adjustment_factors',
+            factors.to_frame(),
+            SQLITE_ADJUSTMENT_FACTOR_COLUMN_DTYPES,
+        )
+
+    def write(self,
+              splits,
+              mergers,
+              dividends,
+              stock_dividends=None,
+              adjustment_factors=False):
         """
         Writes data to a SQLite file to be read by SQLiteAdjustmentReader.
 
@@ -781,6 +1088,12 @@ class SQLiteAdjustmentWriter(object):
             DataFrame containing merger data.
         dividends : pandas.DataFrame
             DataFrame containing dividend data.
+        stock_dividends : pandas.DataFrame, optional
+            DataFrame containing stock dividend data.
+        adjustment_factors : bool, optional
+            If True, also write the cumulative price and volume adjustment
+            factors of each sid, from which
+            ``SQLiteAdjustmentReader.adjust_as_of`` adjusts raw arrays.
 
         Notes
         -----
@@ -852,9 +1165,28 @@ class SQLiteAdjustmentWriter(object):
         --------
         SQLiteAdjustmentReader : Consumer for the data written by this class
         """
+        with self._bulk_write():
+            self._write(splits, mergers, dividends, stock_dividends,
+                        adjustment_factors)
+
+    def _write(self,
+               splits,
+               mergers,
+               dividends,
+               stock_dividends,
+               adjustment_factors):
         self.write_frame('splits', splits)
         self.write_frame('mergers', mergers)
         self.write_dividend_data(dividends, stock_dividends)
+        if adjustment_factors:
+            self.write_adjustment_factors()
+            self.conn.execute(
+                "CREATE INDEX adjustment_factors_sid "
+                "ON adjustment_factors(sid)"
+            )
+
+        # Indices are created after the tables are filled, which is much
+        # faster than maintaining them through every insert.
         self.conn.execute(
             "CREATE INDEX splits_sids "
             "ON splits(sid)"
@@ -910,16 +1242,101 @@ class SQLiteAdjustmentReader(object):
     ----------
     conn : str or sqlite3.Connection
         Connection from which to load data.
+    in_memory : bool, optional
+        If True, every split, merger and dividend is read into memory the
+        first time adjustments are loaded, and later loads are served from
+        sorted arrays without querying the database.  Useful when the same
+        tables are read for many pipeline chunks.  Adjustments are then
+        returned as PackedAdjustments rather than dicts.
     """
 
     @preprocess(conn=coerce_string(sqlite3.connect))
-    def __init__(self, conn):
+    def __init__(self, conn, in_memory=False):
         self.conn = conn
+        self._in_memory = in_memory
+
+    @lazyval
+    def _indexed_adjustments(self):
+        return IndexedAdjustments.from_sqlite(self.conn)
 
     def load_adjustments(self, columns, dates, assets):
+        if self._in_memory:
+            return self._indexed_adjustments.load_packed_adjustments(
+                [column.name for column in columns],
+                dates,
+                assets,
+            )
         return load_adjustments_from_sqlite(
             self.conn,
             [column.name for column in columns],
             dates,
             assets,
         )
+
+    def adjustments_of_sid(self, sid):
+        """
+        Get the effective dates and the price and volume ratios of all of the
+        splits, mergers and dividends of `sid`, sorted by effective date.
+
+        Every adjustment is read into memory on the first call, as when
+        loading adjustments with ``in_memory=True``.
+
+        See Also
+        --------
+        zipline.data.indexed_adjustments.IndexedAdjustments.adjustments_of_sid
+        """
+        return self._indexed_adjustments.adjustments_of_sid(sid)
+
+    @lazyval
+    def _adjustment_factors(self):
+        return AdjustmentFactors.from_sqlite(self.conn)
+
+    def load_adjustment_factors(self, dates, assets):
+        """
+        Get the cumulative price and volume adjustment factors of `assets` on
+        `dates`.
+
+        Requires a database written with ``adjustment_factors=True``.
+
+        Returns
+        -------
+        price_factors, volume_factors : np.ndarray[float64]
+            Arrays of shape (len(dates), len(assets)).
+        """
+        return self._adjustment_factors.load_factors(dates, assets)
+
+    def adjust_as_of(self, raw_arrays, columns, dates, assets, as_of_date):
+        """
+        Adjust raw arrays to be as of a day, with one multiplication by the
+        ratio of the cumulative factors of each row's day and `as_of_date`,
+        instead of applying each adjustment in turn.
+
+        Requires a database written with ``adjustment_factors=True``.
+
+        Parameters
+        ----------
+        raw_arrays : list[np.ndarray]
+            Unadjusted arrays of shape (len(dates), len(assets)), such as
+            those returned by ``BcolzDailyBarReader.load_raw_arrays``.
+        columns : list[BoundColumn]
+            The column of each array.
+        dates : pd.DatetimeIndex
+            The days of the rows of the arrays.
+        assets : pd.Int64Index
+            The assets of the columns of the arrays.
+        as_of_date : pd.Timestamp
+            The day as of which to adjust.
+
+        Returns
+        -------
+        adjusted : list[np.ndarray[float64]]
+            The arrays with every adjustment effective after each row's day
+            and on or before `as_of_date` applied.
+        """
+        return self._adjustment_factors.adjust(
+            raw_arrays,
+            [column.name for column in columns],
+            dates,
+            assets,
+            as_of_date,
+        )
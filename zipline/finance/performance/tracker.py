@@ -352,6 +352,33 @@ class PerformanceTracker(object):
         if txn:
             self.process_transaction(txn)
 
+    def _dividends_on(self, column, day):
+        """
+        Get the rows of ``dividend_frame`` whose `column` date is `day`.
+
+        The rows' dates are sorted once per dividend frame, so each lookup is
+        a binary search instead of a comparison against every row.
+        """
+        frame = self.dividend_frame
+        # The index is rebuilt whenever dividend_frame is replaced, and is
+        # not pickled with the tracker.
+        index = getattr(self, '_dividend_index', None)
+        if index is None or index[0] is not frame:
+            sorted_dates = {}
+            for date_column in ('ex_date', 'pay_date'):
+                dates = pd.DatetimeIndex(frame[date_column]).asi8
+                order = np.argsort(dates, kind='mergesort')
+                sorted_dates[date_column] = dates[order], order
+            index = self._dividend_index = (frame, sorted_dates)
+
+        dates, order = index[1][column]
+        value = pd.Timestamp(day).value
+        rows = order[
+            dates.searchsorted(value, side='left'):
+            dates.searchsorted(value, side='right')
+        ]
+        return frame.iloc[np.sort(rows)]
+
     def check_upcoming_dividends(self, next_trading_day):
         """
         Check if we currently own any stocks with dividends whose ex_date is
@@ -370,14 +397,12 @@ class PerformanceTracker(object):
         # Dividends whose ex_date is the next trading day.  We need to check if
         # we own any of these stocks so we know to pay them out when the pay
         # date comes.
-        ex_date_mask = (self.dividend_frame['ex_date'] == next_trading_day)
-        dividends_earnable = self.dividend_frame[ex_date_mask]
+        dividends_earnable = self._dividends_on('ex_date', next_trading_day)
 
         # Dividends whose pay date is the next trading day.  If we held any of
         # these stocks on midnight before the ex_date, we need to pay these out
         # now.
-        pay_date_mask = (self.dividend_frame['pay_date'] == next_trading_day)
-        dividends_payable = self.dividend_frame[pay_date_mask]
+        dividends_payable = self._dividends_on('pay_date', next_trading_day)
 
         position_tracker = self.position_tracker
         if len(dividends_earnable):
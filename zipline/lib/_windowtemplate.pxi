@@ -11,11 +11,18 @@ zipline.lib._floatwindow
 zipline.lib._intwindow
 zipline.lib._datewindow
 """
-from numpy cimport ndarray
+cimport cython
+from numpy cimport float64_t, ndarray, uint8_t
 from numpy import asarray
 
 ctypedef ctype[:, :] databuffer
 
+# Must match zipline.lib.adjustment.AdjustmentKind.
+cdef enum:
+    _MULTIPLY = 0
+    _ADD = 1
+    _OVERWRITE = 2
+
 
 cdef class AdjustedArrayWindow:
     """
@@ -29,7 +36,12 @@ cdef class AdjustedArrayWindow:
     allow us to show different data when looking back over the array.
 
     The arrays yielded by this iterator are always views over the underlying
-    data.
+    data.  ``segment_length`` and ``next_segment`` allow consumers to read
+    every window between two adjustments in a single array.
+
+    Adjustments are either a dict mapping rows to lists of Adjustment objects,
+    or a PackedAdjustments, whose adjustments for a row are applied in a
+    single loop without the GIL.
     """
     cdef:
         # ctype must be defined by the file into which this is being copied.
@@ -40,54 +52,128 @@ cdef class AdjustedArrayWindow:
         dict adjustments
         list adjustment_indices
 
+        # Parallel arrays of a PackedAdjustments, and the position of the
+        # next one to apply.
+        bint packed
+        Py_ssize_t[:] adj_rows, adj_first_rows, adj_last_rows
+        Py_ssize_t[:] adj_first_cols, adj_last_cols
+        uint8_t[:] adj_kinds
+        float64_t[:] adj_values
+        Py_ssize_t adj_pos, adj_count
+
     def __cinit__(self,
                   databuffer data not None,
                   object viewtype not None,
-                  dict adjustments not None,
+                  object adjustments not None,
                   Py_ssize_t offset,
                   Py_ssize_t window_length):
 
         self.data = data
         self.viewtype = viewtype
-        self.adjustments = adjustments
-        self.adjustment_indices = sorted(adjustments, reverse=True)
         self.window_length = window_length
         self.anchor = window_length + offset
         self.max_anchor = data.shape[0]
 
+        if isinstance(adjustments, dict):
+            self.packed = False
+            self.adjustments = adjustments
+            self.adjustment_indices = sorted(adjustments, reverse=True)
+        else:
+            self.packed = True
+            self.adj_rows = adjustments.rows
+            self.adj_first_rows = adjustments.first_rows
+            self.adj_last_rows = adjustments.last_rows
+            self.adj_first_cols = adjustments.first_cols
+            self.adj_last_cols = adjustments.last_cols
+            self.adj_kinds = adjustments.kinds
+            self.adj_values = adjustments.values
+            self.adj_pos = 0
+            self.adj_count = len(adjustments)
+            # Bounds are checked once here, so they needn't be in the loop.
+            if self.adj_count and (
+                    adjustments.last_rows.max() >= data.shape[0] or
+                    adjustments.last_cols.max() >= data.shape[1]):
+                raise ValueError("Adjustment out of bounds of data.")
+
         self.next_adj = self.pop_next_adj()
 
     cdef pop_next_adj(self):
         """
         Pop the index of the next adjustment to apply from self.adjustment_indices.
         """
+        if self.packed:
+            if self.adj_pos < self.adj_count:
+                return self.adj_rows[self.adj_pos]
+            return self.max_anchor
         if len(self.adjustment_indices) > 0:
             return self.adjustment_indices.pop()
         else:
             return self.max_anchor
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef apply_packed(self, Py_ssize_t row):
+        """
+        Apply the packed adjustments of `row` to self.data.
+        """
+        cdef:
+            databuffer data = self.data
+            Py_ssize_t i = self.adj_pos
+            Py_ssize_t r, c
+            uint8_t kind
+            float64_t value
+
+        with nogil:
+            while i < self.adj_count and self.adj_rows[i] == row:
+                kind = self.adj_kinds[i]
+                value = self.adj_values[i]
+                # last_col + 1 because last_col should also be affected.
+                for c in range(self.adj_first_cols[i],
+                               self.adj_last_cols[i] + 1):
+                    # last_row + 1 because last_row should also be affected.
+                    for r in range(self.adj_first_rows[i],
+                                   self.adj_last_rows[i] + 1):
+                        if kind == _MULTIPLY:
+                            data[r, c] = <ctype>(data[r, c] * value)
+                        elif kind == _ADD:
+                            data[r, c] = <ctype>(data[r, c] + value)
+                        else:
+                            data[r, c] = <ctype>value
+                i += 1
+        self.adj_pos = i
+
     def __iter__(self):
         return self
 
+    cdef apply_adjustments(self, Py_ssize_t anchor):
+        """
+        Apply any adjustments that occured before `anchor`.
+
+        Equivalently, apply any adjustments known **on or before** the date
+        for which we're calculating the window ending at `anchor`.
+        """
+        cdef object adjustment
+
+        while self.next_adj < anchor:
+
+            if self.packed:
+                self.apply_packed(self.next_adj)
+            else:
+                for adjustment in self.adjustments[self.next_adj]:
+                    adjustment.mutate(self.data)
+
+            self.next_adj = self.pop_next_adj()
+
     def __next__(self):
         cdef:
             ndarray out
-            object adjustment
             Py_ssize_t start, anchor
 
         anchor = self.anchor
         if anchor > self.max_anchor:
             raise StopIteration()
 
-        # Apply any adjustments that occured before our current anchor.
-        # Equivalently, apply any adjustments known **on or before** the date
-        # for which we're calculating a window.
-        while self.next_adj < anchor:
-
-            for adjustment in self.adjustments[self.next_adj]:
-                adjustment.mutate(self.data)
-
-            self.next_adj = self.pop_next_adj()
+        self.apply_adjustments(anchor)
 
         start = anchor - self.window_length
         out = asarray(self.data[start:self.anchor]).view(self.viewtype)
@@ -96,6 +182,64 @@ cdef class AdjustedArrayWindow:
         self.anchor += 1
         return out
 
+    def segment_length(self):
+        """
+        Apply the adjustments due before the next window, and get the number
+        of windows that can be produced before another adjustment is due.
+
+        Returns
+        -------
+        length : int
+            The number of remaining windows that see the same adjustments as
+            the next window.  0 if the iterator is exhausted.
+        """
+        cdef Py_ssize_t anchor = self.anchor
+
+        if anchor > self.max_anchor:
+            return 0
+
+        self.apply_adjustments(anchor)
+        # The window ending at anchor + k needs no more adjustments while
+        # anchor + k <= next_adj.
+        return min(self.next_adj, self.max_anchor) - anchor + 1
+
+    def next_segment(self, Py_ssize_t num_windows):
+        """
+        Get the rows spanned by the next `num_windows` windows at once.
+
+        Parameters
+        ----------
+        num_windows : int
+            The number of windows to advance by.  Must be positive and no
+            greater than ``self.segment_length()``.
+
+        Returns
+        -------
+        rows : np.ndarray
+            A read-only array of ``window_length + num_windows - 1`` rows, of
+            which the i-th window is ``rows[i:i + window_length]``.
+        """
+        cdef:
+            ndarray out
+            Py_ssize_t start, anchor = self.anchor
+
+        if num_windows < 1 or num_windows > self.segment_length():
+            raise ValueError(
+                "Can't advance %d windows without applying adjustments, "
+                "expected between 1 and %d." % (
+                    num_windows, self.segment_length(),
+                )
+            )
+
+        start = anchor - self.window_length
+        out = asarray(
+            self.data[start:anchor + num_windows - 1]
+        ).view(self.viewtype)
+        out.setflags(write=False)
+
+        self.anchor += num_windows
+        return out
+
     def __repr__(self):
         return "<%s: window_length=%d, anchor=%d, max_anchor=%d, dtype=%r>" % (
             type(self).__name__,
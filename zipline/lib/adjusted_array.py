@@ -1,8 +1,13 @@
 from textwrap import dedent
+from threading import Lock
 
 from numpy import (
+    add,
+    array,
     bool_,
+    cumsum,
     dtype,
+    flatnonzero,
     float32,
     float64,
     int32,
@@ -12,7 +17,10 @@ from numpy import (
     ndarray,
     uint32,
     uint8,
+    zeros,
 )
+from six import itervalues
+
 from zipline.errors import (
     WindowLengthNotPositive,
     WindowLengthTooLong,
@@ -25,6 +33,8 @@ from zipline.utils.numpy_utils import (
 )
 from zipline.utils.memoize import lazyval
 
+from .adjustment import PackedAdjustments
+
 # These class names are all the same because of our bootleg templating system.
 from ._float64window import AdjustedArrayWindow as Float64Window
 from ._int64window import AdjustedArrayWindow as Int64Window
@@ -121,9 +131,10 @@ class AdjustedArray(object):
         The baseline data values.
     mask : np.ndarray[bool]
         A mask indicating the locations of missing data.
-    adjustments : dict[int -> list[Adjustment]]
+    adjustments : dict[int -> list[Adjustment]] or PackedAdjustments
         A dict mapping row indices to lists of adjustments to apply when we
-        reach that row.
+        reach that row.  Float64 data may instead be given a
+        PackedAdjustments, which is applied without per-adjustment objects.
     missing_value : object
         A value to use to fill missing data in yielded windows.
         Should be a value coercible to `data.dtype`.
@@ -134,15 +145,28 @@ class AdjustedArray(object):
         '_viewtype',
         'adjustments',
         'missing_value',
+        '_saved_columns',
+        '_lock',
         '__weakref__',
     )
 
     def __init__(self, data, mask, adjustments, missing_value):
         self._data, self._viewtype = _normalize_array(data)
 
+        if isinstance(adjustments, PackedAdjustments) and \
+                self._data.dtype != float64_dtype:
+            raise TypeError(
+                "PackedAdjustments require float64 data, got %s." %
+                self._data.dtype
+            )
         self.adjustments = adjustments
         self.missing_value = missing_value
 
+        # The original values of the adjusted columns while a copy-on-write
+        # traversal is modifying them in place.
+        self._saved_columns = None
+        self._lock = Lock()
+
         if mask is not NOMASK:
             if mask.dtype != bool_:
                 raise ValueError("Mask must be a bool array.")
@@ -174,7 +198,32 @@ class AdjustedArray(object):
         """
         return CONCRETE_WINDOW_TYPES[self._data.dtype]
 
-    def traverse(self, window_length, offset=0):
+    @lazyval
+    def _adjusted_columns(self):
+        """
+        The indices of the columns modified by any of our adjustments.
+        """
+        adjustments = self.adjustments
+        if isinstance(adjustments, PackedAdjustments):
+            first_cols = adjustments.first_cols
+            last_cols = adjustments.last_cols
+        else:
+            adjustments = [
+                adjustment
+                for row_adjustments in itervalues(adjustments)
+                for adjustment in row_adjustments
+            ]
+            first_cols = array([a.first_col for a in adjustments], dtype=int)
+            last_cols = array([a.last_col for a in adjustments], dtype=int)
+
+        # Mark the start and end of each adjustment's columns, then count the
+        # adjustments covering each column.
+        marks = zeros(self._data.shape[1] + 1, dtype=int64)
+        add.at(marks, first_cols, 1)
+        add.at(marks, last_cols + 1, -1)
+        return flatnonzero(cumsum(marks[:-1]))
+
+    def traverse(self, window_length, offset=0, copy_on_write=False):
         """
         Produce an iterator rolling windows rows over our data.
         Each emitted window will have `window_length` rows.
@@ -185,9 +234,50 @@ class AdjustedArray(object):
             The number of rows in each emitted window.
         offset : int, optional
             Number of rows to skip before the first window.
+        copy_on_write : bool, optional
+            If False (the default), adjustments are applied to a copy of our
+            data.  If True, only the columns modified by adjustments are
+            copied, and adjustments are applied to our data in place.  The
+            copied columns are restored when the iterator is exhausted,
+            closed or garbage collected, which changes any window already
+            yielded.  Falls back to copying our data if another copy-on-write
+            traversal is in progress.
+
+        Notes
+        -----
+        Our data is never copied if we have no adjustments.
         """
-        data = self._data.copy()
-        _check_window_params(data, window_length)
+        _check_window_params(self._data, window_length)
+        if not len(self.adjustments):
+            # Nothing will modify our data, so windows can be views of it.
+            return self._iterator_type(
+                self._data,
+                self._viewtype,
+                self.adjustments,
+                offset,
+                window_length,
+            )
+
+        with self._lock:
+            if copy_on_write and self._saved_columns is None:
+                columns = self._adjusted_columns
+                self._saved_columns = columns, self._data[:, columns]
+                return _CopyOnWriteWindow(
+                    self,
+                    self._iterator_type(
+                        self._data,
+                        self._viewtype,
+                        self.adjustments,
+                        offset,
+                        window_length,
+                    ),
+                )
+            data = self._data.copy()
+            if self._saved_columns is not None:
+                # A copy-on-write traversal may have modified these columns.
+                columns, values = self._saved_columns
+                data[:, columns] = values
+
         return self._iterator_type(
             data,
             self._viewtype,
@@ -196,6 +286,15 @@ class AdjustedArray(object):
             window_length,
         )
 
+    def _restore_columns(self):
+        """
+        Undo the modifications of a copy-on-write traversal.
+        """
+        with self._lock:
+            columns, values = self._saved_columns
+            self._data[:, columns] = values
+            self._saved_columns = None
+
     def inspect(self):
         """
         Return a string representation of the data stored in this array.
@@ -217,6 +316,56 @@ class AdjustedArray(object):
         )
 
 
+class _CopyOnWriteWindow(object):
+    """
+    Iterator over the windows of an AdjustedArray whose adjustments are being
+    applied to its data in place, which restores the adjusted columns when
+    it is exhausted, closed or garbage collected.
+    """
+    def __init__(self, adjusted_array, window):
+        self._adjusted_array = adjusted_array
+        self._window = window
+
+    @property
+    def window_length(self):
+        return self._window.window_length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._window)
+        except StopIteration:
+            self.close()
+            raise
+
+    next = __next__
+
+    def segment_length(self):
+        return self._window.segment_length()
+
+    def next_segment(self, num_windows):
+        # The columns are restored by `close`, not here, since the returned
+        # rows are a view of the data being adjusted.
+        return self._window.next_segment(num_windows)
+
+    def close(self):
+        """
+        Restore the columns modified by this traversal.
+        """
+        adjusted_array = self._adjusted_array
+        if adjusted_array is not None:
+            self._adjusted_array = None
+            adjusted_array._restore_columns()
+
+    def __del__(self):
+        self.close()
+
+    def __repr__(self):
+        return "<%s: %r>" % (type(self).__name__, self._window)
+
+
 def ensure_ndarray(ndarray_or_adjusted_array):
     """
     Return the input as a numpy ndarray.
@@ -3,7 +3,7 @@ from cpython cimport Py_EQ
 
 from pandas import isnull, Timestamp
 from numpy cimport float64_t, uint8_t, int64_t
-from numpy import datetime64, float64
+from numpy import asarray, datetime64, float64, intp, uint8
 # Purely for readability. There aren't C-level declarations for these types.
 ctypedef object Int64Index_t
 ctypedef object DatetimeIndex_t
@@ -536,3 +536,142 @@ cdef class Datetime64Overwrite(Datetime64Adjustment):
             # last_row + 1 because last_row should also be affected.
             for row in range(self.first_row, self.last_row + 1):
                 data[row, col] = self.value
+
+
+cdef dict _float_adjustment_kinds = {
+    Float64Multiply: MULTIPLY,
+    Float64Add: ADD,
+    Float64Overwrite: OVERWRITE,
+}
+
+
+cdef class PackedAdjustments:
+    """
+    Float64 adjustments stored as parallel arrays, sorted by the row at which
+    each adjustment is applied.
+
+    An alternative to a dict of lists of Float64Adjustment objects which
+    needs no object per adjustment.  AdjustedArray accepts either, and
+    applies the adjustments of a row in a single loop without the GIL.
+
+    Parameters
+    ----------
+    rows : np.ndarray[intp]
+        The row at which each adjustment is applied, i.e. the key of the
+        adjustment in the equivalent dict.
+    first_rows, last_rows, first_cols, last_cols : np.ndarray[intp]
+        The (inclusive) bounds of the region of data modified by each
+        adjustment.
+    kinds : np.ndarray[uint8]
+        The AdjustmentKind of each adjustment.
+    values : np.ndarray[float64]
+        The value of each adjustment.
+
+    Example
+    -------
+
+    >>> import numpy as np
+    >>> adjustments = PackedAdjustments(
+    ...     rows=[1],
+    ...     first_rows=[0],
+    ...     last_rows=[1],
+    ...     first_cols=[2],
+    ...     last_cols=[2],
+    ...     kinds=[MULTIPLY],
+    ...     values=[0.5],
+    ... )
+    >>> adjustments.to_dict()
+    {1: [Float64Multiply(first_row=0, last_row=1, first_col=2, last_col=2, value=0.500000)]}
+    """
+    cdef:
+        readonly object rows
+        readonly object first_rows
+        readonly object last_rows
+        readonly object first_cols
+        readonly object last_cols
+        readonly object kinds
+        readonly object values
+
+    def __init__(self,
+                 rows,
+                 first_rows,
+                 last_rows,
+                 first_cols,
+                 last_cols,
+                 kinds,
+                 values):
+        rows = asarray(rows, dtype=intp)
+        # A stable sort keeps the order of the adjustments of each row.
+        order = rows.argsort(kind='mergesort')
+
+        self.rows = rows[order]
+        self.first_rows = asarray(first_rows, dtype=intp)[order]
+        self.last_rows = asarray(last_rows, dtype=intp)[order]
+        self.first_cols = asarray(first_cols, dtype=intp)[order]
+        self.last_cols = asarray(last_cols, dtype=intp)[order]
+        self.kinds = asarray(kinds, dtype=uint8)[order]
+        self.values = asarray(values, dtype=float64)[order]
+
+        if len(self.rows) and not (
+                (0 <= self.first_rows).all() and
+                (self.first_rows <= self.last_rows).all() and
+                (0 <= self.first_cols).all() and
+                (self.first_cols <= self.last_cols).all()):
+            raise ValueError("Invalid adjustment bounds.")
+        if (self.kinds > OVERWRITE).any():
+            raise ValueError("Unknown adjustment kind.")
+
+    @classmethod
+    def from_dict(cls, dict adjustments):
+        """
+        Pack a dict mapping rows to lists of Float64Adjustments.
+        """
+        cdef list rows = [], first_rows = [], last_rows = []
+        cdef list first_cols = [], last_cols = [], kinds = [], values = []
+
+        for row in sorted(adjustments):
+            for adjustment in adjustments[row]:
+                try:
+                    kinds.append(_float_adjustment_kinds[type(adjustment)])
+                except KeyError:
+                    raise TypeError(
+                        "Can't pack adjustment of type %r." % type(adjustment)
+                    )
+                rows.append(row)
+                first_rows.append(adjustment.first_row)
+                last_rows.append(adjustment.last_row)
+                first_cols.append(adjustment.first_col)
+                last_cols.append(adjustment.last_col)
+                values.append(adjustment.value)
+
+        return cls(
+            rows, first_rows, last_rows, first_cols, last_cols, kinds, values,
+        )
+
+    def to_dict(self):
+        """
+        Unpack into a dict mapping rows to lists of Float64Adjustments.
+        """
+        cdef dict out = {}
+        for (row, first_row, last_row, first_col, last_col,
+             kind, value) in zip(self.rows.tolist(),
+                                 self.first_rows.tolist(),
+                                 self.last_rows.tolist(),
+                                 self.first_cols.tolist(),
+                                 self.last_cols.tolist(),
+                                 self.kinds.tolist(),
+                                 self.values.tolist()):
+            adjustment = make_adjustment_from_indices(
+                first_row, last_row, first_col, last_col, kind, value,
+            )
+            try:
+                out[row].append(adjustment)
+            except KeyError:
+                out[row] = [adjustment]
+        return out
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return "%s(%d adjustments)" % (type(self).__name__, len(self))
@@ -0,0 +1,197 @@
+"""
+On-disk cache of computed Pipeline API terms.
+"""
+from hashlib import sha1
+import os
+from types import BuiltinFunctionType, FunctionType
+from uuid import uuid4
+
+from numpy import (
+    ascontiguousarray,
+    dtype,
+    generic,
+    int64,
+    load,
+    ndarray,
+    save,
+)
+from six import integer_types, string_types
+
+from .term import NotSpecified, Term
+
+# Types whose reprs are the same in every process.
+_SCALAR_TYPES = (bool, float, complex, generic) + integer_types + string_types
+
+
+class _UnstableIdentity(Exception):
+    """
+    Raised when a term's identity can't be represented the same way in
+    another process.
+    """
+
+
+def _canonicalize(value, fingerprints):
+    """
+    Convert an entry of a term's static identity into a value whose repr
+    doesn't depend on the current process.
+    """
+    if isinstance(value, Term):
+        fingerprint = fingerprints.get(value)
+        if fingerprint is None:
+            raise _UnstableIdentity()
+        return ('term', fingerprint)
+    if isinstance(value, (type, FunctionType, BuiltinFunctionType)):
+        name = '%s.%s' % (
+            value.__module__,
+            getattr(value, '__qualname__', value.__name__),
+        )
+        # Lambdas and classes or functions defined in a function body can't
+        # be told apart by name.
+        if '<' in name:
+            raise _UnstableIdentity()
+        return ('name', name)
+    if isinstance(value, (tuple, list)):
+        return tuple(_canonicalize(v, fingerprints) for v in value)
+    if isinstance(value, dtype):
+        return ('dtype', value.str)
+    if value is None or value is NotSpecified:
+        return repr(value)
+    if isinstance(value, _SCALAR_TYPES):
+        return (type(value).__name__, repr(value))
+    raise _UnstableIdentity()
+
+
+def term_fingerprint(term, fingerprints, data_version=None):
+    """
+    Compute a fingerprint of `term` which is the same in every process.
+
+    Parameters
+    ----------
+    term : zipline.pipeline.term.Term
+        The term to fingerprint.
+    fingerprints : dict[Term -> str or None]
+        Fingerprints of the terms on which `term` depends.
+    data_version : str, optional
+        Version of the data from which `term` is loaded.
+
+    Returns
+    -------
+    fingerprint : str or None
+        Hex digest of the static identity of `term`, or None if `term`, or a
+        term on which it depends, has no stable representation.
+    """
+    try:
+        canonical = _canonicalize(term._identity, fingerprints)
+    except _UnstableIdentity:
+        return None
+    return sha1(repr((canonical, data_version)).encode('utf-8')).hexdigest()
+
+
+def result_key(fingerprint, dates, assets, mask):
+    """
+    Compute the key under which to cache the result of a term.
+
+    Parameters
+    ----------
+    fingerprint : str
+        Fingerprint of the term, as returned by `term_fingerprint`.
+    dates : pd.DatetimeIndex
+        Row labels of the result.
+    assets : pd.Int64Index
+        Column labels of the result.
+    mask : np.ndarray[bool]
+        The root mask over `dates` and `assets`.
+
+    Returns
+    -------
+    key : str
+    """
+    hasher = sha1(fingerprint.encode('utf-8'))
+    hasher.update(ascontiguousarray(dates.asi8).tobytes())
+    hasher.update(ascontiguousarray(assets.values, dtype=int64).tobytes())
+    hasher.update(ascontiguousarray(mask).tobytes())
+    return hasher.hexdigest()
+
+
+class TermResultCache(object):
+    """
+    Directory of term results computed by a SimplePipelineEngine, stored as
+    ``.npy`` files.
+
+    Parameters
+    ----------
+    rootdir : str
+        The directory in which to store results.  Created on first write if
+        it doesn't exist.
+
+    Notes
+    -----
+    Results are keyed by their terms' static identities, so a result is only
+    reused if its term's class has the same module and name, and its
+    parameters and inputs are the same.  Entries are never invalidated:
+    clear the directory after changing the ``compute`` method of a custom
+    term.  Terms defined inside functions and lambdas are never cached.
+
+    Results are returned as read-only memory maps, so the same result can be
+    shared between processes without being copied.
+
+    See Also
+    --------
+    zipline.pipeline.loaders.base.PipelineLoader.data_version
+    """
+    def __init__(self, rootdir):
+        self._rootdir = rootdir
+
+    def _path(self, key):
+        return os.path.join(self._rootdir, key[:2], key + '.npy')
+
+    def get(self, key):
+        """
+        Get the result stored under `key`.
+
+        Returns
+        -------
+        result : np.memmap or None
+            A read-only map of the stored result, or None if there's no
+            result stored under `key`.
+        """
+        try:
+            return load(self._path(key), mmap_mode='r')
+        except (IOError, ValueError):
+            return None
+
+    def put(self, key, result):
+        """
+        Store `result` under `key`.
+
+        Results with object dtypes can't be mapped, and aren't stored.
+
+        Returns
+        -------
+        stored : bool
+            Whether `result` was stored.
+        """
+        if not isinstance(result, ndarray) or result.dtype.hasobject:
+            return False
+
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Created by another writer.
+                if not os.path.isdir(dirname):
+                    raise
+
+        # Write to a temporary file first so that readers never see a
+        # partially-written result.
+        tmp_path = '%s.%s.tmp' % (path, uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            save(f, result)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another writer stored the same result first.
+            os.remove(tmp_path)
+        return True
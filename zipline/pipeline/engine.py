@@ -5,12 +5,18 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from heapq import heappop, heappush
+from multiprocessing.pool import ThreadPool
+import sys
 from uuid import uuid4
 
 from six import (
     iteritems,
+    itervalues,
+    reraise,
     with_metaclass,
 )
+from six.moves.queue import Queue
 from numpy import array
 from pandas import (
     DataFrame,
@@ -25,6 +31,7 @@ from zipline.errors import NoFurtherDataError
 from zipline.utils.numpy_utils import repeat_first_axis, repeat_last_axis
 from zipline.utils.pandas_utils import explode
 
+from .cache import result_key, term_fingerprint
 from .term import AssetExists, LoadableTerm
 
 
@@ -91,20 +98,55 @@ class SimplePipelineEngine(object):
     asset_finder : zipline.assets.AssetFinder
         An AssetFinder instance.  We depend on the AssetFinder to determine
         which assets are in the top-level universe at any point in time.
+    copy_on_write : bool, optional
+        If True, windowed terms traverse their inputs with
+        ``AdjustedArray.traverse(copy_on_write=True)``, which copies only the
+        columns modified by adjustments instead of the whole input.  Windows
+        passed to ``compute`` must not be used after it returns.  Ignored
+        when `num_threads` is greater than 1, since other terms may read an
+        input while it is being adjusted in place.
+    num_threads : int, optional
+        The number of threads on which to compute terms.  When greater than
+        1, each term is computed on a thread pool as soon as the terms it
+        depends on are available, while loaders are called on the calling
+        thread.  Results are the same as when computing terms one at a time,
+        but ``compute`` functions of custom terms must not depend on running
+        in a particular order.
+    result_cache : zipline.pipeline.cache.TermResultCache, optional
+        If supplied, the results of computed terms are stored in
+        `result_cache`, and terms whose results are already stored for the
+        same dates, assets and data aren't computed again.  Only terms whose
+        loaded inputs come from loaders with a ``data_version`` are cached.
     """
     __slots__ = (
         '_get_loader',
         '_calendar',
         '_finder',
         '_root_mask_term',
+        '_copy_on_write',
+        '_num_threads',
+        '_result_cache',
         '__weakref__',
     )
 
-    def __init__(self, get_loader, calendar, asset_finder):
+    def __init__(self,
+                 get_loader,
+                 calendar,
+                 asset_finder,
+                 copy_on_write=False,
+                 num_threads=1,
+                 result_cache=None):
+        if num_threads < 1:
+            raise ValueError(
+                "num_threads must be at least 1, got %d" % num_threads
+            )
         self._get_loader = get_loader
         self._calendar = calendar
         self._finder = asset_finder
         self._root_mask_term = AssetExists()
+        self._copy_on_write = copy_on_write and num_threads == 1
+        self._num_threads = num_threads
+        self._result_cache = result_cache
 
     def run_pipeline(self, pipeline, start_date, end_date):
         """
@@ -245,8 +287,7 @@ class SimplePipelineEngine(object):
         offset = graph.extra_rows[mask] - graph.extra_rows[term]
         return workspace[mask][offset:], dates[offset:]
 
-    @staticmethod
-    def _inputs_for_term(term, workspace, graph):
+    def _inputs_for_term(self, term, workspace, graph):
         """
         Compute inputs for the given term.
 
@@ -261,7 +302,8 @@ class SimplePipelineEngine(object):
             return [
                 workspace[input_].traverse(
                     window_length=term.window_length,
-                    offset=offsets[term, input_]
+                    offset=offsets[term, input_],
+                    copy_on_write=self._copy_on_write,
                 )
                 for input_ in term.inputs
             ]
@@ -304,50 +346,92 @@ class SimplePipelineEngine(object):
         -------
         results : dict
             Dictionary mapping requested results to outputs.
+
+        Notes
+        -----
+        Each term's result is dropped as soon as the last term depending on it
+        has been computed, unless it's an output.  Terms on which no output
+        depends, e.g. the inputs of terms supplied in `initial_workspace`, are
+        not computed.
+
+        If we have a result cache, needed terms found in it are added to the
+        workspace before computing anything else, so their inputs aren't
+        loaded either.
         """
         self._validate_compute_chunk_params(dates, assets, initial_workspace)
         get_loader = self.get_loader
+        result_cache = self._result_cache
 
         # Copy the supplied initial workspace so we don't mutate it in place.
         workspace = initial_workspace.copy()
+        if result_cache is not None:
+            cache_keys = self._result_cache_keys(
+                graph, dates, assets, workspace,
+            )
+            self._seed_from_cache(graph, workspace, cache_keys)
+        else:
+            cache_keys = {}
+        refcounts = self._term_refcounts(graph, workspace)
 
         # If loadable terms share the same loader and extra_rows, load them all
         # together.
         loader_group_key = juxt(get_loader, getitem(graph.extra_rows))
         loader_groups = groupby(loader_group_key, graph.loadable_terms)
 
-        for term in graph.ordered():
-            # `term` may have been supplied in `initial_workspace`, and in the
-            # future we may pre-compute loadable terms coming from the same
-            # dataset.  In either case, we will already have an entry for this
-            # term, which we shouldn't re-compute.
-            if term in workspace:
-                continue
-
-            # Asset labels are always the same, but date labels vary by how
-            # many extra rows are needed.
+        def load(term):
+            to_load = sorted(
+                loader_groups[loader_group_key(term)],
+                key=lambda t: t.dataset
+            )
             mask, mask_dates = self._mask_and_dates_for_term(
                 term, workspace, graph, dates
             )
+            return get_loader(term).load_adjusted_array(
+                to_load, mask_dates, assets, mask,
+            )
 
-            if isinstance(term, LoadableTerm):
-                to_load = sorted(
-                    loader_groups[loader_group_key(term)],
-                    key=lambda t: t.dataset
-                )
-                loader = get_loader(term)
-                loaded = loader.load_adjusted_array(
-                    to_load, mask_dates, assets, mask,
-                )
-                workspace.update(loaded)
-            else:
-                workspace[term] = term._compute(
-                    self._inputs_for_term(term, workspace, graph),
-                    mask_dates,
-                    assets,
-                    mask,
-                )
-                assert(workspace[term].shape == mask.shape)
+        def store(term, result):
+            """
+            Add a needed result to the workspace, and drop the dependencies
+            of `term` which no other needed term is waiting on.
+
+            Returns whether `result` was stored.
+            """
+            if not refcounts.get(term) or term in workspace:
+                return False
+            workspace[term] = result
+            key = cache_keys.get(term)
+            if key is not None:
+                result_cache.put(key, result)
+            for dependency in graph.predecessors(term):
+                refcounts[dependency] -= 1
+                if not refcounts[dependency]:
+                    del workspace[dependency]
+            return True
+
+        if self._num_threads > 1:
+            self._compute_terms_in_parallel(
+                graph, dates, assets, workspace, refcounts, load, store,
+            )
+        else:
+            for term in graph.ordered():
+                # `term` may have been supplied in `initial_workspace`, or
+                # loaded along with another term.  In either case, we will
+                # already have an entry for this term, which we shouldn't
+                # re-compute.  Terms no output depends on are skipped.
+                if term in workspace or not refcounts[term]:
+                    continue
+
+                if isinstance(term, LoadableTerm):
+                    for loaded_term, result in iteritems(load(term)):
+                        store(loaded_term, result)
+                else:
+                    store(
+                        term,
+                        self._compute_term(
+                            term, workspace, graph, dates, assets,
+                        ),
+                    )
 
         out = {}
         graph_extra_rows = graph.extra_rows
@@ -356,6 +440,204 @@ class SimplePipelineEngine(object):
             out[name] = workspace[term][graph_extra_rows[term]:]
         return out
 
+    def _result_cache_keys(self, graph, dates, assets, initial_workspace):
+        """
+        Compute the keys under which to cache the results of the computed
+        terms of `graph`.
+
+        Terms depending on loaders without a ``data_version``, or on terms
+        supplied in `initial_workspace` other than the root mask, have no key.
+        """
+        root = self._root_mask_term
+        root_mask = initial_workspace[root]
+        extra_rows = graph.extra_rows
+
+        fingerprints = {}
+        keys = {}
+        for term in graph.ordered():
+            if term is root:
+                # The values of the root mask are part of each result's key.
+                fingerprints[term] = term_fingerprint(term, fingerprints)
+                continue
+            if term in initial_workspace:
+                fingerprints[term] = None
+            elif isinstance(term, LoadableTerm):
+                data_version = getattr(
+                    self.get_loader(term), 'data_version', None,
+                )
+                fingerprints[term] = (
+                    None if data_version is None else
+                    term_fingerprint(term, fingerprints, data_version)
+                )
+            else:
+                fingerprint = fingerprints[term] = term_fingerprint(
+                    term, fingerprints,
+                )
+                if fingerprint is not None:
+                    offset = extra_rows[root] - extra_rows[term]
+                    keys[term] = result_key(
+                        fingerprint,
+                        dates[offset:],
+                        assets,
+                        root_mask[offset:],
+                    )
+        return keys
+
+    def _seed_from_cache(self, graph, workspace, cache_keys):
+        """
+        Add the cached results of the terms needed to compute the outputs of
+        `graph` to `workspace`.
+
+        The dependencies of a term found in the cache aren't needed, unless
+        another term still to be computed depends on them.
+        """
+        get_cached = self._result_cache.get
+        needed = set(itervalues(graph.outputs))
+        # Every dependent of a term precedes it in reverse topological order.
+        for term in reversed(list(graph.ordered())):
+            if term not in needed or term in workspace:
+                continue
+            key = cache_keys.get(term)
+            if key is not None:
+                result = get_cached(key)
+                if result is not None:
+                    workspace[term] = result
+                    continue
+            needed.update(graph.predecessors(term))
+
+    @staticmethod
+    def _term_refcounts(graph, initial_workspace):
+        """
+        Count, for each term of `graph`, the terms still to be computed which
+        depend on it, plus one for each output it is.
+
+        Terms supplied in `initial_workspace` don't need their dependencies,
+        so a term with a count of 0 is not needed to compute the outputs of
+        `graph`.
+        """
+        refcounts = dict.fromkeys(graph, 0)
+        for term in itervalues(graph.outputs):
+            # Outputs are never dropped.
+            refcounts[term] += 1
+
+        # Every dependent of a term precedes it in reverse topological order.
+        for term in reversed(list(graph.ordered())):
+            if not refcounts[term] or term in initial_workspace:
+                continue
+            for dependency in graph.predecessors(term):
+                refcounts[dependency] += 1
+        return refcounts
+
+    def _compute_term(self, term, workspace, graph, dates, assets):
+        """
+        Compute a non-loadable term from the entries of its dependencies in
+        `workspace`.
+        """
+        # Asset labels are always the same, but date labels vary by how many
+        # extra rows are needed.
+        mask, mask_dates = self._mask_and_dates_for_term(
+            term, workspace, graph, dates
+        )
+        inputs = self._inputs_for_term(term, workspace, graph)
+        try:
+            result = term._compute(inputs, mask_dates, assets, mask)
+        finally:
+            # Restore inputs modified by copy-on-write traversals.
+            for input_ in inputs:
+                close = getattr(input_, 'close', None)
+                if close is not None:
+                    close()
+        assert(result.shape == mask.shape)
+        return result
+
+    def _compute_terms_in_parallel(self,
+                                   graph,
+                                   dates,
+                                   assets,
+                                   workspace,
+                                   refcounts,
+                                   load,
+                                   store):
+        """
+        Compute every needed term of `graph`, each on a thread pool once its
+        dependencies are in `workspace`, passing the results to `store`.
+
+        Terms are loaded on the calling thread, since loaders may hold
+        resources, e.g. sqlite connections, which can't be shared between
+        threads.  Whenever several terms are ready, they're started in the
+        order of ``graph.ordered()``.
+        """
+        order = {term: i for i, term in enumerate(graph.ordered())}
+        done = set(term for term in graph if term in workspace)
+        num_waiting_on = {
+            term: sum(1 for dep in graph.predecessors(term) if dep not in done)
+            for term in graph if term not in done and refcounts[term]
+        }
+        # Heap of (position in graph.ordered(), term) for the terms whose
+        # dependencies are all done.
+        ready = [
+            (order[term], term)
+            for term, count in iteritems(num_waiting_on) if not count
+        ]
+        ready.sort()
+        finished = Queue()
+
+        def mark_done(term):
+            done.add(term)
+            for dependent in graph.successors(term):
+                if dependent not in num_waiting_on:
+                    continue
+                num_waiting_on[dependent] -= 1
+                if not num_waiting_on[dependent]:
+                    heappush(ready, (order[dependent], dependent))
+
+        def compute(term):
+            try:
+                result = self._compute_term(
+                    term, workspace, graph, dates, assets,
+                )
+            except Exception:
+                finished.put((term, None, sys.exc_info()))
+            else:
+                finished.put((term, result, None))
+
+        pool = ThreadPool(self._num_threads)
+        num_running = 0
+        error = None
+        try:
+            while ready or num_running:
+                while ready and error is None:
+                    _, term = heappop(ready)
+                    if term in done:
+                        # Loaded along with another term of its group.
+                        continue
+                    if isinstance(term, LoadableTerm):
+                        for loaded_term, result in iteritems(load(term)):
+                            if store(loaded_term, result):
+                                mark_done(loaded_term)
+                    else:
+                        pool.apply_async(compute, (term,))
+                        num_running += 1
+
+                if not num_running:
+                    break
+
+                term, result, exc_info = finished.get()
+                num_running -= 1
+                if exc_info is not None:
+                    # Let the running terms finish before re-raising.
+                    if error is None:
+                        error = exc_info
+                elif error is None:
+                    store(term, result)
+                    mark_done(term)
+        finally:
+            pool.close()
+            pool.join()
+
+        if error is not None:
+            reraise(*error)
+
     def _to_narrow(self, data, mask, dates, assets):
         """
         Convert raw computed pipeline results into a DataFrame for public APIs.
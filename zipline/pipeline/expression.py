@@ -5,7 +5,6 @@ from itertools import chain
 import re
 from numbers import Number
 
-import numexpr
 from numexpr.necompiler import getExprNames
 from numpy import (
     empty,
@@ -13,6 +12,7 @@ from numpy import (
 )
 
 from zipline.pipeline.term import Term, ComputableTerm
+from zipline.utils.math_utils import evaluate
 
 
 _VARIABLE_NAME_RE = re.compile("^(x_)([0-9]+)$")
@@ -231,7 +231,7 @@ class NumericalExpression(ComputableTerm):
         """
         out = empty(mask.shape, dtype=self.dtype)
         # This writes directly into our output buffer.
-        numexpr.evaluate(
+        evaluate(
             self._expr,
             local_dict={
                 "x_%d" % idx: array
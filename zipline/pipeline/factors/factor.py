@@ -1056,6 +1056,20 @@ class CustomFactor(PositiveWindowLengthMixin, CustomTermMixin, Factor):
     3rd, 2014, the column of input data for asset A will have 9 leading NaNs
     for the preceding days on which data was not yet available.
 
+    Factors that can be vectorized across dates may implement ``compute_all``
+    instead of ``compute``:
+
+    .. code-block:: python
+
+        def compute_all(self, dates, assets, out, *windows):
+           ...
+
+    ``compute_all`` is called once for each run of dates between two
+    adjustments to the inputs, with a 2D `out` of shape
+    ``(len(dates), len(assets))`` and a read-only 3D array of shape
+    ``(len(dates), window_length, len(assets))`` per input, whose i-th entry
+    is the window ``compute`` would have been passed for ``dates[i]``.
+
     Examples
     --------
 
@@ -1108,6 +1122,20 @@ class CustomFactor(PositiveWindowLengthMixin, CustomTermMixin, Factor):
         # MedianValue.
         median_close10 = MedianValue([USEquityPricing.close], window_length=10)
         median_low15 = MedianValue([USEquityPricing.low], window_length=15)
+
+    A CustomFactor computing many dates at once:
+
+    .. code-block:: python
+
+        class TenDayRangeAll(CustomFactor):
+            inputs = [USEquityPricing.high, USEquityPricing.low]
+            window_length = 10
+
+            def compute_all(self, dates, assets, out, highs, lows):
+                from numpy import nanmin, nanmax
+
+                # highs and lows have shape (len(dates), 10, len(assets)).
+                out[:] = nanmax(highs, axis=1) - nanmin(lows, axis=1)
     '''
     dtype = float64_dtype
 
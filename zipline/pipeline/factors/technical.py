@@ -8,33 +8,65 @@ from numpy import (
     arange,
     average,
     clip,
+    cumsum,
     diff,
+    errstate,
     exp,
     fmax,
     full,
     inf,
+    isinf,
     isnan,
     log,
     NINF,
     sqrt,
     sum as np_sum,
+    where,
 )
-from numexpr import evaluate
 
 from zipline.pipeline.data import USEquityPricing
-from zipline.pipeline.mixins import SingleInputMixin
+from zipline.pipeline.mixins import RollingWindowMixin, SingleInputMixin
 from zipline.utils.control_flow import ignore_nanwarnings
 from zipline.utils.input_validation import expect_types
 from zipline.utils.math_utils import (
+    evaluate,
     nanargmax,
     nanmax,
     nanmean,
     nansum,
 )
+from zipline.utils.numpy_utils import rolling_window
 from .factor import CustomFactor
 
+# The maximum number of elements in the stacked windows built by
+# MaxDrawdown._compute_rolling.
+_MAX_DRAWDOWN_BATCH_ELEMENTS = 2 ** 22
 
-class Returns(CustomFactor):
+
+def _rolling_sums(values, window_length):
+    """
+    Sum each run of `window_length` rows of `values` from the differences of
+    its cumulative sums.
+    """
+    totals = cumsum(values, axis=0)
+    out = totals[window_length - 1:].copy()
+    out[1:] -= totals[:-window_length]
+    return out
+
+
+def _rolling_nansums(values, window_length):
+    """
+    Sum and count the non-nan values in each run of `window_length` rows of
+    `values`.
+    """
+    valid = ~isnan(values)
+    return (
+        _rolling_sums(where(valid, values, 0), window_length),
+        _rolling_sums(valid.astype(int), window_length),
+    )
+
+
+class Returns(RollingWindowMixin, CustomFactor):
     """
     Calculates the percent change in close price over the given window_length.
 
@@ -45,6 +77,10 @@ class Returns(CustomFactor):
     def compute(self, today, assets, out, close):
         out[:] = (close[-1] - close[0]) / close[0]
 
+    def _compute_rolling(self, out, close):
+        first = close[:len(out)]
+        out[:] = (close[self.window_length - 1:] - first) / first
+
 
 class RSI(CustomFactor, SingleInputMixin):
     """
@@ -69,7 +105,7 @@ class RSI(CustomFactor, SingleInputMixin):
         )
 
 
-class SimpleMovingAverage(CustomFactor, SingleInputMixin):
+class SimpleMovingAverage(RollingWindowMixin, CustomFactor, SingleInputMixin):
     """
     Average Value of an arbitrary column
 
@@ -85,8 +121,16 @@ class SimpleMovingAverage(CustomFactor, SingleInputMixin):
     def compute(self, today, assets, out, data):
         out[:] = nanmean(data, axis=0)
 
+    def _compute_rolling(self, out, data):
+        if isinf(data).any():
+            # inf - inf would poison the running sums.
+            return self._compute_windows(out, data)
+        sums, counts = _rolling_nansums(data, self.window_length)
+        with errstate(divide='ignore', invalid='ignore'):
+            out[:] = sums / counts
 
-class WeightedAverageValue(CustomFactor):
+
+class WeightedAverageValue(RollingWindowMixin, CustomFactor):
     """
     Helper for VWAP-like computations.
 
@@ -97,6 +141,16 @@ class WeightedAverageValue(CustomFactor):
     def compute(self, today, assets, out, base, weight):
         out[:] = nansum(base * weight, axis=0) / nansum(weight, axis=0)
 
+    def _compute_rolling(self, out, base, weight):
+        weighted = base * weight
+        if isinf(weighted).any() or isinf(weight).any():
+            return self._compute_windows(out, base, weight)
+        window_length = self.window_length
+        weighted_sums, _ = _rolling_nansums(weighted, window_length)
+        weight_sums, _ = _rolling_nansums(weight, window_length)
+        with errstate(divide='ignore', invalid='ignore'):
+            out[:] = weighted_sums / weight_sums
+
 
 class VWAP(WeightedAverageValue):
     """
@@ -109,7 +163,7 @@ class VWAP(WeightedAverageValue):
     inputs = (USEquityPricing.close, USEquityPricing.volume)
 
 
-class MaxDrawdown(CustomFactor, SingleInputMixin):
+class MaxDrawdown(RollingWindowMixin, CustomFactor, SingleInputMixin):
     """
     Max Drawdown
 
@@ -129,8 +183,29 @@ class MaxDrawdown(CustomFactor, SingleInputMixin):
             peak = nanmax(data[:end + 1, i])
             out[i] = (peak - data[end, i]) / data[end, i]
 
-
-class AverageDollarVolume(CustomFactor):
+    def _compute_rolling(self, out, data):
+        window_length = self.window_length
+        num_windows, num_columns = out.shape
+        windows = rolling_window(data, window_length)
+        batch_size = max(
+            1, _MAX_DRAWDOWN_BATCH_ELEMENTS // (window_length * num_columns),
+        )
+        columns = arange(num_columns)
+        for start in range(0, num_windows, batch_size):
+            batch = windows[start:start + batch_size]
+            peaks = fmax.accumulate(batch, axis=1)
+            drawdowns = peaks - batch
+            drawdowns[isnan(drawdowns)] = NINF
+            drawdown_ends = drawdowns.argmax(axis=1)
+
+            # The running max at the end of the drawdown is its peak.
+            rows = arange(len(batch))[:, None]
+            peak = peaks[rows, drawdown_ends, columns]
+            trough = batch[rows, drawdown_ends, columns]
+            out[start:start + len(batch)] = (peak - trough) / trough
+
+
+class AverageDollarVolume(RollingWindowMixin, CustomFactor):
     """
     Average Daily Dollar Volume
 
@@ -143,6 +218,14 @@ class AverageDollarVolume(CustomFactor):
     def compute(self, today, assets, out, close, volume):
         out[:] = nanmean(close * volume, axis=0)
 
+    def _compute_rolling(self, out, close, volume):
+        dollar_volume = close * volume
+        if isinf(dollar_volume).any():
+            return self._compute_windows(out, close, volume)
+        sums, counts = _rolling_nansums(dollar_volume, self.window_length)
+        with errstate(divide='ignore', invalid='ignore'):
+            out[:] = sums / counts
+
 
 class _ExponentialWeightedFactor(SingleInputMixin, CustomFactor):
     """
@@ -364,7 +364,7 @@ class CustomFilter(PositiveWindowLengthMixin, CustomTermMixin, Filter):
 
     See the documentation for
     :class:`~zipline.pipeline.factors.factor.CustomFactor` for more details on
-    implementing a custom ``compute`` method.
+    implementing a custom ``compute`` or ``compute_all`` method.
 
     See Also
     --------
@@ -15,7 +15,17 @@ class PipelineLoader(with_metaclass(ABCMeta)):
     ABC for classes that can load data for use with zipline.pipeline APIs.
 
     TODO: DOCUMENT THIS MORE!
+
+    Attributes
+    ----------
+    data_version : str or None
+        Token identifying the data served by this loader, which must change
+        whenever the data does.  Results of terms depending on this loader
+        are only cached by a SimplePipelineEngine with a ``result_cache`` if
+        this is not None.
     """
+    data_version = None
+
     @abstractmethod
     def load_adjusted_array(self, columns, dates, assets, mask):
         pass
@@ -11,11 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from hashlib import sha1
+import os
+
 from numpy import (
     iinfo,
     uint32,
 )
 
+from zipline.data.daily_bar_cube import DailyBarCubeReader
 from zipline.data.us_equity_pricing import (
     BcolzDailyBarReader,
     SQLiteAdjustmentReader,
@@ -33,17 +37,32 @@ class USEquityPricingLoader(PipelineLoader):
     PipelineLoader for US Equity Pricing data
 
     Delegates loading of baselines and adjustments.
+
+    Parameters
+    ----------
+    raw_price_loader : BcolzDailyBarReader
+        Reader of unadjusted prices.
+    adjustments_loader : SQLiteAdjustmentReader
+        Reader of the adjustments to apply to the prices.
+    data_version : str, optional
+        Token identifying the data of both readers, used to key cached pipeline
+        results.  ``from_files`` and ``from_cube`` derive one from the files
+        read.  By default, results depending on this loader aren't cached.
     """
 
-    def __init__(self, raw_price_loader, adjustments_loader):
+    def __init__(self,
+                 raw_price_loader,
+                 adjustments_loader,
+                 data_version=None):
         self.raw_price_loader = raw_price_loader
         # HACK: Pull the calendar off our raw_price_loader so that we can
         # backshift dates.
         self._calendar = self.raw_price_loader._calendar
         self.adjustments_loader = adjustments_loader
+        self.data_version = data_version
 
     @classmethod
-    def from_files(cls, pricing_path, adjustments_path):
+    def from_files(cls, pricing_path, adjustments_path, chunk_cache=None):
         """
         Create a loader from a bcolz equity pricing dir and a SQLite
         adjustments path.
@@ -54,10 +73,38 @@ class USEquityPricingLoader(PipelineLoader):
             Path to a bcolz directory written by a BcolzDailyBarWriter.
         adjusments_path : str
             Path to an adjusments db written by a SQLiteAdjustmentWriter.
+        chunk_cache : zipline.data.chunk_cache.ChunkCache, optional
+            Cache of decompressed chunks to use when reading pricing data.
+            Pass the same cache given to other readers to bound the memory
+            used by all of them together.
+        """
+        return cls(
+            BcolzDailyBarReader(pricing_path, chunk_cache=chunk_cache),
+            SQLiteAdjustmentReader(adjustments_path),
+            _files_version(pricing_path, adjustments_path),
+        )
+
+    @classmethod
+    def from_cube(cls, cube_path, adjustments_path):
+        """
+        Create a loader from a precomputed daily bar cube and a SQLite
+        adjustments path.
+
+        Parameters
+        ----------
+        cube_path : str
+            Path to a directory written by a DailyBarCubeWriter.
+        adjusments_path : str
+            Path to an adjusments db written by a SQLiteAdjustmentWriter.
+
+        See Also
+        --------
+        zipline.data.daily_bar_cube.DailyBarCubeReader
         """
         return cls(
-            BcolzDailyBarReader(pricing_path),
-            SQLiteAdjustmentReader(adjustments_path)
+            DailyBarCubeReader(cube_path),
+            SQLiteAdjustmentReader(adjustments_path),
+            _files_version(cube_path, adjustments_path),
         )
 
     def load_adjusted_array(self, columns, dates, assets, mask):
@@ -84,8 +131,10 @@ class USEquityPricingLoader(PipelineLoader):
 
         out = {}
         for c, c_raw, c_adjs in zip(columns, raw_arrays, adjustments):
+            # AdjustedArray copies its data, so only convert raw arrays which
+            # aren't already of the column's dtype.
             out[c] = AdjustedArray(
-                c_raw.astype(c.dtype),
+                c_raw.astype(c.dtype, copy=False),
                 mask,
                 c_adjs,
                 c.missing_value,
@@ -93,6 +142,27 @@ class USEquityPricingLoader(PipelineLoader):
         return out
 
 
+def _files_version(*paths):
+    """
+    Compute a token which changes whenever a file at or under any of `paths`
+    is written, from the path, size and last modified time of each file.
+    """
+    stats = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    filepath = os.path.join(dirpath, filename)
+                    stats.append((filepath, os.stat(filepath)))
+        else:
+            stats.append((path, os.stat(path)))
+    stats.sort()
+    return sha1(repr([
+        (filepath, stat.st_size, stat.st_mtime) for filepath, stat in stats
+    ]).encode('utf-8')).hexdigest()
+
+
 def _shift_dates(dates, start_date, end_date, shift):
     try:
         start = dates.get_loc(start_date)
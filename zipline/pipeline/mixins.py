@@ -4,6 +4,7 @@ Mixins classes for use with Filters and Factors.
 from numpy import full_like
 
 from zipline.utils.control_flow import nullctx
+from zipline.utils.numpy_utils import rolling_window
 from zipline.errors import WindowLengthNotPositive, UnsupportedDataType
 
 from .term import NotSpecified
@@ -56,12 +57,53 @@ class RestrictedDTypeMixin(object):
             )
 
 
+def _defining_class(cls, name):
+    """
+    Get the first class in the MRO of `cls` whose namespace defines `name`.
+    """
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass
+    return None
+
+
+def _window_segments(windows, num_windows):
+    """
+    Split a traversal of `windows` into runs of windows over which none of
+    the windows apply an adjustment.
+
+    Windows that can't be traversed in runs, e.g. plain iterators of arrays,
+    are yielded one at a time.
+
+    Yields
+    ------
+    start : int
+        The index of the first window of the run.
+    blocks : list[np.ndarray]
+        The rows spanned by the run, one array per window iterator.
+    """
+    if not all(hasattr(w, 'next_segment') for w in windows):
+        for start in range(num_windows):
+            yield start, [next(w) for w in windows]
+        return
+
+    start = 0
+    while start < num_windows:
+        length = min(
+            [w.segment_length() for w in windows] + [num_windows - start]
+        )
+        yield start, [w.next_segment(length) for w in windows]
+        start += length
+
+
 class CustomTermMixin(object):
     """
     Mixin for user-defined rolling-window Terms.
 
     Implements `_compute` in terms of a user-defined `compute` function, which
-    is mapped over the input windows.
+    is mapped over the input windows, or of a user-defined `compute_all`
+    function, which is called with every window between two adjustments at
+    once.
 
     Used by CustomFactor, CustomFilter, CustomClassifier, etc.
     """
@@ -99,11 +141,50 @@ class CustomTermMixin(object):
         """
         raise NotImplementedError()
 
+    def compute_all(self, dates, assets, out, *windows):
+        """
+        Optionally override this method, instead of `compute`, with a function
+        that writes the values of many dates into `out` at once.
+
+        Parameters
+        ----------
+        dates : pd.DatetimeIndex
+            Row labels for `out`.
+        assets : np.array[int64, ndim=1]
+            Column labels for `out` and `windows`.
+        out : np.array[self.dtype, ndim=2]
+            Output array of shape (len(dates), len(assets)).
+        *windows : tuple of np.array[ndim=3]
+            Read-only arrays of shape
+            (len(dates), self.window_length, len(assets)), one per input,
+            whose i-th entry is the window that `compute` would be passed for
+            ``dates[i]``.
+
+        Notes
+        -----
+        The windows are strided views of a single array, so the dates passed
+        to each call never straddle an adjustment, and `compute_all` may be
+        called several times per chunk of dates.
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def _uses_compute_all(cls):
+        # Prefer whichever of compute and compute_all was defined last.
+        compute_all_type = _defining_class(cls, 'compute_all')
+        return (
+            compute_all_type is not CustomTermMixin and
+            issubclass(compute_all_type, _defining_class(cls, 'compute'))
+        )
+
     def _compute(self, windows, dates, assets, mask):
         """
         Call the user's `compute` function on each window with a pre-built
         output array.
         """
+        if self._uses_compute_all():
+            return self._compute_all(windows, dates, assets, mask)
+
         # TODO: Make mask available to user's `compute`.
         compute = self.compute
         missing_value = self.missing_value
@@ -123,10 +204,97 @@ class CustomTermMixin(object):
         out[~mask] = missing_value
         return out
 
+    def _compute_all(self, windows, dates, assets, mask):
+        """
+        Call the user's `compute_all` function on the stacked windows of each
+        run of dates between adjustments.
+        """
+        compute_all = self.compute_all
+        window_length = self.window_length
+        missing_value = self.missing_value
+        params = self.params
+        out = full_like(mask, missing_value, dtype=self.dtype)
+        with self.ctx:
+            for start, blocks in _window_segments(windows, len(dates)):
+                stop = start + len(blocks[0]) - window_length + 1
+                compute_all(
+                    dates[start:stop],
+                    assets,
+                    out[start:stop],
+                    *(rolling_window(b, window_length) for b in blocks),
+                    **params
+                )
+        out[~mask] = missing_value
+        return out
+
     def short_repr(self):
         return type(self).__name__ + '(%d)' % self.window_length
 
 
+class RollingWindowMixin(object):
+    """
+    Mixin for built-in rolling-window Terms that can compute many consecutive
+    windows at once, e.g. from running sums.
+
+    Implements `_compute` in terms of `_compute_rolling`, which is called with
+    the rows spanned by each run of windows between two adjustments, and
+    writes one row of output per window.  Falls back to CustomTermMixin's
+    implementation when a subclass overrides `compute` or `compute_all`.
+
+    Must precede CustomTermMixin in the MRO.
+    """
+    def _compute_rolling(self, out, *blocks):
+        """
+        Write the output of each window of `blocks` into the rows of `out`.
+        """
+        raise NotImplementedError()
+
+    def _compute_windows(self, out, *blocks):
+        """
+        Map `compute` over each window of `blocks`.
+
+        Useful for `_compute_rolling` implementations on inputs that they
+        can't handle.
+        """
+        window_length = self.window_length
+        params = self.params
+        for idx in range(len(out)):
+            self.compute(
+                None,
+                None,
+                out[idx],
+                *(block[idx:idx + window_length] for block in blocks),
+                **params
+            )
+
+    @classmethod
+    def _uses_rolling_compute(cls):
+        # A subclass overriding `compute` or `compute_all` without
+        # `_compute_rolling` changes the output of every window, so it must be
+        # computed the user's way.
+        rolling_type = _defining_class(cls, '_compute_rolling')
+        return (
+            issubclass(rolling_type, _defining_class(cls, 'compute')) and
+            issubclass(rolling_type, _defining_class(cls, 'compute_all'))
+        )
+
+    def _compute(self, windows, dates, assets, mask):
+        if not self._uses_rolling_compute():
+            return super(RollingWindowMixin, self)._compute(
+                windows, dates, assets, mask,
+            )
+
+        window_length = self.window_length
+        missing_value = self.missing_value
+        out = full_like(mask, missing_value, dtype=self.dtype)
+        with self.ctx:
+            for start, blocks in _window_segments(windows, len(dates)):
+                stop = start + len(blocks[0]) - window_length + 1
+                self._compute_rolling(out[start:stop], *blocks)
+        out[~mask] = missing_value
+        return out
+
+
 class LatestMixin(SingleInputMixin):
     """
     Mixin for behavior shared by Custom{Factor,Filter,Classifier}.
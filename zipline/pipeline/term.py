@@ -98,6 +98,9 @@ class Term(with_metaclass(ABCMeta, object)):
                     params=params,
                     *args, **kwargs
                 )
+            # Kept so that results can be cached across processes.  See
+            # zipline.pipeline.cache.
+            new_instance._identity = identity
             return new_instance
 
     @classmethod
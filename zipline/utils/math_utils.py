@@ -14,6 +14,21 @@
 # limitations under the License.
 
 import math
+from threading import Lock
+
+import numexpr
+
+# numexpr's virtual machine keeps the state of its worker threads in globals,
+# so evaluations started from more than one thread must take turns.
+_numexpr_lock = Lock()
+
+
+def evaluate(*args, **kwargs):
+    """
+    Thread-safe version of ``numexpr.evaluate``.
+    """
+    with _numexpr_lock:
+        return numexpr.evaluate(*args, **kwargs)
 
 
 def tolerant_equals(a, b, atol=10e-7, rtol=10e-7):
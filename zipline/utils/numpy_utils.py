@@ -185,6 +185,53 @@ def repeat_last_axis(array, count):
     return as_strided(array, array.shape + (count,), array.strides + (0,))
 
 
+def rolling_window(array, length):
+    """
+    Restride `array` into every run of `length` consecutive rows.
+
+    Parameters
+    ----------
+    array : np.array
+        The array to restride.
+    length : int
+        Number of rows in each window.
+
+    Returns
+    -------
+    result : array
+        Read-only array of shape (len(array) - length + 1, length) +
+        array.shape[1:], whose i-th entry is ``array[i:i + length]``.
+
+    Example
+    -------
+    >>> from numpy import arange
+    >>> a = arange(4); a
+    array([0, 1, 2, 3])
+    >>> rolling_window(a, 2)
+    array([[0, 1],
+           [1, 2],
+           [2, 3]])
+
+    Notes
+    ----
+    The resulting array will share memory with `array`.
+    """
+    num_windows = len(array) - length + 1
+    if num_windows < 1 or length < 1:
+        raise ValueError(
+            "Can't make windows of length %d over %d rows." % (
+                length, len(array),
+            )
+        )
+    out = as_strided(
+        array,
+        (num_windows, length) + array.shape[1:],
+        (array.strides[0],) + array.strides,
+    )
+    out.setflags(write=False)
+    return out
+
+
 # Sentinel value that isn't NaT.
 _notNaT = make_datetime64D(0)
 